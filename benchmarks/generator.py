@@ -0,0 +1,392 @@
+"""A deterministic generator of synthetic reaction databases.
+
+The generator produces a reproducible stream of pyvalem-parsable reaction texts
+(electron-impact excitation and ionisation and charge transfer between synthetic
+species in vibrational and rotational states), all of them conserving charge and
+stoichiometry so that they pass PVReaction(strict=True), and mostly already in their
+canonical form, so that they only need parsing once. The same seed always yields
+the same stream, so the first `scale` reactions can be loaded into the database and
+the following ones used for measuring the creation of new rows.
+
+The `populate` method loads the database directly with bulk_create, in chunks and
+with explicitly assigned primary keys, so that the loading time and memory stay
+manageable up to scales of 10^6 reactions. The rows, including the composition of
+the species (see _utils.composition), are identical to those the
+get_or_create_from_text classmethods would create. The loading time is dominated by
+the pyvalem parsing, which is therefore spread over a pool of processes.
+"""
+
+import json
+import random
+from multiprocessing import Pool
+
+from pyvalem.formula import Formula
+from pyvalem.reaction import Reaction as PVReaction
+from pyvalem.stateful_species import StatefulSpecies
+
+from _utils.composition import formula_composition
+from rp.models import Species, SpeciesAlias, SpeciesComposition, RP, State
+from rxn.models import ProcessType, Reaction, ReactantList, ProductList
+
+ELEMENTS = (
+    "H",
+    "He",
+    "Li",
+    "Be",
+    "B",
+    "C",
+    "N",
+    "O",
+    "F",
+    "Ne",
+    "Na",
+    "Mg",
+    "Al",
+    "Si",
+    "P",
+    "S",
+    "Cl",
+    "Ar",
+    "Fe",
+    "W",
+    "Xe",
+)
+
+PROCESS_TYPES = (
+    ("EEX", "Excitation", "e<sup>-</sup> + A → e<sup>-</sup> + A<sup>*</sup>"),
+    ("EIN", "Ionization", "e<sup>-</sup> + A → 2e<sup>-</sup> + A<sup>+</sup>"),
+    ("CTR", "Charge Transfer", "A<sup>+</sup> + B → A + B<sup>+</sup>"),
+)
+
+
+def _charged(core, charge):
+    if charge == 0:
+        return core
+    if charge == 1:
+        return f"{core}+"
+    return f"{core}+{charge}"
+
+
+def _parse_reaction(text):
+    """Canonicalises the reaction text the same way
+    Reaction.get_or_create_from_text does. Runs in the worker processes.
+    """
+    pyvalem_reaction = PVReaction(text)
+    text_can = repr(pyvalem_reaction)
+    if text_can != text:
+        pyvalem_reaction = PVReaction(text_can)
+    reactants, products = (
+        [
+            repr(stateful_species)
+            for stoich, stateful_species in getattr(pyvalem_reaction, attr)
+            for _ in range(stoich)
+        ]
+        for attr in ("reactants", "products")
+    )
+    return (
+        text_can,
+        Reaction._get_ordered_text(pyvalem_reaction),
+        pyvalem_reaction.html,
+        pyvalem_reaction.latex,
+        reactants,
+        products,
+    )
+
+
+class SyntheticReactionDatabase:
+    """A reproducible synthetic reaction database.
+
+    Parameters
+    ----------
+    seed : int
+    n_cores : int
+        The number of distinct neutral species formulae. Each of them might appear
+        with charges 0, +1 and +2.
+    max_v, max_j : int
+        The maximal vibrational and rotational quantum numbers of the states.
+    """
+
+    def __init__(self, seed=0, n_cores=100, max_v=9, max_j=9):
+        self.seed = seed
+        self.max_v = max_v
+        self.max_j = max_j
+        rng = random.Random(seed)
+        cores, seen = [], set()
+        while len(cores) < n_cores:
+            elements = sorted(
+                rng.sample(ELEMENTS, rng.choice((1, 1, 2, 2, 3))), key=ELEMENTS.index
+            )
+            core = "".join(f"{el}{rng.choice(('', '', '2', '3'))}" for el in elements)
+            if core not in seen:
+                seen.add(core)
+                cores.append(core)
+        self.cores = cores
+
+    def _states(self, rng):
+        choice = rng.random()
+        if choice < 0.2:
+            return ""
+        if choice < 0.6:
+            return f"v={rng.randint(0, self.max_v)}"
+        return f"v={rng.randint(0, self.max_v)};J={rng.randint(0, self.max_j)}"
+
+    def _rp(self, rng, core, charge, states=None):
+        states = self._states(rng) if states is None else states
+        return " ".join(filter(None, [_charged(core, charge), states]))
+
+    def reaction_texts(self, n, start=0):
+        """Returns the list of n (not necessarily canonicalised) reaction texts
+        together with their process type abbreviations, starting with the
+        start-th reaction of the stream.
+        """
+        texts = []
+        for i in range(start, start + n):
+            rng = random.Random(f"{self.seed}-{i}")
+            core = rng.choice(self.cores)
+            charge = rng.choice((0, 0, 1))
+            kind = rng.random()
+            if kind < 0.6:
+                states_before = self._states(rng)
+                states_after = self._states(rng)
+                if states_before == states_after:
+                    states_after = f"v={self.max_v + 1 + i}"
+                text = (
+                    f"e- + {self._rp(rng, core, charge, states_before)} → "
+                    f"{self._rp(rng, core, charge, states_after)} + e-"
+                )
+                abbreviation = "EEX"
+            elif kind < 0.8:
+                text = (
+                    f"e- + {self._rp(rng, core, charge)} → "
+                    f"{_charged(core, charge + 1)} + 2e-"
+                )
+                abbreviation = "EIN"
+            else:
+                other = rng.choice(self.cores)
+                text = (
+                    f"{self._rp(rng, core, 1)} + {self._rp(rng, other, 0)} → "
+                    f"{self._rp(rng, core, 0)} + {self._rp(rng, other, 1, '')}"
+                )
+                abbreviation = "CTR"
+            texts.append((text, abbreviation))
+        return texts
+
+    @staticmethod
+    def species_aliases(species_text, species_id):
+        """Returns the synthetic aliases of a species: a fake InChIKey and, for the
+        species with more than one element, the formula with the reversed order of
+        elements.
+        """
+        letters = "".join(chr(ord("A") + int(d)) for d in f"{species_id:024d}")
+        aliases = [f"{letters[:14]}-{letters[14:]}-N"]
+        formula = Formula(species_text)
+        stoich = formula.atom_stoich
+        if len(stoich) > 1:
+            reversed_text = "".join(
+                f"{atom}{stoich[atom] if stoich[atom] > 1 else ''}"
+                for atom in sorted(stoich, reverse=True)
+            )
+            reversed_text = _charged(reversed_text, formula.charge)
+            if reversed_text != species_text:
+                aliases.append(reversed_text)
+        return aliases
+
+    def populate(
+        self,
+        scale,
+        dataset_model=None,
+        datasets_per_reaction=1,
+        chunk_size=10000,
+        processes=None,
+        aliases=True,
+    ):
+        """Loads the first `scale` reactions of the stream into the database,
+        expected to be empty.
+
+        Parameters
+        ----------
+        scale : int
+            The number of the reactions.
+        dataset_model : ReactionDataSet subclass, optional
+            If given, datasets_per_reaction instances of it are created for each
+            reaction. The model is expected to have a `json_data` text field.
+        datasets_per_reaction : int
+        chunk_size : int
+            The number of reactions parsed and loaded at a time.
+        processes : int, optional
+            The number of worker processes parsing the reactions. Defaults to the
+            number of CPUs, 1 parses in the current process.
+        aliases : bool
+            Create the species aliases returned by species_aliases.
+
+        Returns
+        -------
+        dict
+            The number of created rows, by model name.
+        """
+        process_types = {}
+        for abbreviation, description, example_html in PROCESS_TYPES:
+            process_types[abbreviation], _ = ProcessType.objects.get_or_create(
+                abbreviation=abbreviation,
+                defaults={"description": description, "example_html": example_html},
+            )
+        ProcessTypesThrough = Reaction.process_types.through
+
+        species_ids, rp_ids, reaction_texts = {}, {}, set()
+        counts = dict.fromkeys(
+            ["Species", "SpeciesAlias", "RP", "State", "Reaction", "DataSet"], 0
+        )
+        next_id = {"reaction": 1, "dataset": 1, "through": 1, "state": 1}
+
+        def get_species_id(species_text):
+            if species_text not in species_ids:
+                species_ids[species_text] = len(species_ids) + 1
+                new_species.append(species_text)
+            return species_ids[species_text]
+
+        def get_rp_id(rp_text):
+            if rp_text not in rp_ids:
+                rp_ids[rp_text] = len(rp_ids) + 1
+                new_rps.append(rp_text)
+            return rp_ids[rp_text]
+
+        pool = Pool(processes) if processes != 1 else None
+        try:
+            for start in range(0, scale, chunk_size):
+                texts = self.reaction_texts(min(chunk_size, scale - start), start)
+                if pool is not None:
+                    parsed = pool.map(_parse_reaction, [t for t, _ in texts], 256)
+                else:
+                    parsed = [_parse_reaction(t) for t, _ in texts]
+
+                new_species, new_rps = [], []
+                reactions, reactant_rows, product_rows, pt_rows = [], [], [], []
+                for (_, abbreviation), row in zip(texts, parsed):
+                    text_can, ordered_text, html, latex, reactants, products = row
+                    if text_can in reaction_texts:
+                        continue
+                    reaction_texts.add(text_can)
+                    reaction_id = next_id["reaction"]
+                    next_id["reaction"] += 1
+                    reactions.append(
+                        Reaction(
+                            id=reaction_id,
+                            text=text_can,
+                            ordered_text=ordered_text,
+                            html=html,
+                            latex=latex,
+                        )
+                    )
+                    for rp_texts, Intermediate, rows in (
+                        (reactants, ReactantList, reactant_rows),
+                        (products, ProductList, product_rows),
+                    ):
+                        for rp_text in rp_texts:
+                            rows.append(
+                                Intermediate(
+                                    reaction_id=reaction_id, rp_id=get_rp_id(rp_text)
+                                )
+                            )
+                    pt_rows.append(
+                        ProcessTypesThrough(
+                            reaction_id=reaction_id,
+                            processtype_id=process_types[abbreviation].id,
+                        )
+                    )
+
+                rps, states = [], []
+                for rp_text in new_rps:
+                    pyvalem_stateful_species = StatefulSpecies(rp_text)
+                    rp_id = rp_ids[rp_text]
+                    rps.append(
+                        RP(
+                            id=rp_id,
+                            species_id=get_species_id(
+                                repr(pyvalem_stateful_species.formula)
+                            ),
+                            text=rp_text,
+                            html=pyvalem_stateful_species.html,
+                        )
+                    )
+                    for pyvalem_state in pyvalem_stateful_species.states:
+                        states.append(
+                            State(
+                                id=next_id["state"],
+                                rp_id=rp_id,
+                                text=repr(pyvalem_state),
+                                html=pyvalem_state.html,
+                                state_type=State.STATE_TYPE_MAP[
+                                    pyvalem_state.__class__.__name__
+                                ],
+                            )
+                        )
+                        next_id["state"] += 1
+
+                species, compositions, species_aliases = [], [], []
+                for species_text in new_species:
+                    pyvalem_formula = Formula(species_text)
+                    species_id = species_ids[species_text]
+                    elements, natoms, mass = formula_composition(pyvalem_formula)
+                    species.append(
+                        Species(
+                            id=species_id,
+                            text=species_text,
+                            html=pyvalem_formula.html,
+                            charge=pyvalem_formula.charge,
+                            natoms=natoms,
+                            mass=mass,
+                        )
+                    )
+                    compositions.extend(
+                        SpeciesComposition(
+                            species_id=species_id, element=element, count=count
+                        )
+                        for element, count in elements.items()
+                    )
+                    if aliases and species_text != "e-":
+                        species_aliases.extend(
+                            SpeciesAlias(text=alias, species_id=species_id)
+                            for alias in self.species_aliases(species_text, species_id)
+                        )
+
+                datasets = []
+                if dataset_model is not None:
+                    for reaction in reactions:
+                        for j in range(datasets_per_reaction):
+                            datasets.append(
+                                dataset_model(
+                                    id=next_id["dataset"],
+                                    reaction_id=reaction.id,
+                                    json_data=json.dumps(
+                                        {"T_max": {"value": 1000 * (j + 1)}}
+                                    ),
+                                )
+                            )
+                            next_id["dataset"] += 1
+
+                Species.objects.bulk_create(species, batch_size=1000)
+                SpeciesComposition.objects.bulk_create(compositions, batch_size=1000)
+                SpeciesAlias.objects.bulk_create(
+                    species_aliases, batch_size=1000, ignore_conflicts=True
+                )
+                RP.objects.bulk_create(rps, batch_size=1000)
+                State.objects.bulk_create(states, batch_size=1000)
+                Reaction.objects.bulk_create(reactions, batch_size=1000)
+                ReactantList.objects.bulk_create(reactant_rows, batch_size=1000)
+                ProductList.objects.bulk_create(product_rows, batch_size=1000)
+                ProcessTypesThrough.objects.bulk_create(pt_rows, batch_size=1000)
+                if datasets:
+                    dataset_model.objects.bulk_create(datasets, batch_size=1000)
+
+                counts["Species"] += len(species)
+                counts["SpeciesAlias"] += len(species_aliases)
+                counts["RP"] += len(rps)
+                counts["State"] += len(states)
+                counts["Reaction"] += len(reactions)
+                counts["DataSet"] += len(datasets)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return counts
@@ -0,0 +1,9 @@
+SECRET_KEY = "dummy-secret-key"
+DEBUG = False
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+    }
+}
+# the tests app provides the concrete ReactionDataSet subclass
+INSTALLED_APPS = ["tests", "rp", "rxn", "ds", "refs"]
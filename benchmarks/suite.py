@@ -0,0 +1,326 @@
+"""The benchmarks of the django-valem ingest and lookup paths.
+
+Each benchmark is a function decorated with `benchmark`, receiving a context
+(holding the SyntheticReactionDatabase the database was populated from as `db`, its
+`seed`, the populated `scale`, the number of `samples` and the `dataset_model`) and
+timing the individual operations with the `Timer` it also receives. The database is
+shared by all the benchmarks, which run in the order they are defined here, so the
+benchmarks creating new rows come last.
+"""
+
+import io
+import os
+import random
+import statistics
+import time
+
+from django.apps import apps
+from django.db import connection, transaction
+
+from _utils.export import write_records
+from _utils.pagination import encode_cursor
+from ds.export import iter_datasets
+from ds.serialization import dumps, serialize_datasets, serialize_reactions
+from ds.snapshot import SNAPSHOT_MODELS, dump_snapshot, load_snapshot
+from rp.aliases import upsert_aliases
+from rp.models import Species, SpeciesAlias, RP
+from rxn.models import Reaction
+from rxn.network import ReactionNetwork
+
+BENCHMARKS = []
+
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS.append((name, func))
+        return func
+
+    return decorator
+
+
+class Timer:
+    """Times the operations run in its `op` blocks and counts their queries."""
+
+    def __init__(self):
+        self.times = []
+        self.queries = 0
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def op(self):
+        return _TimedOp(self)
+
+    def results(self):
+        times = sorted(self.times)
+        n = len(times)
+        if not n:
+            return {"n": 0}
+        total = sum(times)
+        return {
+            "n": n,
+            "total": total,
+            "mean": total / n,
+            "median": statistics.median(times),
+            "p95": times[min(n - 1, int(0.95 * n))],
+            "min": times[0],
+            "max": times[-1],
+            "ops_per_s": n / total if total else None,
+            "queries_per_op": self.queries / n,
+        }
+
+
+class _TimedOp:
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self.timer._count_query)
+        self._wrapper.__enter__()
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timer.times.append(time.perf_counter() - self._start)
+        self._wrapper.__exit__(*exc_info)
+
+
+def _sample(population, k, seed):
+    population = list(population)
+    return random.Random(seed).sample(population, min(k, len(population)))
+
+
+def _sample_reaction_texts(ctx):
+    indices = _sample(range(ctx.scale), ctx.samples, ctx.seed)
+    return [ctx.db.reaction_texts(1, start=i)[0] for i in indices]
+
+
+def _sample_ids(model, k, seed):
+    max_id = model.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    ids = _sample(range(1, max_id + 1), k, seed)
+    return list(model.objects.filter(id__in=ids).values_list("id", flat=True))
+
+
+@benchmark("species.get_from_text")
+def bench_species_get(ctx, timer):
+    texts = Species.objects.filter(
+        id__in=_sample_ids(Species, ctx.samples, ctx.seed)
+    ).values_list("text", flat=True)
+    for text in texts:
+        with timer.op():
+            Species.get_from_text(text)
+
+
+@benchmark("rp.get_from_text")
+def bench_rp_get(ctx, timer):
+    texts = RP.objects.filter(
+        id__in=_sample_ids(RP, ctx.samples, ctx.seed)
+    ).values_list("text", flat=True)
+    for text in texts:
+        with timer.op():
+            RP.get_from_text(text)
+
+
+@benchmark("reaction.get_from_text")
+def bench_reaction_get(ctx, timer):
+    for text, abbreviation in _sample_reaction_texts(ctx):
+        with timer.op():
+            Reaction.get_from_text(text, process_type_abbreviations=(abbreviation,))
+
+
+@benchmark("reaction.all_from_text")
+def bench_reaction_all(ctx, timer):
+    for text, _ in _sample_reaction_texts(ctx):
+        with timer.op():
+            list(Reaction.all_from_text(text))
+
+
+@benchmark("rp.filter_from_text.wildcard")
+def bench_rp_filter_wildcard(ctx, timer):
+    # the bare species formula matches its RPs in all the states
+    texts = (
+        Species.objects.filter(id__in=_sample_ids(Species, ctx.samples, ctx.seed))
+        .exclude(text="e-")
+        .values_list("text", flat=True)
+    )
+    for text in texts:
+        with timer.op():
+            list(RP.filter_from_text(text))
+
+
+@benchmark("rp.filter_from_text.alias")
+def bench_rp_filter_alias(ctx, timer):
+    texts = SpeciesAlias.objects.filter(
+        id__in=_sample_ids(SpeciesAlias, ctx.samples, ctx.seed)
+    ).values_list("text", flat=True)
+    for text in texts:
+        with timer.op():
+            list(RP.filter_from_text(text))
+
+
+@benchmark("reaction.keyset_page")
+def bench_reaction_keyset_page(ctx, timer):
+    # the pages starting deep in the table cost the same as the first one
+    reactions = Reaction.objects.filter(
+        id__in=_sample_ids(Reaction, ctx.samples, ctx.seed)
+    ).values_list("ordered_text", "id")
+    for values in reactions:
+        cursor = encode_cursor("n", values)
+        with timer.op():
+            list(Reaction.objects.keyset_page(cursor, per_page=50))
+
+
+@benchmark("network.load")
+def bench_network_load(ctx, timer):
+    with timer.op():
+        ReactionNetwork.load()
+
+
+@benchmark("network.distances")
+def bench_network_distances(ctx, timer):
+    network = ReactionNetwork.load()
+    electron = Species.objects.get(text="e-")
+    for species_id in _sample_ids(Species, ctx.samples, ctx.seed):
+        if species_id not in network.node_ids:
+            continue
+        with timer.op():
+            network.distances(species_id, ubiquitous=[electron])
+
+
+@benchmark("dataset.export")
+def bench_dataset_export(ctx, timer):
+    with open(os.devnull, "w") as fo:
+        with timer.op():
+            write_records(iter_datasets(ctx.dataset_model), fo, "ndjson")
+
+
+def _sample_pages(model, ctx, per_page=50):
+    # pages of per_page rows starting at sampled ids
+    return [
+        model.objects.filter(id__gte=first_id).order_by("id")[:per_page]
+        for first_id in _sample_ids(model, ctx.samples, ctx.seed)
+    ]
+
+
+def _orm_rp_record(rp):
+    return {
+        "id": rp.id,
+        "text": rp.text,
+        "html": rp.html,
+        "species_id": rp.species_id,
+        "charge": rp.species.charge,
+        "states": [
+            {"text": state.text, "html": state.html}
+            for state in rp.state_set.order_by("id")
+        ],
+    }
+
+
+def _orm_reaction_records(reactions):
+    # the naive serialisation walking the relations of every instance
+    return [
+        {
+            "id": reaction.id,
+            "text": reaction.text,
+            "html": reaction.html,
+            "latex": reaction.latex,
+            "comment": reaction.comment,
+            "process_types": [
+                process_type.abbreviation
+                for process_type in reaction.process_types.order_by("abbreviation")
+            ],
+            "reactants": [
+                _orm_rp_record(rp) for rp in reaction.reactants.order_by("reactantlist")
+            ],
+            "products": [
+                _orm_rp_record(rp) for rp in reaction.products.order_by("productlist")
+            ],
+        }
+        for reaction in reactions
+    ]
+
+
+@benchmark("serialization.reactions.orm")
+def bench_serialize_reactions_orm(ctx, timer):
+    for page in _sample_pages(Reaction, ctx):
+        with timer.op():
+            dumps(_orm_reaction_records(page))
+
+
+@benchmark("serialization.reactions")
+def bench_serialize_reactions(ctx, timer):
+    for page in _sample_pages(Reaction, ctx):
+        with timer.op():
+            dumps(serialize_reactions(page))
+
+
+@benchmark("serialization.datasets")
+def bench_serialize_datasets(ctx, timer):
+    for page in _sample_pages(ctx.dataset_model, ctx):
+        with timer.op():
+            dumps(serialize_datasets(page))
+
+
+@benchmark("snapshot.dump")
+def bench_snapshot_dump(ctx, timer):
+    with timer.op():
+        dump_snapshot(io.BytesIO())
+
+
+@benchmark("snapshot.load")
+def bench_snapshot_load(ctx, timer):
+    stream = io.BytesIO()
+    dump_snapshot(stream)
+    # loaded into the emptied tables, and rolled back
+    with transaction.atomic():
+        for label in reversed(SNAPSHOT_MODELS):
+            model = apps.get_model(label)
+            model._base_manager.all()._raw_delete(connection.alias)
+        stream.seek(0)
+        with timer.op():
+            load_snapshot(stream)
+        transaction.set_rollback(True)
+
+
+@benchmark("alias.upsert")
+def bench_alias_upsert(ctx, timer):
+    # 10 new synonyms per species, then their update, rolled back
+    texts = list(Species.objects.values_list("text", flat=True))
+    rows = [(f"{text} synonym {i}", text) for text in texts for i in range(10)]
+    with transaction.atomic():
+        with timer.op():
+            upsert_aliases(rows)
+        with timer.op():
+            upsert_aliases([(alias, texts[0]) for alias, _ in rows], update=True)
+        transaction.set_rollback(True)
+
+
+@benchmark("dataset.bulk_ingest")
+def bench_dataset_bulk_ingest(ctx, timer):
+    entries = [
+        {"reaction": text, "process_types": (abbreviation,), "json_data": "{}"}
+        for text, abbreviation in _sample_reaction_texts(ctx)
+    ]
+    with timer.op():
+        ctx.dataset_model.bulk_ingest(entries)
+
+
+@benchmark("reaction.get_or_create_from_text.single")
+def bench_reaction_create_single(ctx, timer):
+    for text, abbreviation in ctx.db.reaction_texts(ctx.samples, start=ctx.scale):
+        with timer.op():
+            Reaction.get_or_create_from_text(
+                text, process_type_abbreviations=(abbreviation,)
+            )
+
+
+@benchmark("reaction.get_or_create_from_text.bulk")
+def bench_reaction_create_bulk(ctx, timer):
+    # the same operation repeated within a single transaction
+    texts = ctx.db.reaction_texts(ctx.samples, start=ctx.scale + ctx.samples)
+    with transaction.atomic():
+        for text, abbreviation in texts:
+            with timer.op():
+                Reaction.get_or_create_from_text(
+                    text, process_type_abbreviations=(abbreviation,)
+                )
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import django
+from django.test.utils import setup_databases, teardown_databases
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Prints the ratio of the mean times of the benchmarks to the baseline ones."""
+    print(f"\nComparison with {baseline['commit']} (scale {baseline['scale']}):")
+    for name, result in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if not base or not base.get("n") or not result.get("n"):
+            continue
+        ratio = result["mean"] / base["mean"]
+        print(f"  {name:45s} {ratio:6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the django-valem benchmarks.")
+    parser.add_argument("--scale", type=int, default=1000, help="number of reactions")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--only", nargs="*", help="run only the benchmarks given")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results to compare against")
+    args = parser.parse_args()
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = "benchmarks.settings"
+    django.setup()
+
+    from benchmarks.generator import SyntheticReactionDatabase
+    from benchmarks.suite import BENCHMARKS, Timer
+    from tests.models import MyReactionDataSet
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        db = SyntheticReactionDatabase(
+            seed=args.seed, n_cores=max(20, args.scale // 20)
+        )
+        start = time.perf_counter()
+        counts = db.populate(
+            args.scale, dataset_model=MyReactionDataSet, processes=args.processes
+        )
+        populate_time = time.perf_counter() - start
+        print(f"Populated in {populate_time:.1f} s: {counts}")
+
+        ctx = SimpleNamespace(
+            db=db,
+            seed=args.seed,
+            scale=args.scale,
+            samples=args.samples,
+            dataset_model=MyReactionDataSet,
+        )
+        benchmarks = {}
+        for name, func in BENCHMARKS:
+            if args.only and name not in args.only:
+                continue
+            timer = Timer()
+            func(ctx, timer)
+            benchmarks[name] = timer.results()
+            print(
+                f"  {name:45s} n={benchmarks[name]['n']:<6d} "
+                f"mean={benchmarks[name].get('mean', 0) * 1e3:8.3f} ms"
+            )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    results = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "django": django.__version__,
+        "scale": args.scale,
+        "samples": args.samples,
+        "seed": args.seed,
+        "populate": {"time": populate_time, "rows": counts},
+        "benchmarks": benchmarks,
+    }
+    if args.output:
+        with open(args.output, "w") as fo:
+            json.dump(results, fo, indent=2)
+    if args.compare:
+        with open(args.compare) as fi:
+            compare(results, json.load(fi))
+    sys.exit(0)
@@ -36,12 +36,17 @@ setup(
     keywords="django, chemistry, formula, species, state, reaction",
     package_dir={"": "src"},
     packages=find_packages(where="src"),
+    package_data={"rp": ["templates/admin/*.html"]},
     python_requires=">=3.6",
     install_requires=[
         "pyvalem>=2.5.9",
         "django-pyref>=0.5.1",
     ],
-    extras_require={"dev": ["black", "coverage", "django==3", "ipython"]},
+    extras_require={
+        "dev": ["black", "coverage", "django==3", "ipython", "numpy"],
+        "numpy": ["numpy"],
+        "json": ["orjson"],
+    },
     project_urls={
         "Bug Reports": "https://github.com/xnx/django-valem/issues",
     },
@@ -0,0 +1,96 @@
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.forms.models import BaseInlineFormSet
+
+from .pagination import EstimatedCountPaginator, InvalidCursor, keyset_page
+
+CURSOR_VAR = "cursor"
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """A ModelAdmin for the large tables: the changelist neither counts all the
+    rows of the table, nor exactly counts the unfiltered queryset if it is large.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class KeysetChangeList(ChangeList):
+    """A ChangeList paginated with the keyset cursors instead of the page numbers,
+    in the keyset_ordering of the model.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        if self.cursor is None:
+            super().__init__(request, *args, **kwargs)
+            return
+        # the cursor is not a filter of the queryset
+        params = request.GET
+        request.GET = params.copy()
+        del request.GET[CURSOR_VAR]
+        try:
+            super().__init__(request, *args, **kwargs)
+        finally:
+            request.GET = params
+
+    def get_results(self, request):
+        try:
+            page = keyset_page(self.queryset, self.cursor, self.list_per_page)
+        except InvalidCursor:
+            page = keyset_page(self.queryset, None, self.list_per_page)
+        self.page = page
+        self.result_list = page.object_list
+        self.result_count = len(page)
+        # no counts, which would scan the whole queryset
+        self.full_result_count = self.result_count
+        self.show_all = self.can_show_all = False
+        self.multi_page = page.has_other_pages()
+        self.paginator = None
+
+    def cursor_url(self, cursor):
+        return self.get_query_string({CURSOR_VAR: cursor})
+
+    @property
+    def next_url(self):
+        if self.page.has_next():
+            return self.cursor_url(self.page.next_cursor)
+        return None
+
+    @property
+    def previous_url(self):
+        if self.page.has_previous():
+            return self.cursor_url(self.page.previous_cursor)
+        return None
+
+
+class KeysetModelAdmin(ScalableModelAdmin):
+    """A ScalableModelAdmin whose changelist costs the same for every page, see
+    KeysetChangeList.
+    """
+
+    change_list_template = "admin/keyset_change_list.html"
+    # the rows are always in the keyset_ordering of the model, whatever the
+    # ordering parameter of the changelist URL, so the columns are not sortable
+    sortable_by = ()
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class BoundedInlineFormSet(BaseInlineFormSet):
+    """An inline formset showing at most max_objects of the related objects."""
+
+    max_objects = 50
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            self._queryset = super().get_queryset()[: self.max_objects]
+        return self._queryset
+
+
+class BoundedTabularInline(admin.TabularInline):
+    formset = BoundedInlineFormSet
+    extra = 0
@@ -0,0 +1,49 @@
+from django.db import connections, router
+
+
+def can_bulk_return_pks(using):
+    """Returns True if the backend of the database alias sets the primary keys of
+    the rows inserted with bulk_create (the can_return_ids_from_bulk_insert
+    feature of the django versions before 3.0)."""
+    features = connections[using].features
+    return getattr(
+        features,
+        "can_return_rows_from_bulk_insert",
+        getattr(features, "can_return_ids_from_bulk_insert", False),
+    )
+
+
+def can_bulk_upsert(using):
+    """Returns True if bulk_create can update the rows conflicting on a unique
+    field (the update_conflicts of django 4.1) on the database alias."""
+    return getattr(
+        connections[using].features, "supports_update_conflicts_with_target", False
+    )
+
+
+def bulk_create_with_pks(model, objs, batch_size=None, using=None):
+    """Creates the objs with bulk_create and makes sure their primary keys are set.
+
+    Backends which cannot return the primary keys of the rows inserted in bulk (e.g.
+    SQLite before 3.35 or django before 4.0) fall back to saving one object at a
+    time.
+
+    Parameters
+    ----------
+    model : Model class
+    objs : iterable of model instances
+    batch_size : int, optional
+    using : str, optional
+        The database alias, defaults to the routed write database.
+
+    Returns
+    -------
+    list of model instances
+    """
+    objs = list(objs)
+    using = using or router.db_for_write(model)
+    if can_bulk_return_pks(using):
+        return model.objects.using(using).bulk_create(objs, batch_size=batch_size)
+    for obj in objs:
+        obj.save(force_insert=True, using=using)
+    return objs
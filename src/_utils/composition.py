@@ -0,0 +1,38 @@
+"""The elemental composition of the species formulas.
+
+The composition of a Species is stored in the rp.SpeciesComposition table, one
+(species, element, count) row per element, and its total number of atoms and its
+mass in the indexed natoms and mass columns of the Species, so that the species can
+be selected by their atoms in SQL (see rp.models.SpeciesQuerySet). The isotopes are
+counted as their element, e.g. (13C)O2 has {"C": 1, "O": 2}, and D2O has {"H": 2,
+"O": 1}.
+"""
+
+import re
+from collections import Counter
+
+from pyvalem.formula import Formula
+
+_MASS_NUMBER = re.compile(r"^\d+")
+
+
+def formula_composition(pyvalem_formula):
+    """Returns the (counts, natoms, mass) of the pyvalem Formula, counts being the
+    dict of the numbers of its atoms by element symbol, natoms their sum (0 for e.g.
+    the electron or the photon) and mass its relative molecular mass (None for the
+    formulas without one, e.g. M).
+    """
+    counts = Counter()
+    for symbol, n in pyvalem_formula.atom_stoich.items():
+        counts[_MASS_NUMBER.sub("", symbol)] += n
+    return dict(counts), sum(counts.values()), pyvalem_formula.rmm
+
+
+def text_composition(text):
+    """Returns the (counts, natoms, mass) of the formula text, or None if pyvalem
+    cannot parse it."""
+    # pyvalem raises many exception classes without a common base class
+    try:
+        return formula_composition(Formula(text))
+    except Exception:
+        return None
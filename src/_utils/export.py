@@ -0,0 +1,97 @@
+"""Incremental writers of the exported records.
+
+The records are plain dicts, as yielded by rxn.export.iter_reactions and
+ds.export.iter_datasets, written one at a time so that exports of any size run in
+constant memory.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+
+class RecordEncoder(DjangoJSONEncoder):
+    """Also encodes the NumPy arrays of the Float64ArrayField values."""
+
+    def default(self, o):
+        if hasattr(o, "tolist"):
+            return o.tolist()
+        return super().default(o)
+
+
+class NDJSONWriter:
+    """Writes the records as newline-delimited JSON, one record per line."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._encoder = RecordEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def write(self, record):
+        self.stream.write(self._encoder.encode(record) + "\n")
+
+
+def _flatten_value(value):
+    if hasattr(value, "tolist"):
+        # the NumPy arrays, which str() would truncate, as (nested) lists of floats
+        # written in full precision
+        value = value.tolist()
+    if isinstance(value, dict):
+        return value.get("text", value.get("id"))
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(_flatten_value(item)) for item in value)
+    return value
+
+
+class CSVWriter:
+    """Writes the records as CSV. The columns are the keys of the first record,
+    nested records are represented by their text (or id) and lists (and the
+    NumPy arrays, flattened) are joined with semicolons.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._writer = None
+
+    def write(self, record):
+        if self._writer is None:
+            self._writer = csv.DictWriter(
+                self.stream, fieldnames=list(record), extrasaction="ignore"
+            )
+            self._writer.writeheader()
+        self._writer.writerow({k: _flatten_value(v) for k, v in record.items()})
+
+
+def write_records(records, stream, export_format="ndjson"):
+    """Writes the records to the text stream in export_format, one at a time.
+
+    Returns
+    -------
+    int
+        The number of records written.
+    """
+    if export_format == "ndjson":
+        writer = NDJSONWriter(stream)
+    elif export_format == "csv":
+        writer = CSVWriter(stream)
+    else:
+        raise ValueError(f"Unknown export format: {export_format!r}")
+    n = 0
+    for record in records:
+        writer.write(record)
+        n += 1
+    return n
+
+
+def chunked(iterable, chunk_size):
+    """Yields lists of up to chunk_size successive items of the iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,170 @@
+"""Compact binary storage of float64 arrays.
+
+Float64ArrayField stores a NumPy array of any shape as a binary blob: a short
+header (magic bytes, format version, flags, number of dimensions and the shape)
+followed by the little-endian float64 values in C order, optionally zlib-compressed.
+Reading an uncompressed blob returns a read-only np.frombuffer view of the bytes
+fetched from the database, without any copying or intermediate Python lists.
+
+NumPy is an optional dependency of django-valem, only needed by the models using
+these fields: pip install django-valem[numpy].
+"""
+
+import base64
+import json
+import struct
+import zlib
+
+from django.db import migrations, models
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+_MAGIC = b"VA"
+_VERSION = 1
+_COMPRESSED = 0x01
+_HEADER = struct.Struct("<2sBBB")  # magic, version, flags, ndim
+_DIM = struct.Struct("<I")
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            "numpy is required for Float64ArrayField: pip install django-valem[numpy]"
+        )
+
+
+def encode_array(value, compress=False, compression_level=6):
+    """Returns the blob representation of the array-like value."""
+    _require_numpy()
+    array = np.asarray(value, dtype="<f8")
+    data = array.tobytes(order="C")
+    flags = 0
+    if compress:
+        data = zlib.compress(data, compression_level)
+        flags |= _COMPRESSED
+    header = _HEADER.pack(_MAGIC, _VERSION, flags, array.ndim)
+    shape = b"".join(_DIM.pack(n) for n in array.shape)
+    return header + shape + data
+
+
+def decode_array(blob):
+    """Returns the (read-only) float64 array represented by the blob."""
+    _require_numpy()
+    magic, version, flags, ndim = _HEADER.unpack_from(blob)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("Not a Float64ArrayField blob.")
+    offset = _HEADER.size
+    shape = tuple(
+        _DIM.unpack_from(blob, offset + i * _DIM.size)[0] for i in range(ndim)
+    )
+    offset += ndim * _DIM.size
+    if flags & _COMPRESSED:
+        blob, offset = zlib.decompress(memoryview(blob)[offset:]), 0
+    return np.frombuffer(blob, dtype="<f8", offset=offset).reshape(shape)
+
+
+class Float64ArrayField(models.BinaryField):
+    """A model field storing a float64 NumPy array of any shape.
+
+    Parameters
+    ----------
+    compress : bool
+        zlib-compress the stored values. This trades the zero-copy reads for
+        (typically several times) smaller rows, which pays off for large and smooth
+        tables.
+    compression_level : int
+    """
+
+    description = "float64 array"
+
+    def __init__(self, *args, compress=False, compression_level=6, **kwargs):
+        _require_numpy()
+        self.compress = compress
+        self.compression_level = compression_level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.compress:
+            kwargs["compress"] = True
+        if self.compression_level != 6:
+            kwargs["compression_level"] = self.compression_level
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decode_array(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, np.ndarray):
+            return value
+        if isinstance(value, (list, tuple)):
+            return np.asarray(value, dtype="<f8")
+        return decode_array(super().to_python(value))
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, (bytes, memoryview)):
+            return value
+        return encode_array(value, self.compress, self.compression_level)
+
+    def value_to_string(self, obj):
+        value = self.get_prep_value(self.value_from_object(obj))
+        return None if value is None else base64.b64encode(value).decode("ascii")
+
+
+def _convert_rows(manager, source_field, target_field, convert, batch_size=1000):
+    """Sets target_field to convert(source_field value) for all the rows with
+    the source_field value set, skipping those for which convert returns None.
+    """
+    model = manager.model
+    rows = manager.exclude(**{f"{source_field}__isnull": True}).values_list(
+        "pk", source_field
+    )
+    batch = []
+    for pk, value in rows.iterator(chunk_size=batch_size):
+        value = convert(value)
+        if value is None:
+            continue
+        batch.append(model(pk=pk, **{target_field: value}))
+        if len(batch) == batch_size:
+            manager.bulk_update(batch, [target_field])
+            batch = []
+    if batch:
+        manager.bulk_update(batch, [target_field])
+
+
+def json_to_array_migration(app_label, model_name, json_field, array_field, key=None):
+    """Returns a RunPython migration operation converting the values of the JSON
+    text column json_field into the Float64ArrayField array_field of the same model
+    (which must already exist), in batches. If key is given, the array is read from
+    that key of the decoded JSON object (and the reverse operation writes {key: array}
+    objects).
+    """
+
+    def to_array(text):
+        value = json.loads(text) if text else None
+        if key is not None and value is not None:
+            value = value.get(key)
+        return None if value is None else np.asarray(value, dtype="<f8")
+
+    def to_json(array):
+        value = array.tolist()
+        return json.dumps(value if key is None else {key: value})
+
+    def get_manager(apps, schema_editor):
+        model = apps.get_model(app_label, model_name)
+        return model._default_manager.db_manager(schema_editor.connection.alias)
+
+    def forwards(apps, schema_editor):
+        manager = get_manager(apps, schema_editor)
+        _convert_rows(manager, json_field, array_field, to_array)
+
+    def backwards(apps, schema_editor):
+        manager = get_manager(apps, schema_editor)
+        _convert_rows(manager, array_field, json_field, to_json)
+
+    return migrations.RunPython(forwards, backwards)
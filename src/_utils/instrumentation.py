@@ -0,0 +1,236 @@
+"""Opt-in instrumentation of the django-valem hot paths.
+
+The classmethods decorated with `instrumented` record, per method, the number of
+calls, a latency histogram, the number of SQL queries issued and the time spent
+parsing the text with pyvalem. Nothing is recorded (and the overhead is a single
+flag check) unless either the VALEM_INSTRUMENTATION setting is True, in which case
+the process-wide `stats` object is populated, or the calls run inside the
+`collect_stats` context manager:
+
+    with collect_stats() as stats:
+        RP.get_or_create_from_text("H2+ v=1")
+    stats["RP.get_or_create_from_text"].queries
+
+Query counts and parse times are inclusive, so nested instrumented calls (e.g.
+Species.get_or_create_from_text called from RP.get_or_create_from_text) count
+towards both methods.
+"""
+
+import functools
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+# Upper bounds (in seconds) of the latency histogram buckets. The last bucket
+# collects everything slower than the last bound.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+
+class MethodStats:
+    """Accumulated statistics for a single instrumented method."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.queries = 0
+        self.parse_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def __repr__(self):
+        return f"<MethodStats {self.name}: {self.calls} calls>"
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.calls if self.calls else 0.0
+
+    @property
+    def mean_queries(self):
+        return self.queries / self.calls if self.calls else 0.0
+
+    def record(self, elapsed, queries, parse_time, failed=False):
+        self.calls += 1
+        self.errors += bool(failed)
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.queries += queries
+        self.parse_time += parse_time
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                break
+        else:
+            i = len(LATENCY_BUCKETS)
+        self.histogram[i] += 1
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_time": self.total_time,
+            "mean_time": self.mean_time,
+            "max_time": self.max_time,
+            "queries": self.queries,
+            "parse_time": self.parse_time,
+            "histogram": dict(
+                zip([str(b) for b in LATENCY_BUCKETS] + ["inf"], self.histogram)
+            ),
+        }
+
+
+class Stats:
+    """A thread-safe collection of MethodStats, keyed by the method name, e.g.
+    "Species.get_or_create_from_text".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+
+    def __getitem__(self, name):
+        return self._methods[name]
+
+    def __contains__(self, name):
+        return name in self._methods
+
+    def __iter__(self):
+        return iter(sorted(self._methods))
+
+    def __len__(self):
+        return len(self._methods)
+
+    def get(self, name):
+        return self._methods.get(name)
+
+    def record(self, name, elapsed, queries, parse_time, failed=False):
+        with self._lock:
+            try:
+                method_stats = self._methods[name]
+            except KeyError:
+                method_stats = self._methods[name] = MethodStats(name)
+            method_stats.record(elapsed, queries, parse_time, failed)
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+
+    def as_dict(self):
+        with self._lock:
+            return {name: self._methods[name].as_dict() for name in self}
+
+
+# The process-wide statistics, populated if settings.VALEM_INSTRUMENTATION is True.
+stats = Stats()
+
+_local = threading.local()
+
+
+def _collectors():
+    try:
+        return _local.collectors
+    except AttributeError:
+        _local.collectors = []
+        _local.frames = []
+        return _local.collectors
+
+
+def _is_enabled():
+    return bool(_collectors()) or getattr(settings, "VALEM_INSTRUMENTATION", False)
+
+
+@contextmanager
+def collect_stats():
+    """Enables the instrumentation in the current thread for the duration of the
+    block and yields a fresh Stats instance collecting the calls made inside it.
+    """
+    collector = Stats()
+    collectors = _collectors()
+    collectors.append(collector)
+    try:
+        yield collector
+    finally:
+        collectors.remove(collector)
+
+
+class _Frame:
+    """The counters of a single instrumented call in progress."""
+
+    def __init__(self):
+        self.queries = 0
+        self.parse_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Used as a database execute wrapper, counting the executed queries.
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def parse_timer():
+    """Attributes the time spent in the block to the pyvalem parse time of all the
+    instrumented calls in progress in the current thread.
+    """
+    if not _is_enabled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for frame in _local.frames:
+            frame.parse_time += elapsed
+
+
+def instrumented(method):
+    """Decorator recording the calls of a classmethod, to be applied underneath
+    the classmethod decorator. The calls are recorded under "<cls>.<method>", so
+    inherited classmethods are recorded separately for each subclass.
+    """
+
+    @functools.wraps(method)
+    def wrapper(cls, *args, **kwargs):
+        if not _is_enabled():
+            return method(cls, *args, **kwargs)
+
+        frame = _Frame()
+        frames = _local.frames
+        frames.append(frame)
+        failed = False
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(frame))
+                return method(cls, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            frames.pop()
+            name = f"{cls.__name__}.{method.__name__}"
+            targets = list(_local.collectors)
+            if getattr(settings, "VALEM_INSTRUMENTATION", False):
+                targets.append(stats)
+            for target in targets:
+                target.record(name, elapsed, frame.queries, frame.parse_time, failed)
+
+    return wrapper
@@ -0,0 +1,71 @@
+"""The deferred markup ingest mode.
+
+Rendering the html and latex markup of the Species, RPs, States and Reactions with
+pyvalem takes a large share of the time of their get_or_create_from_text
+classmethods. Inside the deferred_markup context manager, the new rows are created
+with their canonical text only and empty markup, and flagged with markup_pending
+(see MarkupPendingMixin), which saves a pyvalem parse per new Species and Reaction:
+
+    with deferred_markup():
+        for text in texts:
+            Reaction.get_or_create_from_text(text)
+
+The pending markup is then rendered by rxn.markup.render_pending_markup (or the
+render_markup management command), in batches.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from pyvalem.formula import Formula
+from pyvalem.reaction import Reaction as PVReaction
+from pyvalem.reaction import ReactionParseError
+from pyvalem.stateful_species import StatefulSpecies
+
+
+class _State(threading.local):
+    depth = 0
+
+
+_state = _State()
+
+
+@contextmanager
+def deferred_markup():
+    """Defers the markup of the rows created in this thread within the block."""
+    _state.depth += 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+
+
+def markup_deferred():
+    """Returns True inside a deferred_markup block."""
+    return _state.depth > 0
+
+
+def render_markup(item):
+    """Returns the markup field values of the (kind, text) item, kind being one of
+    "species", "rp" and "reaction", or None if pyvalem cannot parse the text. The
+    values of an "rp" include the html of its states, by their text. Runs in the
+    worker processes of rxn.markup.render_pending_markup.
+    """
+    kind, text = item
+    # pyvalem raises many exception classes without a common base class
+    try:
+        if kind == "species":
+            return {"html": Formula(text).html}
+        if kind == "rp":
+            stateful_species = StatefulSpecies(text)
+            return {
+                "html": stateful_species.html,
+                "states": {repr(s): s.html for s in stateful_species.states},
+            }
+        try:
+            pyvalem_reaction = PVReaction(text)
+        except ReactionParseError:
+            pyvalem_reaction = PVReaction(text, strict=False)
+        return {"html": pyvalem_reaction.html, "latex": pyvalem_reaction.latex}
+    except Exception:
+        return None
@@ -1,6 +1,8 @@
 from django.db import models
 from django.db import models
 
+from .pagination import KeysetQuerySet
+
 
 # noinspection PyUnresolvedReferences
 class QualifiedIDMixin:
@@ -17,8 +19,46 @@ class QualifiedIDMixin:
 
 class ProvenanceMixin(models.Model):
     added_by_user_id = models.IntegerField(null=True, blank=True)
-    time_added = models.DateTimeField(auto_now_add=True)
-    time_modified = models.DateTimeField(auto_now=True)
+    time_added = models.DateTimeField(auto_now_add=True, db_index=True)
+    time_modified = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         abstract = True
+
+
+class MarkupPendingMixin(models.Model):
+    """Flags the rows created with their html (and latex) markup deferred, see
+    _utils.markup.deferred_markup."""
+
+    # the markup columns, deferred by LeanQuerySet.lean
+    markup_fields = ("html",)
+
+    markup_pending = models.BooleanField(default=False, db_index=True)
+
+    class Meta:
+        abstract = True
+
+
+class LeanQuerySet(models.QuerySet):
+    """A QuerySet with the lean method, deferring the wide markup columns."""
+
+    def lean(self, *related):
+        """Defers the markup_fields of the model and of the related models (given
+        by their select_related lookups), for the queries which only need the ids
+        and texts. The deferred fields are still loaded on access, one query per
+        instance.
+        """
+        fields = list(getattr(self.model, "markup_fields", ()))
+        for lookup in related:
+            related_model = self.model
+            for name in lookup.split("__"):
+                related_model = related_model._meta.get_field(name).related_model
+            fields.extend(
+                f"{lookup}__{field}"
+                for field in getattr(related_model, "markup_fields", ())
+            )
+        return self.defer(*fields)
+
+
+class LeanKeysetQuerySet(LeanQuerySet, KeysetQuerySet):
+    """A QuerySet with both the lean and the keyset_page methods."""
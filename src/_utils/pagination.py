@@ -0,0 +1,215 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.core.paginator import InvalidPage, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+
+def estimated_count(queryset):
+    """Returns a cheap estimate of the number of rows of an unfiltered queryset,
+    or None if no estimate is available (filtered querysets, unknown backends).
+
+    PostgreSQL and MySQL estimates are read from the table statistics. Elsewhere,
+    the maximal value of an integer primary key is used: only an upper bound, which
+    overestimates the count by the number of the deleted rows, so that it is only
+    worth using for the large tables, as EstimatedCountPaginator does.
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.low_mark or query.high_mark:
+        return None
+    model = queryset.model
+    connection = connections[queryset.db]
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+        params = [connection.ops.quote_name(table)]
+    elif connection.vendor == "mysql":
+        sql = (
+            "SELECT table_rows FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s"
+        )
+        params = [table]
+    elif model._meta.pk.get_internal_type() in (
+        "AutoField",
+        "BigAutoField",
+        "SmallAutoField",
+    ):
+        return (
+            model._default_manager.using(queryset.db).aggregate(max_pk=Max("pk"))[
+                "max_pk"
+            ]
+            or 0
+        )
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        # never analysed table
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """A Paginator avoiding the full COUNT(*) of large unfiltered querysets.
+
+    If the estimated number of rows is above the estimate_threshold, the estimate
+    is used as the count, otherwise the exact count is done as usual.
+    """
+
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, "query"):
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate > self.estimate_threshold:
+                return estimate
+        return super().count
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(direction, values):
+    """Returns the opaque (URL-safe) cursor of the keyset values, pointing at the
+    page after them (direction "n") or before them (direction "p").
+    """
+    data = json.dumps([direction, list(values)], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(data.encode()).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns the (direction, values) tuple encoded in the cursor."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor.")
+    if direction not in ("n", "p") or not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor.")
+    return direction, values
+
+
+def _seek_filter(ordering, values, after):
+    """Returns the Q object selecting the rows after (or before) the keyset values
+    in the ordering, as a lexicographic comparison expanded so that its leading
+    condition bounds the range scan of the index on the ordering fields:
+
+        a >= x AND (a > x OR (a = x AND b > y))
+    """
+    q = None
+    for field, value in reversed(list(zip(ordering, values))):
+        descending = field.startswith("-")
+        name = field.lstrip("-")
+        op = "lt" if descending == after else "gt"
+        strict = Q(**{f"{name}__{op}": value})
+        q = strict if q is None else strict | (Q(**{name: value}) & q)
+    first = ordering[0].lstrip("-")
+    op = "lte" if ordering[0].startswith("-") == after else "gte"
+    return Q(**{f"{first}__{op}": values[0]}) & q
+
+
+class KeysetPage(Sequence):
+    """A page of a keyset pagination, with the cursors of the neighbouring pages
+    (None if there are none).
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f"<KeysetPage of {len(self)} objects>"
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_page(queryset, cursor=None, per_page=50, ordering=None):
+    """Returns the KeysetPage of the queryset following (or preceding) the cursor,
+    the first page if it is None.
+
+    Unlike the OFFSET pagination, every page is fetched by a single range scan of
+    the index on the ordering fields, whose cost does not depend on how deep the
+    page is. The ordering must be unique (end with the primary key) and should
+    be covered by an index.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+    cursor : str, optional
+        The next_cursor or previous_cursor of another page.
+    per_page : int
+    ordering : sequence of str, optional
+        The ordering field names, with the "-" prefix for the descending ones,
+        defaults to the keyset_ordering attribute of the model or ("pk",).
+
+    Returns
+    -------
+    KeysetPage
+
+    Raises
+    ------
+    InvalidCursor
+    """
+    if ordering is None:
+        ordering = getattr(queryset.model, "keyset_ordering", ("pk",))
+    ordering = list(ordering)
+    direction, values = decode_cursor(cursor) if cursor else ("n", None)
+    if values is not None and len(values) != len(ordering):
+        raise InvalidCursor("Invalid cursor.")
+
+    forwards = direction == "n"
+    if values is not None:
+        queryset = queryset.filter(_seek_filter(ordering, values, after=forwards))
+    if not forwards:
+        # walk backwards from the cursor, and reverse the fetched rows
+        ordering = [f[1:] if f.startswith("-") else f"-{f}" for f in ordering]
+    rows = list(queryset.order_by(*ordering)[: per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forwards:
+        rows.reverse()
+        ordering = [f[1:] if f.startswith("-") else f"-{f}" for f in ordering]
+
+    def key(row):
+        names = [f.lstrip("-") for f in ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+        return [getattr(row, name) for name in names]
+
+    has_next = more if forwards else values is not None
+    has_previous = values is not None if forwards else more
+    return KeysetPage(
+        rows,
+        encode_cursor("n", key(rows[-1])) if rows and has_next else None,
+        encode_cursor("p", key(rows[0])) if rows and has_previous else None,
+    )
+
+
+class KeysetQuerySet(models.QuerySet):
+    """A QuerySet with the keyset_page method, see keyset_page."""
+
+    def keyset_page(self, cursor=None, per_page=50, ordering=None):
+        return keyset_page(self, cursor, per_page, ordering)
@@ -0,0 +1,145 @@
+"""Query budgets guarding against N+1 query patterns.
+
+The `query_budget` context manager (also usable as a decorator) records the SQL
+queries executed inside it and fails if there were more of them than the budget
+allows, reporting the SQL shapes (the queries with the parameters and the IN lists
+collapsed) which were executed repeatedly, as those usually point at a per-object
+query issued from a loop:
+
+    with query_budget(2):
+        reaction = Reaction.get_from_text("e- + H2 -> 2e- + H2+")
+
+By default a QueryBudgetExceeded error is raised, which is what the tests want. With
+action="warn", a QueryBudgetWarning is emitted instead, which is handy for guarding
+code paths in the DEBUG mode of a development server without breaking it.
+QueryBudgetTestMixin exposes the same as assertions for the TestCase subclasses.
+"""
+
+import re
+import warnings
+from collections import Counter
+from contextlib import ExitStack, ContextDecorator
+
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudgetWarning(UserWarning):
+    pass
+
+
+_IN_LIST = re.compile(r"\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def sql_shape(sql):
+    """Returns the SQL with the IN lists and the literal numbers collapsed, so that
+    the queries differing only in their parameters have the same shape.
+    """
+    return _NUMBER.sub("N", _IN_LIST.sub("IN (...)", sql))
+
+
+class QueryRecorder:
+    """A database execute wrapper recording the executed SQL."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated_shapes(self, min_repeats=2):
+        """Returns a list of (shape, count) tuples of the SQL shapes executed at
+        least min_repeats times, the most frequent first.
+        """
+        counts = Counter(sql_shape(sql) for sql in self.queries)
+        return [(shape, n) for shape, n in counts.most_common() if n >= min_repeats]
+
+    def report(self):
+        lines = [f"{len(self)} queries executed:"]
+        lines.extend(f"  {i}. {sql}" for i, sql in enumerate(self.queries, 1))
+        repeated = self.repeated_shapes()
+        if repeated:
+            lines.append("Repeated SQL shapes:")
+            lines.extend(f"  {n}x {shape}" for shape, n in repeated)
+        return "\n".join(lines)
+
+
+class query_budget(ContextDecorator):
+    """Context manager and decorator failing if the wrapped code executes more
+    than max_queries SQL queries, or any single SQL shape more than max_repeats
+    times.
+
+    Parameters
+    ----------
+    max_queries : int, optional
+    max_repeats : int, optional
+    using : str or iterable of str, optional
+        The database aliases to watch, defaults to all of them.
+    action : {"raise", "warn"}
+    """
+
+    def __init__(self, max_queries=None, max_repeats=None, using=None, action="raise"):
+        if action not in ("raise", "warn"):
+            raise ValueError(f"Invalid query budget action: {action!r}")
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        if isinstance(using, str):
+            using = [using]
+        self.using = using
+        self.action = action
+
+    def __enter__(self):
+        self.recorder = QueryRecorder()
+        self._stack = ExitStack()
+        aliases = self.using if self.using is not None else connections
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self.recorder))
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        if exc_type is not None:
+            return False
+        problems = []
+        if self.max_queries is not None and len(self.recorder) > self.max_queries:
+            problems.append(
+                f"{len(self.recorder)} queries executed, "
+                f"the budget is {self.max_queries}"
+            )
+        if self.max_repeats is not None:
+            for shape, n in self.recorder.repeated_shapes(self.max_repeats + 1):
+                problems.append(
+                    f"{n} executions of the same SQL shape, "
+                    f"the budget is {self.max_repeats}: {shape}"
+                )
+        if problems:
+            message = "\n".join(problems + [self.recorder.report()])
+            if self.action == "raise":
+                raise QueryBudgetExceeded(message)
+            warnings.warn(message, QueryBudgetWarning, stacklevel=2)
+        return False
+
+
+class QueryBudgetTestMixin:
+    """A mixin for the django TestCase classes asserting query budgets."""
+
+    def assertMaxQueries(self, max_queries, using=DEFAULT_DB_ALIAS, max_repeats=None):
+        """Context manager asserting that at most max_queries queries (and at
+        most max_repeats repetitions of any single SQL shape) are executed
+        inside it.
+        """
+        return query_budget(max_queries, max_repeats=max_repeats, using=using)
+
+    def assertNoRepeatedQueries(self, using=DEFAULT_DB_ALIAS):
+        """Context manager asserting that no SQL shape is executed more than
+        once inside it.
+        """
+        return query_budget(max_repeats=1, using=using)
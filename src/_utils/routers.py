@@ -0,0 +1,145 @@
+"""Routing of the lookups to read replicas of the database.
+
+ReplicaRouter sends all the writes to the primary database and the reads to one of
+the replica databases, chosen at random, so that the lookups of the
+get_from_text, filter_from_text and all_from_text classmethods and the dataset
+listings are spread over the replicas:
+
+    DATABASE_ROUTERS = ["_utils.routers.ReplicaRouter"]
+    VALEM_PRIMARY_DATABASE = "default"
+    VALEM_REPLICA_DATABASES = ["replica1", "replica2"]
+
+The reads are pinned to the primary inside the pin_primary() context manager, and
+inside a transaction (atomic block) on the primary once it has written anything (see
+mark_written), so that they see the rows written before them, until the end of the
+transaction, even if the write is rolled back with its savepoint; the reads of the
+transactions (e.g. of ATOMIC_REQUESTS) which have not written anything yet, lookups
+included, still go to the replicas. The get_or_create_from_text classmethods look
+the rows up on a replica, then, if not found there (e.g. if it lags behind), on the
+primary, on which they create the missing rows (see lookup_databases). Their using
+argument, like that of the other lookup classmethods and of
+ReactionDataSet.bulk_ingest, bypasses the router.
+
+Without any VALEM_REPLICA_DATABASES, everything goes to the primary.
+"""
+
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections, router, transaction, DEFAULT_DB_ALIAS
+
+
+def primary_database():
+    """Returns the alias of the primary database."""
+    return getattr(settings, "VALEM_PRIMARY_DATABASE", DEFAULT_DB_ALIAS)
+
+
+def replica_databases():
+    """Returns the aliases of the replica databases."""
+    return list(getattr(settings, "VALEM_REPLICA_DATABASES", ()))
+
+
+class _Pinned(threading.local):
+    def __init__(self):
+        self.depth = 0
+        # the aliases of the databases written in their current transaction
+        self.written = set()
+
+
+_pinned = _Pinned()
+
+
+@contextmanager
+def pin_primary():
+    """Routes the reads of this thread within the block to the primary database."""
+    _pinned.depth += 1
+    try:
+        yield
+    finally:
+        _pinned.depth -= 1
+
+
+def mark_written(using=None):
+    """Pins the reads of the current transaction on the database using (the primary
+    by default) to it, until the transaction ends. Called by the router for the
+    routed writes, and by the get_or_create_from_text classmethods, which write
+    to an explicit database."""
+    using = using or primary_database()
+    if connections[using].in_atomic_block and using not in _pinned.written:
+        _pinned.written.add(using)
+        transaction.on_commit(lambda: _pinned.written.discard(using), using=using)
+
+
+def _transaction_written():
+    """Returns True inside a transaction on the primary which has written anything."""
+    primary = primary_database()
+    if not connections[primary].in_atomic_block:
+        # a rolled-back transaction does not run its on_commit callbacks
+        _pinned.written.discard(primary)
+        return False
+    return primary in _pinned.written
+
+
+def _request_started(**kwargs):
+    # no transaction outlives its request
+    _pinned.written.clear()
+
+
+request_started.connect(_request_started, dispatch_uid="valem_routers_request")
+
+
+def primary_pinned():
+    """Returns True inside a pin_primary block, or a transaction on the primary
+    after its first write."""
+    return _pinned.depth > 0 or _transaction_written()
+
+
+class ReplicaRouter:
+    """Routes the reads to the replicas (unless pinned to the primary) and the
+    writes to the primary database."""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_databases()
+        if not replicas or primary_pinned():
+            return primary_database()
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # the instances of the databases not replicated are written to their own
+        instance = hints.get("instance")
+        db = getattr(getattr(instance, "_state", None), "db", None)
+        if db is not None and db not in self._pool():
+            return db
+        # lookup_databases only asks for the alias, without writing anything
+        if not hints.get("lookup"):
+            mark_written()
+        return primary_database()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = self._pool()
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+    @staticmethod
+    def _pool():
+        return {primary_database(), *replica_databases()}
+
+
+def lookup_databases(model, using=None):
+    """Returns the aliases of the databases on which the get_or_create classmethods
+    look the rows of the model up, in turn, the last one being that on which they
+    create the missing rows: using if given, otherwise the read database followed
+    by the write database, if different.
+    """
+    if using is not None:
+        return [using]
+    read_db = router.db_for_read(model)
+    write_db = router.db_for_write(model, lookup=True)
+    return [read_db] if read_db == write_db else [read_db, write_db]
@@ -0,0 +1,372 @@
+"""Merging of another django-valem database (e.g. a regional copy) into this one.
+
+merge_database streams the tables of the source database in batches, in the order
+of their primary keys, and matches each batch against the target database with a
+single __in query on the natural keys of the rows:
+
+* the process types on their abbreviation, the species and RPs on their canonical
+  text, the aliases on their text and the identifiers on their kind and value;
+* the reactions on their text, comment and process types;
+* the refs on their DOI (those without a DOI are always inserted);
+* the datasets on their reaction and the values of all their fields but the
+  timestamps, so that merging the same source again inserts nothing.
+
+The rows not matched are inserted with bulk_create, with their foreign keys
+rewritten through the source-to-target id remapping tables built on the way, and
+so are the rows owned by the inserted rows (the States of the RPs, the composition
+of the species, the reactant, product and process type through rows of the
+reactions and the refs through rows of the datasets). The inserted rows get new
+primary keys, and new time_added and time_modified timestamps, so that they appear
+in the change feed of the target. Everything is merged in a single transaction on
+the target database:
+
+    report = merge_database("regional", dry_run=True)
+    print(report)
+
+The remapping tables hold an integer pair per source row, so a source of a million
+reactions takes some hundreds of MB. The SpeciesStats are not merged: rebuild them
+afterwards. Also available as the merge_database management command.
+"""
+
+import time
+from collections import Counter, defaultdict
+
+from django.db import transaction, DEFAULT_DB_ALIAS
+from django.db.models import Q
+from refs.models import Ref
+
+from _utils.bulk import bulk_create_with_pks
+from _utils.export import chunked
+from rp.models import (
+    RP,
+    Species,
+    SpeciesAlias,
+    SpeciesComposition,
+    SpeciesIdentifier,
+    State,
+)
+from rxn.models import ProcessType, Reaction, ReactantList, ProductList
+from rxn.stats import mark_stale
+from .models import dataset_models as installed_dataset_models
+
+# the fields not compared when matching the datasets
+_TIMESTAMPS = ("time_added", "time_modified")
+
+
+class DatabaseMergeReport:
+    """The numbers of the source rows matched and inserted by model, with the
+    elapsed time."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.matched = Counter()
+        self.inserted = Counter()
+        self.seconds = 0.0
+
+    def __str__(self):
+        lines = []
+        for verb, counts in ("Matched", self.matched), ("Inserted", self.inserted):
+            lines.extend(
+                f"{verb} {n} {label} rows" for label, n in sorted(counts.items()) if n
+            )
+        if self.dry_run:
+            lines.append("(dry run, rolled back)")
+        lines.append(f"in {self.seconds:.2f} s")
+        return "\n".join(lines)
+
+
+def _hashable(value):
+    """Returns the value in a form comparable in a set, e.g. of a numpy array."""
+    if hasattr(value, "tobytes"):
+        return value.dtype.str, value.shape, value.tobytes()
+    if isinstance(value, memoryview):
+        return bytes(value)
+    if isinstance(value, (list, dict)):
+        return repr(value)
+    return value
+
+
+class _Merger:
+    def __init__(self, source, target, batch_size, report):
+        self.source = source
+        self.target = target
+        self.batch_size = batch_size
+        self.report = report
+        # the target ids of the source rows, and the source rows inserted, by model
+        self.maps = defaultdict(dict)
+        self.new = defaultdict(list)
+        # the target ids of the reactions inserted or given new datasets
+        self.stale_reaction_ids = set()
+
+    @staticmethod
+    def _fields(model):
+        return [field for field in model._meta.concrete_fields if not field.primary_key]
+
+    def _chunks(self, model, fields, q=Q()):
+        """Yields the batches of the (pk, *values) rows of the source table."""
+        rows = (
+            model._base_manager.using(self.source)
+            .filter(q)
+            .order_by("pk")
+            .values_list("pk", *(field.attname for field in fields))
+            .iterator(chunk_size=self.batch_size)
+        )
+        return chunked(rows, self.batch_size)
+
+    def _instance(self, model, fields, row):
+        """Returns the unsaved instance of the source row, with its foreign keys
+        remapped to the target."""
+        values = {}
+        for field, value in zip(fields, row[1:]):
+            if field.is_relation and value is not None:
+                label = field.related_model._meta.label
+                try:
+                    value = self.maps[label][value]
+                except KeyError:
+                    raise ValueError(
+                        f"Cannot remap {model._meta.label}.{field.name} to the "
+                        f"{label} row {value} of the source"
+                    ) from None
+            values[field.attname] = value
+        return model(**values)
+
+    def _match(self, model, instances, keys, existing):
+        """Maps the source rows (instances by pk) on the target rows with the same
+        keys (existing maps the keys to the target ids), inserting the others.
+
+        Returns the source pks of the inserted rows.
+        """
+        label = model._meta.label
+        mapping = self.maps[label]
+        new = {}
+        for pk, key in keys.items():
+            if key in existing:
+                mapping[pk] = existing[key]
+                self.report.matched[label] += 1
+            elif key not in new:
+                new[key] = pk
+        created = bulk_create_with_pks(
+            model,
+            [instances[pk] for pk in new.values()],
+            batch_size=self.batch_size,
+            using=self.target,
+        )
+        for (key, pk), obj in zip(new.items(), created):
+            existing[key] = mapping[pk] = obj.pk
+        # the duplicates in the source of the inserted rows
+        for pk, key in keys.items():
+            if pk not in mapping:
+                mapping[pk] = existing[key]
+                self.report.matched[label] += 1
+        self.report.inserted[label] += len(created)
+        self.new[label].extend(new.values())
+        return list(new.values())
+
+    def merge(self, model, key, q=Q()):
+        """Merges the rows of the model selected by q, matched on the key fields
+        (the first of which is looked up with __in), or always inserted if key is
+        None."""
+        fields = self._fields(model)
+        for chunk in self._chunks(model, fields, q):
+            instances = {row[0]: self._instance(model, fields, row) for row in chunk}
+            if key is None:
+                keys = {pk: pk for pk in instances}
+                self._match(model, instances, keys, {})
+                continue
+            keys = {
+                pk: tuple(getattr(obj, name) for name in key)
+                for pk, obj in instances.items()
+            }
+            existing = {}
+            rows = (
+                model._base_manager.using(self.target)
+                .filter(**{f"{key[0]}__in": {k[0] for k in keys.values()}})
+                .order_by("-pk")
+                .values_list("pk", *key)
+            )
+            # the smallest target id of a key wins
+            for pk, *values in rows:
+                existing[tuple(values)] = pk
+            self._match(model, instances, keys, existing)
+
+    def copy_owned(self, model, fk, owner):
+        """Inserts the rows of the model owned (through their fk) by the inserted
+        owner rows."""
+        fields = self._fields(model)
+        label = model._meta.label
+        for owner_ids in chunked(self.new[owner._meta.label], self.batch_size):
+            objs = [
+                self._instance(model, fields, row)
+                for chunk in self._chunks(model, fields, Q(**{f"{fk}__in": owner_ids}))
+                for row in chunk
+            ]
+            model._base_manager.using(self.target).bulk_create(
+                objs, batch_size=self.batch_size
+            )
+            self.report.inserted[label] += len(objs)
+
+    def merge_reactions(self):
+        """Merges the reactions, matched on their text, comment and process types."""
+        fields = self._fields(Reaction)
+        through = Reaction.process_types.through
+        for chunk in self._chunks(Reaction, fields):
+            instances = {row[0]: self._instance(Reaction, fields, row) for row in chunk}
+            process_types = defaultdict(list)
+            for reaction_id, process_type_id in (
+                through.objects.using(self.source)
+                .filter(reaction_id__in=list(instances))
+                .values_list("reaction_id", "processtype_id")
+            ):
+                process_types[reaction_id].append(
+                    self.maps[ProcessType._meta.label][process_type_id]
+                )
+            keys = {
+                pk: (obj.text, obj.comment, tuple(sorted(process_types[pk])))
+                for pk, obj in instances.items()
+            }
+
+            found = {}
+            target_process_types = defaultdict(list)
+            for reaction_id, text, comment, process_type_id in (
+                Reaction.objects.using(self.target)
+                .filter(text__in={key[0] for key in keys.values()})
+                .values_list("id", "text", "comment", "process_types")
+            ):
+                found[reaction_id] = (text, comment)
+                if process_type_id is not None:
+                    target_process_types[reaction_id].append(process_type_id)
+            existing = {}
+            for reaction_id in sorted(found, reverse=True):
+                text, comment = found[reaction_id]
+                existing[
+                    (text, comment, tuple(sorted(target_process_types[reaction_id])))
+                ] = reaction_id
+
+            new_ids = self._match(Reaction, instances, keys, existing)
+            self._copy_reaction_through_rows(new_ids, process_types)
+            reactions = self.maps[Reaction._meta.label]
+            self.stale_reaction_ids.update(reactions[pk] for pk in new_ids)
+
+    def _copy_reaction_through_rows(self, reaction_ids, process_types):
+        reactions = self.maps[Reaction._meta.label]
+        rps = self.maps[RP._meta.label]
+        for Intermediate in ReactantList, ProductList:
+            objs = [
+                Intermediate(reaction_id=reactions[reaction_id], rp_id=rps[rp_id])
+                for reaction_id, rp_id in Intermediate.objects.using(self.source)
+                .filter(reaction_id__in=reaction_ids)
+                .order_by("pk")
+                .values_list("reaction_id", "rp_id")
+            ]
+            Intermediate.objects.using(self.target).bulk_create(
+                objs, batch_size=self.batch_size
+            )
+            self.report.inserted[Intermediate._meta.label] += len(objs)
+        through = Reaction.process_types.through
+        objs = [
+            through(reaction_id=reactions[reaction_id], processtype_id=process_type_id)
+            for reaction_id in reaction_ids
+            for process_type_id in process_types[reaction_id]
+        ]
+        through.objects.using(self.target).bulk_create(objs, batch_size=self.batch_size)
+        self.report.inserted[through._meta.label] += len(objs)
+
+    def merge_datasets(self, model):
+        """Merges the datasets of the model, matched on their reaction and the
+        values of their fields but the timestamps."""
+        fields = self._fields(model)
+        compared = [field.attname for field in fields if field.name not in _TIMESTAMPS]
+        for chunk in self._chunks(model, fields):
+            instances = {row[0]: self._instance(model, fields, row) for row in chunk}
+            keys = {
+                pk: tuple(_hashable(getattr(obj, name)) for name in compared)
+                for pk, obj in instances.items()
+            }
+            existing = {}
+            rows = (
+                model._base_manager.using(self.target)
+                .filter(reaction_id__in={obj.reaction_id for obj in instances.values()})
+                .order_by("-pk")
+                .values_list("pk", *compared)
+            )
+            for pk, *values in rows:
+                existing[tuple(_hashable(value) for value in values)] = pk
+            new_ids = self._match(model, instances, keys, existing)
+            self.stale_reaction_ids.update(instances[pk].reaction_id for pk in new_ids)
+
+            through = model.refs.through
+            fk = model._refs_through_fk()
+            refs = self.maps[Ref._meta.label]
+            datasets = self.maps[model._meta.label]
+            objs = [
+                through(**{fk: datasets[dataset_id], "ref_id": refs[ref_id]})
+                for dataset_id, ref_id in through.objects.using(self.source)
+                .filter(**{f"{fk}__in": new_ids})
+                .values_list(fk, "ref_id")
+            ]
+            through.objects.using(self.target).bulk_create(
+                objs, batch_size=self.batch_size
+            )
+            self.report.inserted[through._meta.label] += len(objs)
+
+
+def merge_database(
+    source,
+    target=DEFAULT_DB_ALIAS,
+    dataset_models=None,
+    dry_run=False,
+    batch_size=2000,
+):
+    """Merges the source database into the target database.
+
+    Parameters
+    ----------
+    source : str
+        The alias of the source database.
+    target : str
+        The alias of the target database.
+    dataset_models : iterable of ReactionDataSet subclasses, optional
+        The dataset models to merge, defaults to all the installed ones.
+    dry_run : bool
+        Roll the transaction back, only reporting the numbers of the rows.
+    batch_size : int
+        The number of the source rows matched and inserted at a time.
+
+    Returns
+    -------
+    DatabaseMergeReport
+
+    Raises
+    ------
+    ValueError
+        If the source and target are the same database, or a source row
+        references a row missing from the source.
+    """
+    if source == target:
+        raise ValueError("Cannot merge a database into itself")
+    if dataset_models is None:
+        dataset_models = installed_dataset_models()
+    report = DatabaseMergeReport(dry_run)
+    start = time.perf_counter()
+    merger = _Merger(source, target, batch_size, report)
+    with transaction.atomic(using=target):
+        merger.merge(ProcessType, ("abbreviation",))
+        merger.merge(Species, ("text",))
+        merger.copy_owned(SpeciesComposition, "species", Species)
+        merger.merge(SpeciesAlias, ("text",))
+        merger.merge(SpeciesIdentifier, ("value", "kind"))
+        merger.merge(RP, ("text",))
+        merger.copy_owned(State, "rp", RP)
+        merger.merge_reactions()
+        has_doi = Q(doi__isnull=False) & ~Q(doi="")
+        merger.merge(Ref, ("doi",), has_doi)
+        merger.merge(Ref, None, ~has_doi)
+        for model in dataset_models:
+            merger.merge_datasets(model)
+
+        if dry_run:
+            transaction.set_rollback(True, using=target)
+        else:
+            mark_stale(reaction_ids=merger.stale_reaction_ids, using=target)
+    report.seconds = time.perf_counter() - start
+    return report
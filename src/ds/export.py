@@ -0,0 +1,81 @@
+"""Streaming export of the instances of the ReactionDataSet subclasses.
+
+Like rxn.export, the datasets are read with a chunked iterator and the reactions and
+references of every chunk are fetched with a fixed number of values() queries.
+"""
+
+from collections import defaultdict
+
+from _utils.export import chunked
+from rxn.export import REACTION_FIELDS, reaction_records
+from rxn.models import Reaction
+
+
+def dataset_fields(model):
+    """Returns the names of the exported columns of the dataset model."""
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.name != "reaction"
+    ]
+
+
+def dataset_refs(model, dataset_ids, using=None):
+    """Returns the lists of the refs (as dicts with their id and doi) of the datasets
+    of the model with dataset_ids, by dataset id."""
+    dataset_fk = model._refs_through_fk()
+    refs = defaultdict(list)
+    for dataset_id, ref_id, doi in (
+        model.refs.through.objects.using(using)
+        .filter(**{f"{dataset_fk}__in": dataset_ids})
+        .order_by("id")
+        .values_list(dataset_fk, "ref_id", "ref__doi")
+    ):
+        refs[dataset_id].append({"id": ref_id, "doi": doi})
+    return refs
+
+
+def iter_datasets(queryset, chunk_size=2000, with_reactions=True):
+    """Yields the export records of the datasets of the queryset (or of all the
+    instances of the model class passed instead) ordered by their id.
+
+    Every record holds the values of the dataset concrete fields, the list of its
+    refs (with their id and doi) and the id of its reaction, or the full export
+    record of the reaction (see rxn.export.iter_reactions) if with_reactions is True.
+    """
+    if not hasattr(queryset, "query"):
+        queryset = queryset.objects.all()
+    model = queryset.model
+    fields = dataset_fields(model)
+    using = queryset.db
+
+    rows = (
+        queryset.using(using)
+        .order_by("id")
+        .values(*fields, "reaction_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    for chunk in chunked(rows, chunk_size):
+        refs = dataset_refs(model, [row["id"] for row in chunk], using)
+        if with_reactions:
+            reaction_ids = {row["reaction_id"] for row in chunk}
+            reactions = {
+                record["id"]: record
+                for record in reaction_records(
+                    list(
+                        Reaction.objects.using(using)
+                        .filter(id__in=reaction_ids)
+                        .values(*REACTION_FIELDS)
+                    ),
+                    using,
+                )
+            }
+
+        for row in chunk:
+            record = {field: row[field] for field in fields}
+            if with_reactions:
+                record["reaction"] = reactions[row["reaction_id"]]
+            else:
+                record["reaction_id"] = row["reaction_id"]
+            record["refs"] = refs[row["id"]]
+            yield record
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ds.snapshot import dump_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a compressed snapshot of the species, RP, state, reaction and "
+        "process type tables, for load_snapshot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="the snapshot file")
+        parser.add_argument(
+            "extra_models",
+            nargs="*",
+            help="further models as app_label.ModelName (e.g. the datasets, their "
+            "refs and refs through tables), in the order of their foreign keys",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        try:
+            counts = dump_snapshot(
+                options["output"],
+                extra_models=options["extra_models"],
+                batch_size=options["batch_size"],
+                using=options["database"],
+            )
+        except (LookupError, ValueError) as err:
+            raise CommandError(err)
+        for label, n in counts.items():
+            self.stderr.write(f"Dumped {n} {label} rows.")
@@ -0,0 +1,44 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from _utils.export import EXPORT_FORMATS, write_records
+from ds.export import iter_datasets
+from ds.models import ReactionDataSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams all the datasets of a ReactionDataSet subclass with their "
+        "reactions and refs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="the dataset model as app_label.ModelName")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--output", help="output file, defaults to stdout")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--reaction-ids",
+            action="store_true",
+            help="export only the reaction ids instead of the full reactions",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as err:
+            raise CommandError(err)
+        if not issubclass(model, ReactionDataSet):
+            raise CommandError(f"{options['model']} is not a ReactionDataSet subclass.")
+
+        records = iter_datasets(
+            model,
+            chunk_size=options["chunk_size"],
+            with_reactions=not options["reaction_ids"],
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as fo:
+                n = write_records(records, fo, options["format"])
+        else:
+            n = write_records(records, self.stdout, options["format"])
+        self.stderr.write(f"Exported {n} datasets.")
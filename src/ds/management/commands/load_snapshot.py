@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ds.snapshot import load_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads a snapshot written by dump_snapshot into the empty tables, "
+        "preserving the primary keys."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="the snapshot file")
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="insert the rows with INSERT statements also on PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            counts = load_snapshot(
+                options["input"],
+                batch_size=options["batch_size"],
+                using=options["database"],
+                use_copy=False if options["no_copy"] else None,
+            )
+        except (LookupError, ValueError) as err:
+            raise CommandError(err)
+        for label, n in counts.items():
+            self.stderr.write(f"Loaded {n} {label} rows.")
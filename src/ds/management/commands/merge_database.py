@@ -0,0 +1,45 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from ds.dbmerge import merge_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Merges another django-valem database into this one, matching the rows "
+        "on their canonical texts and inserting the missing ones in bulk."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="the alias of the source database")
+        parser.add_argument(
+            "dataset_models",
+            nargs="*",
+            help="the app_label.ModelName of the dataset models to merge, "
+            "defaults to all of them",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report the numbers of the rows, rolling the merge back",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--database", default="default", help="the alias of the target database"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            dataset_models = [
+                apps.get_model(label) for label in options["dataset_models"]
+            ] or None
+            report = merge_database(
+                options["source"],
+                target=options["database"],
+                dataset_models=dataset_models,
+                dry_run=options["dry_run"],
+                batch_size=options["batch_size"],
+            )
+        except (LookupError, ValueError) as err:
+            raise CommandError(err)
+        self.stdout.write(str(report))
@@ -1,8 +1,13 @@
-from django.db import models
+from django.apps import apps
+from django.db import models, router, transaction
 from refs.models import Ref
 
+from _utils.bulk import bulk_create_with_pks
+from _utils.instrumentation import instrumented
 from _utils.models import ProvenanceMixin, QualifiedIDMixin
+from _utils.pagination import KeysetQuerySet
 from rxn.models import Reaction
+from rxn.stats import mark_stale
 
 
 class ReactionDataSet(QualifiedIDMixin, ProvenanceMixin, models.Model):
@@ -19,8 +24,143 @@ class ReactionDataSet(QualifiedIDMixin, ProvenanceMixin, models.Model):
     reaction = models.ForeignKey(Reaction, on_delete=models.CASCADE)
     refs = models.ManyToManyField(Ref)
 
+    objects = KeysetQuerySet.as_manager()
+    keyset_ordering = ("id",)
+
     class Meta:
         abstract = True
 
     def __str__(self):
         return str(self.reaction)
+
+    @classmethod
+    def _refs_through_fk(cls):
+        """Returns the attname of the refs through table foreign key to cls."""
+        return next(
+            field.attname
+            for field in cls.refs.through._meta.concrete_fields
+            if field.related_model is cls
+        )
+
+    @classmethod
+    @instrumented
+    def bulk_ingest(
+        cls, entries, added_by_user_id=None, strict=True, batch_size=1000, using=None
+    ):
+        """Creates many datasets, linked to their reactions and refs, in a few
+        queries and a single transaction.
+
+        Parameters
+        ----------
+        entries : iterable of dict
+            Each entry holds the field values of a single dataset, with the
+            following special keys:
+            reaction : Reaction, int or str
+                The reaction instance, its id, or its text, which is resolved with
+                the optional "comment" and "process_types" abbreviations of the entry
+                the same way as in Reaction.get_from_text (these two keys are only
+                accepted with a reaction text).
+            refs : iterable of Ref, int or str, optional
+                The references of the dataset: Ref instances, their ids or DOIs.
+        added_by_user_id : int, optional
+            Fills in the ProvenanceMixin field of all the datasets.
+        strict : bool
+            Passed to pyvalem when canonicalising the reaction texts.
+        batch_size : int
+        using : str, optional
+            The database alias, defaults to the routed write database, on which
+            the reactions and refs are resolved too.
+
+        Returns
+        -------
+        list of cls
+            The created datasets, with their primary keys set.
+
+        Raises
+        ------
+        Reaction.DoesNotExist, Ref.DoesNotExist
+            If any of the reactions or refs does not exist. Nothing is created.
+        ValueError
+            If a comment or process_types is given with a reaction instance or id.
+        """
+        entries = [dict(entry) for entry in entries]
+        using = using or router.db_for_write(cls)
+
+        keys = []
+        for entry in entries:
+            comment = entry.pop("comment", "")
+            process_types = tuple(entry.pop("process_types", ()))
+            if isinstance(entry["reaction"], str):
+                keys.append((entry["reaction"], comment, process_types))
+            elif comment or process_types:
+                raise ValueError(
+                    "The comment and process_types only apply to the reactions given"
+                    f" by their text, not to {entry['reaction']!r}."
+                )
+            else:
+                keys.append(None)
+        reaction_ids = Reaction.ids_from_texts(
+            {key for key in keys if key is not None}, strict=strict, using=using
+        )
+        missing = {key for key in keys if key is not None} - set(reaction_ids)
+        if missing:
+            raise Reaction.DoesNotExist(
+                f"Reactions do not exist: {', '.join(sorted(k[0] for k in missing))}"
+            )
+
+        dois = {
+            ref
+            for entry in entries
+            for ref in entry.get("refs", ())
+            if isinstance(ref, str)
+        }
+        ref_ids = dict(
+            Ref.objects.using(using).filter(doi__in=dois).values_list("doi", "id")
+        )
+        if len(ref_ids) != len(dois):
+            raise Ref.DoesNotExist(
+                f"Refs do not exist: {', '.join(sorted(dois - set(ref_ids)))}"
+            )
+
+        datasets, dataset_refs = [], []
+        for entry, key in zip(entries, keys):
+            reaction = entry.pop("reaction")
+            if key is not None:
+                entry["reaction_id"] = reaction_ids[key]
+            elif isinstance(reaction, Reaction):
+                entry["reaction"] = reaction
+            else:
+                entry["reaction_id"] = reaction
+            dataset_refs.append(
+                {
+                    ref_ids[ref] if isinstance(ref, str) else getattr(ref, "pk", ref)
+                    for ref in entry.pop("refs", ())
+                }
+            )
+            entry.setdefault("added_by_user_id", added_by_user_id)
+            datasets.append(cls(**entry))
+
+        through = cls.refs.through
+        fk = cls._refs_through_fk()
+        with transaction.atomic(using=using):
+            datasets = bulk_create_with_pks(
+                cls, datasets, batch_size=batch_size, using=using
+            )
+            through.objects.using(using).bulk_create(
+                [
+                    through(**{fk: dataset.pk, "ref_id": ref_id})
+                    for dataset, refs in zip(datasets, dataset_refs)
+                    for ref_id in refs
+                ],
+                batch_size=batch_size,
+            )
+            mark_stale(
+                reaction_ids={dataset.reaction_id for dataset in datasets},
+                using=using,
+            )
+        return datasets
+
+
+def dataset_models():
+    """Returns the installed concrete ReactionDataSet subclasses."""
+    return [model for model in apps.get_models() if issubclass(model, ReactionDataSet)]
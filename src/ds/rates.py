@@ -0,0 +1,159 @@
+"""Rate-coefficient datasets and their vectorised evaluation.
+
+RateCoefficientMixin adds the fields of a rate coefficient, either fitted to the
+modified Arrhenius expression
+
+    k(T) = A (T / T_ref)^n exp(-Ea / T),
+
+(the plain Arrhenius expression having n = 0), or tabulated on a temperature grid,
+to a ReactionDataSet subclass:
+
+    class RateDataSet(RateCoefficientMixin, ReactionDataSet):
+        pass
+
+evaluate_rates then evaluates the rate coefficients of any number of such datasets
+on a common temperature grid: the parameters are fetched with a single values_list()
+query, packed into NumPy arrays, and the (datasets x temperatures) matrix is
+computed by broadcasting, with the tabulated datasets sharing the same grid
+interpolated together. Requires NumPy.
+"""
+
+from collections import namedtuple, defaultdict
+
+import numpy as np
+from django.db import models
+
+from _utils.fields import Float64ArrayField
+
+
+class RateCoefficientMixin(models.Model):
+    ARRHENIUS = 0
+    TABULATED = 1
+
+    RATE_KIND_CHOICES = (
+        (ARRHENIUS, "Modified Arrhenius"),
+        (TABULATED, "Tabulated"),
+    )
+
+    rate_kind = models.SmallIntegerField(choices=RATE_KIND_CHOICES, default=ARRHENIUS)
+    A = models.FloatField(null=True, blank=True, help_text="Pre-exponential factor")
+    n = models.FloatField(default=0, help_text="Temperature exponent")
+    Ea = models.FloatField(default=0, help_text="Activation energy, in K")
+    T_ref = models.FloatField(default=300, help_text="Reference temperature, in K")
+    T_min = models.FloatField(null=True, blank=True, help_text="in K")
+    T_max = models.FloatField(null=True, blank=True, help_text="in K")
+    rate_table = Float64ArrayField(
+        null=True,
+        blank=True,
+        help_text="The (2, N) array of the temperatures (in K) and rate coefficients",
+    )
+
+    class Meta:
+        abstract = True
+
+    def rate(self, T, extrapolate=False):
+        """Returns the rate coefficient(s) of this dataset at the temperature(s) T."""
+        table = self.rate_table
+        k = _evaluate(
+            [
+                (
+                    0,
+                    self.rate_kind,
+                    self.A,
+                    self.n,
+                    self.Ea,
+                    self.T_ref,
+                    self.T_min,
+                    self.T_max,
+                    None if table is None else np.asarray(table, dtype=float),
+                )
+            ],
+            np.atleast_1d(np.asarray(T, dtype=float)),
+            extrapolate,
+        ).k[0]
+        return k if np.ndim(T) else k[0]
+
+
+RateMatrix = namedtuple("RateMatrix", "ids T k")
+RateMatrix.__doc__ = """The rate coefficients k[i, j] of the datasets ids[i] at the
+temperatures T[j]. The rate coefficients outside of the validity range of a dataset
+are NaN."""
+
+_RATE_FIELDS = ("pk", "rate_kind", "A", "n", "Ea", "T_ref", "T_min", "T_max")
+
+
+def evaluate_rates(queryset, T, extrapolate=False):
+    """Evaluates the rate coefficients of the datasets of the queryset (of a model
+    with the RateCoefficientMixin) at the temperatures T.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+    T : array_like
+        The temperature grid, in K.
+    extrapolate : bool
+        Evaluate the rate coefficients outside of the [T_min, T_max] range of the
+        datasets too, the tabulated ones are held constant beyond their grid.
+
+    Returns
+    -------
+    RateMatrix
+    """
+    rows = list(queryset.order_by("pk").values_list(*_RATE_FIELDS, "rate_table"))
+    return _evaluate(rows, np.asarray(T, dtype=float).ravel(), extrapolate)
+
+
+def _as_float_array(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _evaluate(rows, T, extrapolate):
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    k = np.full((len(rows), T.size), np.nan)
+    if not rows:
+        return RateMatrix(ids, T, k)
+    kinds = np.array([row[1] for row in rows])
+    A, n, Ea, T_ref, T_min, T_max = (
+        _as_float_array(column) for column in list(zip(*rows))[2:8]
+    )
+
+    arrhenius = np.flatnonzero(kinds == RateCoefficientMixin.ARRHENIUS)
+    if arrhenius.size:
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            k[arrhenius] = (
+                A[arrhenius, None]
+                * (T[None, :] / T_ref[arrhenius, None]) ** n[arrhenius, None]
+                * np.exp(-Ea[arrhenius, None] / T[None, :])
+            )
+
+    # the tabulated datasets are interpolated (linearly in log T and log k) in
+    # groups sharing the same temperature grid:
+    grids = defaultdict(list)
+    for i in np.flatnonzero(kinds == RateCoefficientMixin.TABULATED):
+        table = rows[i][8]
+        if table is not None and table.ndim == 2 and table.shape[1]:
+            grids[table[0].tobytes()].append(i)
+    log_T = np.log(T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for indices in grids.values():
+            grid = np.log(rows[indices[0]][8][0])
+            log_k = np.log(np.stack([rows[i][8][1] for i in indices]))
+            if grid.size == 1:
+                k[indices] = np.exp(log_k[:, [0] * T.size])
+                outside = T != np.exp(grid[0])
+            else:
+                j = np.clip(np.searchsorted(grid, log_T) - 1, 0, grid.size - 2)
+                w = np.clip((log_T - grid[j]) / (grid[j + 1] - grid[j]), 0, 1)
+                # (the zero rate coefficients have log k = -inf, which must not be
+                # multiplied by a zero weight)
+                k[indices] = np.exp(
+                    np.where(w < 1, log_k[:, j] * (1 - w), 0)
+                    + np.where(w > 0, log_k[:, j + 1] * w, 0)
+                )
+                outside = (log_T < grid[0]) | (log_T > grid[-1])
+            if not extrapolate:
+                k[np.ix_(indices, np.flatnonzero(outside))] = np.nan
+
+    if not extrapolate:
+        k[(T[None, :] < T_min[:, None]) | (T[None, :] > T_max[:, None])] = np.nan
+    return RateMatrix(ids, T, k)
@@ -0,0 +1,191 @@
+"""Nested serialisation of the species, RPs, reactions and datasets for the APIs.
+
+Walking the ORM relations of every instance (reaction.reactants.all(),
+rp.species.charge, rp.state_set.all(), ...) costs several queries per serialised
+object. The functions of this module fetch each level of the relations for the whole
+queryset with a single values() query instead, and assemble the records as plain
+dicts without instantiating any model objects, so that they always run the same
+number of queries, whatever the number of rows:
+
+* serialize_species: 1 query;
+* serialize_rps: 2 queries (the RPs with their charge, and their states);
+* serialize_reactions: 6 queries (the reactions, their reactants and products
+  through rows, the RPs, their states and the process types);
+* serialize_datasets: 8 queries (the datasets, their refs and the above for their
+  reactions).
+
+The functions also accept the model class, for all its instances, or a list of
+instances, such as a KeysetPage, whose rows are then fetched again by their pks
+(with the same number of queries). The records keep the ordering of the queryset
+(or list), and all the related queries run on the database of the queryset. The RP records are shared by all the reactions they
+take part in, so they must not be modified in place. The records are encoded to
+JSON by dumps, with orjson if installed (pip install django-valem[json]):
+
+    records = serialize_reactions(Reaction.objects.keyset_page(cursor, per_page=50))
+    return HttpResponse(dumps(records), content_type="application/json")
+"""
+
+import functools
+
+from _utils.export import RecordEncoder
+from rxn.export import reaction_records, rp_records
+from rxn.models import Reaction
+from .export import dataset_fields, dataset_refs
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+SPECIES_FIELDS = ("id", "text", "html", "charge")
+REACTION_FIELDS = ("id", "text", "html", "latex", "comment")
+
+
+def _serializer(serialize):
+    """Makes the serialize function, of a queryset, also accept the model class (for
+    all its instances) or a list of its instances (e.g. a KeysetPage), whose
+    records are returned in the order of the list."""
+
+    @functools.wraps(serialize)
+    def wrapper(queryset, *args, **kwargs):
+        if hasattr(queryset, "query"):
+            return serialize(queryset, *args, **kwargs)
+        if isinstance(queryset, type):
+            return serialize(queryset._default_manager.all(), *args, **kwargs)
+        instances = list(queryset)
+        if not instances:
+            return []
+        positions = {obj.pk: i for i, obj in enumerate(instances)}
+        queryset = (
+            type(instances[0])
+            ._default_manager.using(instances[0]._state.db)
+            .filter(pk__in=positions)
+        )
+        records = serialize(queryset, *args, **kwargs)
+        return sorted(records, key=lambda record: positions[record["id"]])
+
+    return wrapper
+
+
+@_serializer
+def serialize_species(queryset):
+    """Returns the records of the species of the queryset.
+
+    Parameters
+    ----------
+    queryset : QuerySet, type or list
+        The Species queryset, the Species class for all of them, or a list of
+        Species.
+
+    Returns
+    -------
+    list of dict
+        The records, with the SPECIES_FIELDS.
+    """
+    return list(queryset.values(*SPECIES_FIELDS))
+
+
+@_serializer
+def serialize_rps(queryset):
+    """Returns the records of the RPs of the queryset.
+
+    Parameters
+    ----------
+    queryset : QuerySet, type or list
+        The RP queryset, the RP class for all of them, or a list of RPs.
+
+    Returns
+    -------
+    list of dict
+        The records of rxn.export.rp_records, with the list of the states of the
+        RPs as dicts with their text and html.
+    """
+    return rp_records(queryset, state_html=True)
+
+
+def _reaction_records(queryset):
+    using = queryset.db
+    return reaction_records(
+        list(queryset.using(using).values(*REACTION_FIELDS)),
+        using,
+        fields=REACTION_FIELDS,
+        state_html=True,
+    )
+
+
+@_serializer
+def serialize_reactions(queryset):
+    """Returns the records of the reactions of the queryset.
+
+    Parameters
+    ----------
+    queryset : QuerySet, type or list
+        The Reaction queryset, the Reaction class for all of them, or a list of
+        Reactions.
+
+    Returns
+    -------
+    list of dict
+        The records, with the REACTION_FIELDS, the list of the abbreviations of
+        their process types and the lists of the records of their reactants and
+        products (see serialize_rps), repeated according to their stoichiometry.
+    """
+    return _reaction_records(queryset)
+
+
+@_serializer
+def serialize_datasets(queryset, with_reactions=True):
+    """Returns the records of the datasets of the queryset.
+
+    Parameters
+    ----------
+    queryset : QuerySet, type or list
+        The queryset of a ReactionDataSet subclass, the subclass for all of its
+        instances, or a list of its instances.
+    with_reactions : bool
+        Whether to nest the records of the reactions (see serialize_reactions) or to
+        give their reaction_id only.
+
+    Returns
+    -------
+    list of dict
+        The records, with the values of the dataset concrete fields (see
+        ds.export.dataset_fields), the reaction and the list of the refs (as
+        dicts with their id and doi).
+    """
+    using = queryset.db
+    model = queryset.model
+    rows = list(queryset.using(using).values(*dataset_fields(model), "reaction_id"))
+    refs = dataset_refs(model, [row["id"] for row in rows], using)
+    if with_reactions:
+        reactions = {
+            record["id"]: record
+            for record in _reaction_records(
+                Reaction.objects.using(using).filter(
+                    id__in={row["reaction_id"] for row in rows}
+                )
+            )
+        }
+    for row in rows:
+        if with_reactions:
+            row["reaction"] = reactions[row.pop("reaction_id")]
+        row["refs"] = refs[row["id"]]
+    return rows
+
+
+_encoder = RecordEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(records):
+    """Returns the JSON encoding of the records, as UTF-8 bytes.
+
+    orjson is used if installed, the standard library json module (with the
+    RecordEncoder of the exports) otherwise. Both encode the NumPy arrays of the
+    Float64ArrayField values as nested lists, and differ only in the precision of
+    the encoded datetimes.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            records, default=_encoder.default, option=orjson.OPT_SERIALIZE_NUMPY
+        )
+    return _encoder.encode(records).encode("utf-8")
@@ -0,0 +1,280 @@
+"""Compressed snapshots of the species, RP and reaction tables.
+
+A snapshot is a ZIP archive holding a manifest and, for every model, the rows of its
+table in batches, each stored as a deflated JSON object of the columns (the lists of
+the values of the concrete fields, by their attname):
+
+    manifest.json
+    rp.species/000000.json
+    rp.species/000001.json
+    ...
+
+dump_snapshot reads each table with a single chunked values_list() query, ordered by
+the primary key, so it runs in the memory of a batch. load_snapshot inserts the rows
+with their primary keys in a single transaction: on PostgreSQL with COPY, on the
+other backends with the batched multi-row INSERT statements of bulk_create, but
+raw (as loaddata does), so that the auto_now timestamps are preserved too. The
+sequences of the primary keys are reset afterwards. The loaded tables are expected
+to be empty.
+
+By default the snapshot holds the SNAPSHOT_MODELS; the dataset models (with their
+refs and refs through tables) can be added after them:
+
+    with open("valem.snapshot", "wb") as fo:
+        dump_snapshot(fo, extra_models=["refs.Ref", "mydata.MyDataSet",
+                                        "mydata.MyDataSet_refs"])
+    load_snapshot("valem.snapshot", using="staging")
+
+The materialised SpeciesStats are not included: rebuild them after a load.
+"""
+
+import base64
+import datetime
+import io
+import json
+import zipfile
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, transaction, DEFAULT_DB_ALIAS
+
+from _utils.export import chunked
+
+SNAPSHOT_FORMAT = "valem-snapshot"
+SNAPSHOT_VERSION = 1
+
+# in the order of their foreign keys
+SNAPSHOT_MODELS = (
+    "rxn.ProcessType",
+    "rp.Species",
+    "rp.SpeciesAlias",
+    "rp.SpeciesComposition",
+    "rp.SpeciesIdentifier",
+    "rp.RP",
+    "rp.State",
+    "rxn.Reaction",
+    "rxn.Reaction_process_types",
+    "rxn.ReactantList",
+    "rxn.ProductList",
+)
+
+# the fields whose values are not JSON types, converted with field.to_python on load
+_CONVERTED_TYPES = (
+    models.DateTimeField,
+    models.DateField,
+    models.TimeField,
+    models.DurationField,
+    models.DecimalField,
+    models.UUIDField,
+)
+
+
+class _Encoder(DjangoJSONEncoder):
+    """Keeps the microseconds of the times, which DjangoJSONEncoder truncates."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _snapshot_models(extra_models=()):
+    return [apps.get_model(label) for label in (*SNAPSHOT_MODELS, *extra_models)]
+
+
+def _fields(model):
+    return list(model._meta.concrete_fields)
+
+
+def _encoder(field):
+    """Returns the function encoding the values of the field for JSON."""
+    if isinstance(field, models.BinaryField):
+
+        def encode(value):
+            if value is None:
+                return None
+            return base64.b64encode(bytes(field.get_prep_value(value))).decode("ascii")
+
+        return encode
+    return None
+
+
+def dump_snapshot(stream, extra_models=(), batch_size=10000, using=DEFAULT_DB_ALIAS):
+    """Writes the snapshot of the SNAPSHOT_MODELS (and of the extra_models) tables
+    to the binary stream.
+
+    Parameters
+    ----------
+    stream : file-like object or str
+        The binary stream or path to write the ZIP archive to.
+    extra_models : iterable of str
+        The app_label.ModelName labels of further models, e.g. of the datasets.
+    batch_size : int
+        The number of rows per stored batch.
+    using : str
+
+    Returns
+    -------
+    dict
+        The numbers of the rows written, by model label.
+    """
+    json_encoder = _Encoder(ensure_ascii=False, separators=(",", ":"))
+    manifest = {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, "models": []}
+    counts = {}
+    snapshot_models = _snapshot_models(extra_models)
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for model in snapshot_models:
+            label = model._meta.label_lower
+            fields = _fields(model)
+            encoders = [(i, _encoder(f)) for i, f in enumerate(fields) if _encoder(f)]
+            rows = (
+                model._base_manager.using(using)
+                .order_by("pk")
+                .values_list(*(f.attname for f in fields))
+                .iterator(chunk_size=batch_size)
+            )
+            n_batches = n_rows = 0
+            for batch in chunked(rows, batch_size):
+                columns = [list(column) for column in zip(*batch)]
+                for i, encode in encoders:
+                    columns[i] = [encode(value) for value in columns[i]]
+                data = dict(zip((f.attname for f in fields), columns))
+                archive.writestr(
+                    f"{label}/{n_batches:06d}.json", json_encoder.encode(data)
+                )
+                n_batches += 1
+                n_rows += len(batch)
+            manifest["models"].append(
+                {
+                    "model": label,
+                    "fields": [f.attname for f in fields],
+                    "batches": n_batches,
+                    "rows": n_rows,
+                }
+            )
+            counts[model._meta.label] = n_rows
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    return counts
+
+
+def _decoder(field):
+    """Returns the function converting the JSON values of the field back, if any."""
+    if isinstance(field, (models.BinaryField, *_CONVERTED_TYPES)):
+        return lambda value: None if value is None else field.to_python(value)
+    return None
+
+
+def _insert(model, fields, rows, batch_size, using):
+    """Inserts the rows (tuples of the values of the fields) as bulk_create would,
+    but without the pre_save of the fields, as loaddata does."""
+    objs = [model(*row) for row in rows]
+    ops = connections[using].ops
+    batch_size = max(1, min(batch_size, ops.bulk_batch_size(fields, objs)))
+    for batch in chunked(objs, batch_size):
+        model._base_manager._insert(batch, fields=fields, using=using, raw=True)
+
+
+def _copy(model, fields, rows, using):
+    """Inserts the rows with the PostgreSQL COPY statement."""
+    connection = connections[using]
+    buffer = io.StringIO()
+    for row in rows:
+        values = []
+        for field, value in zip(fields, row):
+            if isinstance(field, models.BinaryField):
+                value = field.get_prep_value(value)
+            else:
+                value = field.get_db_prep_save(value, connection)
+            if value is None:
+                # only the unquoted \N is NULL, the quoted values are never NULL
+                values.append("\\N")
+                continue
+            if isinstance(value, (bytes, memoryview)):
+                value = "\\x" + bytes(value).hex()
+            values.append('"' + str(value).replace('"', '""') + '"')
+        buffer.write(",".join(values) + "\n")
+    buffer.seek(0)
+    qn = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(
+        qn(model._meta.db_table), ", ".join(qn(f.column) for f in fields)
+    )
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, "copy_expert"):
+            # psycopg2
+            raw_cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def load_snapshot(stream, batch_size=10000, using=DEFAULT_DB_ALIAS, use_copy=None):
+    """Loads the snapshot from the binary stream (or path) into the empty tables of
+    the database, in a single transaction.
+
+    Parameters
+    ----------
+    stream : file-like object or str
+    batch_size : int
+        The maximal number of rows inserted per statement.
+    using : str
+    use_copy : bool, optional
+        Use COPY rather than INSERT, defaults to True on PostgreSQL only.
+
+    Returns
+    -------
+    dict
+        The numbers of the rows loaded, by model label.
+
+    Raises
+    ------
+    ValueError
+        If the stream is not a snapshot of a supported version, or holds other
+        fields than the current models.
+    """
+    connection = connections[using]
+    if use_copy is None:
+        use_copy = connection.vendor == "postgresql"
+    counts = {}
+    with zipfile.ZipFile(stream) as archive:
+        try:
+            manifest = json.loads(archive.read("manifest.json"))
+        except KeyError:
+            manifest = {}
+        if (
+            manifest.get("format") != SNAPSHOT_FORMAT
+            or manifest.get("version") != SNAPSHOT_VERSION
+        ):
+            raise ValueError("Not a supported snapshot")
+        loaded = []
+        with transaction.atomic(using=using):
+            for entry in manifest["models"]:
+                model = apps.get_model(entry["model"])
+                fields = _fields(model)
+                if [f.attname for f in fields] != entry["fields"]:
+                    raise ValueError(
+                        f"The snapshot fields of {model._meta.label} do not match "
+                        f"the model: {entry['fields']}"
+                    )
+                decoders = [(i, _decoder(f)) for i, f in enumerate(fields)]
+                decoders = [(i, decode) for i, decode in decoders if decode]
+                for n in range(entry["batches"]):
+                    data = json.loads(archive.read(f"{entry['model']}/{n:06d}.json"))
+                    columns = [data[f.attname] for f in fields]
+                    for i, decode in decoders:
+                        columns[i] = [decode(value) for value in columns[i]]
+                    rows = list(zip(*columns))
+                    if use_copy:
+                        _copy(model, fields, rows, using)
+                    else:
+                        _insert(model, fields, rows, batch_size, using)
+                counts[model._meta.label] = entry["rows"]
+                loaded.append(model)
+            sequence_sql = connection.ops.sequence_reset_sql(no_style(), loaded)
+            if sequence_sql:
+                with connection.cursor() as cursor:
+                    for sql in sequence_sql:
+                        cursor.execute(sql)
+    return counts
@@ -0,0 +1,24 @@
+from django.urls import path
+
+from . import views
+
+app_name = "ds"
+
+urlpatterns = [
+    path("species/", views.SpeciesListView.as_view(), name="species-list"),
+    path("species/<int:pk>/", views.SpeciesDetailView.as_view(), name="species-detail"),
+    path("rps/", views.RPListView.as_view(), name="rp-list"),
+    path("rps/<int:pk>/", views.RPDetailView.as_view(), name="rp-detail"),
+    path("reactions/", views.ReactionListView.as_view(), name="reaction-list"),
+    path(
+        "reactions/<int:pk>/",
+        views.ReactionDetailView.as_view(),
+        name="reaction-detail",
+    ),
+    path("datasets/<str:label>/", views.DataSetListView.as_view(), name="dataset-list"),
+    path(
+        "datasets/<str:label>/<int:pk>/",
+        views.DataSetDetailView.as_view(),
+        name="dataset-detail",
+    ),
+]
@@ -0,0 +1,251 @@
+"""Read-only JSON views of the species, RPs, reactions and datasets.
+
+The list views return keyset pages (see _utils.pagination.keyset_page) of the
+records of ds.serialization, as {"results": [...], "next": cursor, "previous":
+cursor}, the next and previous cursors being passed back in the cursor query
+parameter; the detail views return the record of a single instance. They are
+optional: include their URLconf in the project's one to use them,
+
+    path("api/", include("ds.urls")),
+
+The responses are conditional. Before serialising anything, the views fetch the
+ids and time_modified timestamps of the rows of the page (or of the instance),
+with the latest time_modified of the related rows whose fields their records hold
+(e.g. the RPs of the reactions, see related_modified), from which they derive its
+ETag, and its Last-Modified time, the latest of these timestamps and of the time
+of the last deletion of an instance of the model (see rp.Tombstone). A request
+whose If-None-Match (or If-Modified-Since) header matches them gets a 304 Not
+Modified response, after that single query (two for the list views). The ETag
+holds the full precision of the timestamps, whereas the Last-Modified time is
+truncated to the second. The refs of the datasets have no timestamps, so adding
+or removing a ref is only seen through the dataset's own time_modified.
+"""
+
+import hashlib
+
+from django.db.models import Max
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views import View
+
+from _utils.pagination import InvalidCursor, keyset_page
+from rp.models import Species, RP, Tombstone
+from rxn.models import Reaction
+from .models import dataset_models
+from .serialization import (
+    dumps,
+    serialize_datasets,
+    serialize_reactions,
+    serialize_rps,
+    serialize_species,
+)
+
+
+class _RecordsView(View):
+    """The base class of the views, serialising the rows of the model with the
+    serialize function."""
+
+    http_method_names = ["get", "head", "options"]
+    model = None
+    # the ds.serialization function returning the records of a queryset
+    serialize = None
+    # the lookups of the time_modified of the related rows held by the records
+    related_modified = ()
+
+    def get_model(self):
+        return self.model
+
+    def get_queryset(self):
+        return self.get_model()._default_manager.all()
+
+    def get_validators(self, queryset, *fields):
+        """Returns the values queryset of the id, time_modified and fields of the
+        rows, with the latest time_modified of their related rows."""
+        return queryset.values("id", "time_modified", *fields).annotate(
+            **{
+                f"related_modified_{i}": Max(lookup)
+                for i, lookup in enumerate(self.related_modified)
+            }
+        )
+
+    @staticmethod
+    def _timestamps(row):
+        """Returns the time_modified and the related timestamps of the row."""
+        return [row["time_modified"]] + [
+            value for name, value in row.items() if name.startswith("related_modified")
+        ]
+
+    def _response(self, request, content, rows, last_modified):
+        """Returns the response with the content (a callable returning it), or the
+        304 (or 412) response, conditional on the ETag derived from the rows (lists
+        of ids and timestamps) and the last_modified time.
+        """
+        key = (
+            self.get_model()._meta.label_lower,
+            request.GET.urlencode(),
+            [
+                [
+                    value.isoformat() if hasattr(value, "isoformat") else value
+                    for value in row
+                ]
+                for row in rows
+            ],
+        )
+        etag = quote_etag(hashlib.sha1(repr(key).encode()).hexdigest())
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = HttpResponse(content(), content_type="application/json")
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        # the clients revalidate their cached copy at every request
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class RecordListView(_RecordsView):
+    """Lists a keyset page of the records, of per_page (up to max_per_page) rows."""
+
+    ordering = None
+    per_page = 50
+    max_per_page = 500
+
+    def get_ordering(self):
+        if self.ordering is not None:
+            return list(self.ordering)
+        return list(getattr(self.get_model(), "keyset_ordering", ("id",)))
+
+    def get(self, request, *args, **kwargs):
+        try:
+            per_page = int(request.GET.get("per_page", self.per_page))
+        except ValueError:
+            return HttpResponseBadRequest("Invalid per_page.")
+        if not 0 < per_page <= self.max_per_page:
+            return HttpResponseBadRequest("Invalid per_page.")
+        queryset = self.get_queryset()
+        ordering = self.get_ordering()
+        names = {field.lstrip("-") for field in ordering} - {"id", "time_modified"}
+        try:
+            page = keyset_page(
+                self.get_validators(queryset, *sorted(names)),
+                request.GET.get("cursor"),
+                per_page,
+                ordering,
+            )
+        except InvalidCursor:
+            return HttpResponseBadRequest("Invalid cursor.")
+        rows = [[row["id"], *self._timestamps(row)] for row in page]
+        times = [time for row in rows for time in row[1:] if time is not None]
+        last_deleted = (
+            Tombstone.objects.using(queryset.db)
+            .filter(model=self.get_model()._meta.label_lower)
+            .order_by("-time_deleted")
+            .values_list("time_deleted", flat=True)
+            .first()
+        )
+        if last_deleted is not None:
+            times.append(last_deleted)
+
+        def content():
+            return dumps(
+                {
+                    "results": self.serialize(
+                        queryset.filter(id__in=[row[0] for row in rows]).order_by(
+                            *ordering
+                        )
+                    ),
+                    "next": page.next_cursor,
+                    "previous": page.previous_cursor,
+                }
+            )
+
+        return self._response(
+            request,
+            content,
+            rows + [[page.next_cursor, page.previous_cursor]],
+            max(times, default=None),
+        )
+
+
+class RecordDetailView(_RecordsView):
+    """Returns the record of the instance of the pk."""
+
+    def get(self, request, pk, *args, **kwargs):
+        queryset = self.get_queryset().filter(pk=pk)
+        rows = [
+            [row["id"], *self._timestamps(row)] for row in self.get_validators(queryset)
+        ]
+        if not rows:
+            raise Http404(f"No {self.get_model()._meta.object_name} with pk {pk}.")
+        times = [time for time in rows[0][1:] if time is not None]
+        return self._response(
+            request,
+            lambda: dumps(self.serialize(queryset)[0]),
+            rows,
+            max(times),
+        )
+
+
+class _DataSetMixin:
+    """Serves the installed ReactionDataSet subclass of the label URL argument."""
+
+    serialize = staticmethod(serialize_datasets)
+    related_modified = (
+        "reaction__time_modified",
+        "reaction__reactants__time_modified",
+        "reaction__products__time_modified",
+    )
+
+    def get_model(self):
+        label = self.kwargs["label"].lower()
+        for model in dataset_models():
+            if model._meta.label_lower == label:
+                return model
+        raise Http404(f"No dataset model {self.kwargs['label']}.")
+
+
+class SpeciesListView(RecordListView):
+    model = Species
+    serialize = staticmethod(serialize_species)
+    ordering = ("text", "id")
+
+
+class SpeciesDetailView(RecordDetailView):
+    model = Species
+    serialize = staticmethod(serialize_species)
+
+
+class RPListView(RecordListView):
+    model = RP
+    serialize = staticmethod(serialize_rps)
+    related_modified = ("species__time_modified",)
+
+
+class RPDetailView(RecordDetailView):
+    model = RP
+    serialize = staticmethod(serialize_rps)
+    related_modified = ("species__time_modified",)
+
+
+class ReactionListView(RecordListView):
+    model = Reaction
+    serialize = staticmethod(serialize_reactions)
+    related_modified = ("reactants__time_modified", "products__time_modified")
+
+
+class ReactionDetailView(RecordDetailView):
+    model = Reaction
+    serialize = staticmethod(serialize_reactions)
+    related_modified = ("reactants__time_modified", "products__time_modified")
+
+
+class DataSetListView(_DataSetMixin, RecordListView):
+    pass
+
+
+class DataSetDetailView(_DataSetMixin, RecordDetailView):
+    pass
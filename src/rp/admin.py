@@ -1,7 +1,62 @@
 from django.contrib import admin
-from .models import Species, RP, State
 
-# Register your models here.
-admin.site.register(Species)
-admin.site.register(RP)
-admin.site.register(State)
+from _utils.admin import (
+    KeysetModelAdmin,
+    ScalableModelAdmin,
+    BoundedTabularInline,
+)
+from .models import Species, SpeciesAlias, SpeciesIdentifier, RP, State
+
+
+class SpeciesAliasInline(BoundedTabularInline):
+    model = SpeciesAlias
+
+
+class SpeciesIdentifierInline(BoundedTabularInline):
+    model = SpeciesIdentifier
+
+
+class StateInline(BoundedTabularInline):
+    model = State
+
+
+@admin.register(Species)
+class SpeciesAdmin(ScalableModelAdmin):
+    list_display = ("id", "text", "charge", "natoms", "mass")
+    search_fields = ("text__startswith",)
+    inlines = (SpeciesAliasInline, SpeciesIdentifierInline)
+
+
+@admin.register(SpeciesAlias)
+class SpeciesAliasAdmin(ScalableModelAdmin):
+    list_display = ("text", "species")
+    list_select_related = ("species",)
+    search_fields = ("text__startswith",)
+    autocomplete_fields = ("species",)
+
+
+@admin.register(SpeciesIdentifier)
+class SpeciesIdentifierAdmin(ScalableModelAdmin):
+    list_display = ("value", "kind", "species")
+    list_filter = ("kind",)
+    list_select_related = ("species",)
+    search_fields = ("value__startswith",)
+    autocomplete_fields = ("species",)
+
+
+@admin.register(RP)
+class RPAdmin(KeysetModelAdmin):
+    list_display = ("id", "text", "species")
+    list_select_related = ("species",)
+    search_fields = ("text__startswith",)
+    autocomplete_fields = ("species",)
+    inlines = (StateInline,)
+
+
+@admin.register(State)
+class StateAdmin(ScalableModelAdmin):
+    list_display = ("id", "text", "state_type", "rp")
+    list_select_related = ("rp",)
+    list_filter = ("state_type",)
+    search_fields = ("text__startswith",)
+    autocomplete_fields = ("rp",)
@@ -0,0 +1,191 @@
+"""Bulk upsert of the SpeciesAlias rows, for the large synonym tables.
+
+upsert_aliases reads (alias text, target formula) pairs in batches: the distinct
+target formulae of a batch are canonicalised with pyvalem (each formula only once
+per load) and resolved to their Species with a single text__in query, and the
+existing aliases of the batch are read with another, to sort the pairs into the
+new, unchanged and conflicting ones (the aliases of another species). An alias
+text repeated in the rows is a duplicate: only its first pair is considered. The new
+aliases are inserted with a single bulk_create(ignore_conflicts=True) per batch,
+and with update=True the conflicting ones are repointed to their new species by
+the same statement, as an INSERT ... ON CONFLICT (text) DO UPDATE, or by a
+bulk_update on the backends and django versions without one:
+
+    with open("synonyms.tsv") as fi:
+        report = upsert_aliases(csv.reader(fi, delimiter="\\t"), update=True)
+    print(report)
+
+Each batch is written in its own transaction. Also available as the load_aliases
+management command.
+"""
+
+import time
+
+from django.db import transaction, DEFAULT_DB_ALIAS
+from django.utils import timezone
+from pyvalem.formula import Formula
+
+from _utils.bulk import can_bulk_upsert
+from _utils.export import chunked
+from .models import Species, SpeciesAlias
+
+
+class AliasReport:
+    """The numbers of the aliases inserted, updated, unchanged, conflicting (left
+    pointing to another species) and duplicate, and of those skipped for their
+    target formula being invalid or not a Species, with the elapsed time."""
+
+    def __init__(self, update):
+        self.update = update
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.conflicting = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.unresolved = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    def __str__(self):
+        lines = [
+            f"Inserted {self.inserted} rp.SpeciesAlias rows",
+            f"Updated {self.updated} rp.SpeciesAlias rows",
+            f"{self.unchanged} unchanged, {self.conflicting} conflicting, "
+            f"{self.duplicates} duplicate",
+        ]
+        if self.invalid or self.unresolved:
+            lines.append(
+                f"Skipped {self.invalid} invalid and {self.unresolved} unresolved "
+                "target formulae"
+            )
+        lines.append(f"in {self.batches} batches, {self.seconds:.2f} s")
+        return "\n".join(lines)
+
+
+def _canonical(text):
+    """Returns the canonical text of the formula, or None if it is invalid."""
+    # pyvalem raises many exception classes without a common base class
+    try:
+        return repr(Formula(text))
+    except Exception:
+        return None
+
+
+def _resolve(targets, cache, create_species, using):
+    """Adds the ids of the Species of the target formulae to the cache, None for
+    those invalid and False for those not found."""
+    canonical = {text: _canonical(text) for text in targets if text not in cache}
+    if not canonical:
+        return
+    species_ids = dict(
+        Species.objects.using(using)
+        .filter(text__in={text for text in canonical.values() if text is not None})
+        .values_list("text", "id")
+    )
+    for text, text_can in canonical.items():
+        if text_can is not None and text_can not in species_ids and create_species:
+            species, _ = Species.get_or_create_from_text(
+                text_can, lean=True, using=using
+            )
+            species_ids[text_can] = species.pk
+        cache[text] = species_ids.get(text_can, False) if text_can else None
+
+
+def _upsert(objs, update, using):
+    """Writes the new (and, if update, the conflicting) aliases."""
+    if update and can_bulk_upsert(using):
+        # the existing rows are matched by their text
+        for obj in objs:
+            obj.pk = None
+        SpeciesAlias.objects.using(using).bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["text"],
+            update_fields=["species", "time_modified"],
+        )
+        return
+    new = [obj for obj in objs if obj.pk is None]
+    SpeciesAlias.objects.using(using).bulk_create(new, ignore_conflicts=True)
+    if update:
+        changed = [obj for obj in objs if obj.pk is not None]
+        SpeciesAlias.objects.using(using).bulk_update(
+            changed, ["species", "time_modified"]
+        )
+
+
+def upsert_aliases(
+    rows, update=False, create_species=False, batch_size=5000, using=DEFAULT_DB_ALIAS
+):
+    """Inserts (or updates) the aliases of the rows.
+
+    Parameters
+    ----------
+    rows : iterable of (str, str)
+        The (alias text, target formula) pairs. Of the pairs with the same alias
+        text, only the first is considered.
+    update : bool
+        Repoint the existing aliases of other species to the target ones.
+    create_species : bool
+        Create the target Species not in the database, rather than skipping
+        them.
+    batch_size : int
+        The number of rows read and written at a time.
+    using : str
+
+    Returns
+    -------
+    AliasReport
+    """
+    report = AliasReport(update)
+    start = time.perf_counter()
+    # the Species ids of the target formulae: False if not found, None if invalid
+    cache = {}
+    seen = set()
+    for batch in chunked(rows, batch_size):
+        aliases = {}
+        for text, target in batch:
+            text = text.strip()
+            if text in seen:
+                report.duplicates += 1
+                continue
+            seen.add(text)
+            aliases[text] = target.strip()
+        with transaction.atomic(using=using):
+            _resolve(set(aliases.values()), cache, create_species, using)
+            existing = {
+                text: (pk, species_id)
+                for pk, text, species_id in SpeciesAlias.objects.using(using)
+                .filter(text__in=list(aliases))
+                .values_list("pk", "text", "species_id")
+            }
+            now = timezone.now()
+            objs = []
+            for text, target in aliases.items():
+                species_id = cache[target]
+                if species_id is None:
+                    report.invalid += 1
+                    continue
+                if species_id is False:
+                    report.unresolved += 1
+                    continue
+                pk, existing_species_id = existing.get(text, (None, None))
+                if pk is None:
+                    report.inserted += 1
+                elif existing_species_id == species_id:
+                    report.unchanged += 1
+                    continue
+                elif update:
+                    report.updated += 1
+                else:
+                    report.conflicting += 1
+                    continue
+                objs.append(
+                    SpeciesAlias(
+                        pk=pk, text=text, species_id=species_id, time_modified=now
+                    )
+                )
+            _upsert(objs, update, using)
+        report.batches += 1
+    report.seconds = time.perf_counter() - start
+    return report
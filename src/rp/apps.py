@@ -1,6 +1,21 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete
 
 
 class RpConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rp"
+
+    def ready(self):
+        from _utils.models import ProvenanceMixin
+        from .models import Tombstone
+
+        # record the deletions of all the ProvenanceMixin models, including the
+        # ReactionDataSet subclasses of other apps, for the change feed
+        for model in apps.get_models():
+            if issubclass(model, ProvenanceMixin):
+                post_delete.connect(
+                    Tombstone.record_deletion,
+                    sender=model,
+                    dispatch_uid=f"tombstone_{model._meta.label_lower}",
+                )
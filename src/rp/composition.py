@@ -0,0 +1,97 @@
+"""Backfill of the elemental composition of the Species.
+
+The Species created by get_or_create_from_text are indexed on their creation; those
+created before (or loaded otherwise) have a null natoms. index_composition parses
+their texts with pyvalem in batches, in the order of their primary keys, and writes
+each batch (the SpeciesComposition rows with a bulk_create, the natoms and mass
+with a bulk_update) in its own transaction, so an interrupted backfill simply
+resumes with the species still not indexed. The species pyvalem cannot parse are
+counted as failed and left not indexed.
+
+    print(index_composition())
+
+Also available as the index_composition management command.
+"""
+
+import time
+
+from django.db import transaction, DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from _utils.composition import text_composition
+from .models import Species, SpeciesComposition
+
+
+class CompositionReport:
+    """The numbers of the species indexed and failed, with the number of the batches
+    and the elapsed time."""
+
+    def __init__(self):
+        self.indexed = 0
+        self.failed = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    def __str__(self):
+        lines = [f"Indexed {self.indexed} rp.Species rows"]
+        if self.failed:
+            lines.append(f"Failed to index {self.failed} rp.Species rows")
+        lines.append(f"in {self.batches} batches, {self.seconds:.2f} s")
+        return "\n".join(lines)
+
+
+def index_composition(rebuild=False, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """Indexes the elemental composition of the species not indexed yet.
+
+    Parameters
+    ----------
+    rebuild : bool
+        Re-index all the species, replacing their composition rows.
+    batch_size : int
+        The number of species indexed at a time.
+    using : str
+
+    Returns
+    -------
+    CompositionReport
+    """
+    report = CompositionReport()
+    start = time.perf_counter()
+    species = Species.objects.using(using)
+    if not rebuild:
+        species = species.filter(natoms__isnull=True)
+    last_pk = 0
+    while True:
+        rows = list(
+            species.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "text")[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        now = timezone.now()
+        objs, compositions = [], []
+        for pk, text in rows:
+            composition = text_composition(text)
+            if composition is None:
+                report.failed += 1
+                continue
+            counts, natoms, mass = composition
+            objs.append(Species(pk=pk, natoms=natoms, mass=mass, time_modified=now))
+            compositions.extend(
+                SpeciesComposition(species_id=pk, element=element, count=n)
+                for element, n in counts.items()
+            )
+        with transaction.atomic(using=using):
+            SpeciesComposition.objects.using(using).filter(
+                species_id__in=[obj.pk for obj in objs]
+            ).delete()
+            SpeciesComposition.objects.using(using).bulk_create(compositions)
+            Species.objects.using(using).bulk_update(
+                objs, ["natoms", "mass", "time_modified"]
+            )
+        report.indexed += len(objs)
+        report.batches += 1
+    report.seconds = time.perf_counter() - start
+    return report
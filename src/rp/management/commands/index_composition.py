@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from rp.composition import index_composition
+
+
+class Command(BaseCommand):
+    help = (
+        "Indexes the elemental composition, number of atoms and mass of the "
+        "species not indexed yet. Resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="re-index all the species",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        report = index_composition(
+            rebuild=options["rebuild"],
+            batch_size=options["batch_size"],
+            using=options["database"],
+        )
+        self.stdout.write(str(report))
@@ -0,0 +1,44 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from rp.aliases import upsert_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads the species aliases of a delimited file of (alias, formula) rows "
+        "in bulk, inserting the new aliases and optionally updating the others."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="the file of the (alias, formula) rows")
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="repoint the existing aliases of other species",
+        )
+        parser.add_argument(
+            "--create-species",
+            action="store_true",
+            help="create the species not in the database",
+        )
+        parser.add_argument("--delimiter", default="\t")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        with open(options["input"], newline="", encoding="utf-8") as fi:
+            rows = (
+                row[:2]
+                for row in csv.reader(fi, delimiter=options["delimiter"])
+                if len(row) >= 2 and not row[0].startswith("#")
+            )
+            report = upsert_aliases(
+                rows,
+                update=options["update"],
+                create_species=options["create_species"],
+                batch_size=options["batch_size"],
+                using=options["database"],
+            )
+        self.stdout.write(str(report))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rp", "0002_auto_20220707_1025"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="rp",
+            name="text",
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name="species",
+            name="text",
+            field=models.CharField(db_index=True, max_length=80),
+        ),
+        migrations.AlterField(
+            model_name="state",
+            name="text",
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,55 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def provenance_fields(model_name):
+    return [
+        migrations.AddField(
+            model_name=model_name,
+            name="added_by_user_id",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name="time_added",
+            field=models.DateTimeField(
+                auto_now_add=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name="time_modified",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rp", "0003_alter_rp_text_alter_species_text_alter_state_text"),
+    ]
+
+    operations = [
+        *provenance_fields("species"),
+        *provenance_fields("speciesalias"),
+        *provenance_fields("rp"),
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("model", models.CharField(max_length=100)),
+                ("object_id", models.BigIntegerField()),
+                ("time_deleted", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["model", "time_deleted"],
+                        name="rp_tombston_model_71decf_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rp", "0004_provenance_tombstone"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rp",
+            index=models.Index(fields=["text", "id"], name="rp_rp_text_de1731_idx"),
+        ),
+    ]
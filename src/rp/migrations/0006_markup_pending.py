@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rp", "0005_rp_rp_rp_text_de1731_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rp",
+            name="markup_pending",
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name="species",
+            name="markup_pending",
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name="state",
+            name="markup_pending",
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rp", "0006_markup_pending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="species",
+            name="mass",
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="species",
+            name="natoms",
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="SpeciesComposition",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("element", models.CharField(max_length=3)),
+                ("count", models.PositiveIntegerField()),
+                (
+                    "species",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="composition",
+                        to="rp.species",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["element", "count"],
+                        name="rp_speciesc_element_29ab37_idx",
+                    )
+                ],
+                "unique_together": {("species", "element")},
+            },
+        ),
+    ]
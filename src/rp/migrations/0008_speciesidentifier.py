@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rp", "0007_species_composition"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpeciesIdentifier",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("added_by_user_id", models.IntegerField(blank=True, null=True)),
+                ("time_added", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("time_modified", models.DateTimeField(auto_now=True, db_index=True)),
+                (
+                    "kind",
+                    models.SmallIntegerField(
+                        choices=[
+                            (0, "InChI"),
+                            (1, "InChIKey"),
+                            (2, "SMILES"),
+                            (3, "CAS"),
+                        ]
+                    ),
+                ),
+                ("value", models.CharField(max_length=512)),
+                (
+                    "species",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="identifiers",
+                        to="rp.species",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("kind", "value")},
+            },
+        ),
+    ]
@@ -1,19 +1,86 @@
 import re
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
 from pyvalem.formula import Formula
 from pyvalem.stateful_species import StatefulSpecies
 
-from _utils.models import QualifiedIDMixin
-
-
-class Species(QualifiedIDMixin, models.Model):
+from _utils.composition import formula_composition
+from _utils.instrumentation import instrumented, parse_timer
+from _utils.routers import lookup_databases, mark_written
+from _utils.markup import markup_deferred
+from _utils.models import (
+    LeanKeysetQuerySet,
+    LeanQuerySet,
+    MarkupPendingMixin,
+    ProvenanceMixin,
+    QualifiedIDMixin,
+)
+
+
+class SpeciesQuerySet(LeanQuerySet):
+    """The Species QuerySet, with the filters on their elemental composition (see
+    _utils.composition), all run in SQL:
+
+        # the species containing Be and H with at most 3 atoms
+        Species.objects.containing("Be", "H").natoms_between(max=3)
+        # the carbon-bearing ions
+        Species.objects.containing("C").exclude(charge=0)
+        # the hydrocarbons with at least 2 carbon atoms
+        Species.objects.composed_of("C", "H").containing(C__gte=2)
+    """
+
+    def _composition(self, **lookups):
+        return SpeciesComposition.objects.filter(species=OuterRef("pk"), **lookups)
+
+    def containing(self, *elements, **counts):
+        """Filters for the species containing all the elements, and the elements of
+        the counts keyword arguments in the given numbers: e.g. H=2 for exactly 2
+        hydrogen atoms, H__lte=2 for 1 or 2 (any count lookup is accepted)."""
+        qs = self
+        for element in elements:
+            qs = qs.filter(Exists(self._composition(element=element)))
+        for key, count in counts.items():
+            element, _, lookup = key.partition("__")
+            count_lookup = {f"count__{lookup or 'exact'}": count}
+            qs = qs.filter(Exists(self._composition(element=element, **count_lookup)))
+        return qs
+
+    def composed_of(self, *elements):
+        """Filters for the (indexed) species with no other elements than these."""
+        return self.filter(natoms__isnull=False).exclude(
+            Exists(self._composition().exclude(element__in=elements))
+        )
+
+    def natoms_between(self, min=None, max=None):
+        """Filters for the species with a total number of atoms in [min, max]."""
+        return self._between("natoms", min, max)
+
+    def mass_between(self, min=None, max=None):
+        """Filters for the species with a mass (in Da) in [min, max]."""
+        return self._between("mass", min, max)
+
+    def _between(self, name, min, max):
+        qs = self.filter(**{f"{name}__isnull": False})
+        if min is not None:
+            qs = qs.filter(**{f"{name}__gte": min})
+        if max is not None:
+            qs = qs.filter(**{f"{name}__lte": max})
+        return qs
+
+
+class Species(QualifiedIDMixin, ProvenanceMixin, MarkupPendingMixin, models.Model):
     qid_prefix = "F"
 
     id = models.AutoField(primary_key=True)
 
-    text = models.CharField(max_length=80)
+    text = models.CharField(max_length=80, db_index=True)
     html = models.CharField(max_length=200)
     charge = models.SmallIntegerField(default=0, null=True)
+    # the elemental composition, null until indexed (see _utils.composition)
+    natoms = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    mass = models.FloatField(null=True, blank=True, db_index=True)
+
+    objects = SpeciesQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "Species"
@@ -22,7 +89,8 @@ class Species(QualifiedIDMixin, models.Model):
         return self.text
 
     @classmethod
-    def get_from_text(cls, text):
+    @instrumented
+    def get_from_text(cls, text, using=None):
         """Looks for a Species with equivalent canonicalised version of the
         text. Uses pyvalem Formula.__repr__ for the canonicalisation.
         If not present, Species.DoesNotExist is raised.
@@ -30,42 +98,95 @@ class Species(QualifiedIDMixin, models.Model):
         Parameters
         ----------
         text : str
+        using : str, optional
+            The database alias, defaults to the routed read database.
 
         Returns
         -------
         Species
         """
-        text_can = repr(Formula(text))
-        return cls.objects.get(text=text_can)
+        with parse_timer():
+            text_can = repr(Formula(text))
+        return cls.objects.using(using).get(text=text_can)
 
     @classmethod
-    def get_or_create_from_text(cls, text):
+    @instrumented
+    def get_or_create_from_text(cls, text, lean=False, using=None):
         """Looks for a Species with equivalent canonicalised version of the
         text.
 
         Parameters
         ----------
         text : str
+        lean : bool
+            Defer the markup fields of an existing Species, if only its id and
+            text are needed.
+        using : str, optional
+            The database alias, defaults to the routed read database for the
+            lookup, and to the write database for the creation (see
+            _utils.routers.lookup_databases).
 
         Returns
         -------
         (Species, bool)
         """
-        pyvalem_formula = Formula(text)
-        text_can = repr(pyvalem_formula)
-        try:
-            return cls.objects.get(text=text_can), False
-        except cls.DoesNotExist:
+        with parse_timer():
+            pyvalem_formula = Formula(text)
+            text_can = repr(pyvalem_formula)
+        species = cls.objects.lean() if lean else cls.objects.all()
+        databases = lookup_databases(cls, using)
+        for db in databases:
+            try:
+                return species.using(db).get(text=text_can), False
+            except cls.DoesNotExist:
+                pass
+        db = databases[-1]
+        mark_written(db)
+        pending = markup_deferred()
+        if not pending:
             # re-instantiate the pyvalem_formula with canonicalised
             # text to canonicalise html also:
-            pyvalem_formula = Formula(text_can)
-            species = cls.objects.create(
-                text=text_can, charge=pyvalem_formula.charge, html=pyvalem_formula.html
+            with parse_timer():
+                pyvalem_formula = Formula(text_can)
+        counts, natoms, mass = formula_composition(pyvalem_formula)
+        # the species and its composition, without a savepoint if nested
+        with transaction.atomic(using=db, savepoint=False):
+            species = cls.objects.using(db).create(
+                text=text_can,
+                charge=pyvalem_formula.charge,
+                html="" if pending else pyvalem_formula.html,
+                markup_pending=pending,
+                natoms=natoms,
+                mass=mass,
             )
-            return species, True
+            if counts:
+                SpeciesComposition.objects.using(db).bulk_create(
+                    [
+                        SpeciesComposition(species=species, element=element, count=n)
+                        for element, n in counts.items()
+                    ]
+                )
+        return species, True
+
 
+class SpeciesComposition(models.Model):
+    """The number of the atoms of an element in a Species, isotopes included."""
+
+    species = models.ForeignKey(
+        Species, on_delete=models.CASCADE, related_name="composition"
+    )
+    element = models.CharField(max_length=3)
+    count = models.PositiveIntegerField()
 
-class SpeciesAlias(models.Model):
+    class Meta:
+        indexes = [models.Index(fields=["element", "count"])]
+        unique_together = ("species", "element")
+
+    def __str__(self):
+        return f"{self.species_id}: {self.element}{self.count}"
+
+
+class SpeciesAlias(ProvenanceMixin, models.Model):
     text = models.CharField(max_length=80, unique=True)
     species = models.ForeignKey(Species, on_delete=models.CASCADE)
 
@@ -73,20 +194,146 @@ class SpeciesAlias(models.Model):
         return f"{self.text} -> {self.species.text}"
 
 
-class RP(QualifiedIDMixin, models.Model):
+class SpeciesIdentifier(ProvenanceMixin, models.Model):
+    """A structural or registry identifier of a Species, of one of the KIND_CHOICES.
+
+    The InChIs are stored with their "InChI=" prefix. Unlike the free-form
+    SpeciesAlias texts, the identifiers are unique per kind, and looked up by
+    the (kind, value) index, see resolve.
+    """
+
+    INCHI = 0
+    INCHIKEY = 1
+    SMILES = 2
+    CAS = 3
+
+    KIND_CHOICES = (
+        (INCHI, "InChI"),
+        (INCHIKEY, "InChIKey"),
+        (SMILES, "SMILES"),
+        (CAS, "CAS"),
+    )
+
+    KIND_MAP = {v: k for k, v in KIND_CHOICES}
+
+    INCHIKEY_PATTERN = re.compile(r"^[A-Z]{14}-[A-Z]{10}-[A-Z]$")
+    CAS_PATTERN = re.compile(r"^(\d{2,7})-(\d{2})-(\d)$")
+
+    species = models.ForeignKey(
+        Species, on_delete=models.CASCADE, related_name="identifiers"
+    )
+    kind = models.SmallIntegerField(choices=KIND_CHOICES)
+    value = models.CharField(max_length=512)
+
+    class Meta:
+        unique_together = ("kind", "value")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.value} -> {self.species_id}"
+
+    @classmethod
+    def parse(cls, identifier):
+        """Returns the (kind, value) of the identifier, or None if it is not one.
+
+        Parameters
+        ----------
+        identifier : str or (int or str, str)
+            An InChI (with or without its "InChI=" prefix), an InChIKey or a CAS
+            registry number, recognised by their syntax, or a (kind, value) tuple
+            of any kind (e.g. ("SMILES", "C[O]")), the kind being one of the
+            KIND_CHOICES, or its name (None being returned for any other kind).
+
+        Returns
+        -------
+        (int, str) or None
+        """
+        if isinstance(identifier, tuple):
+            kind, value = identifier
+            kind = cls.KIND_MAP.get(kind, kind)
+            if kind not in cls.KIND_MAP.values():
+                return None
+            if kind == cls.INCHI and value.startswith("1S/"):
+                value = f"InChI={value}"
+            return kind, value
+        identifier = identifier.strip()
+        if identifier.startswith("InChI="):
+            return cls.INCHI, identifier
+        if identifier.startswith("1S/"):
+            return cls.INCHI, f"InChI={identifier}"
+        if cls.INCHIKEY_PATTERN.match(identifier):
+            return cls.INCHIKEY, identifier
+        match = cls.CAS_PATTERN.match(identifier)
+        if match:
+            digits = "".join(match.groups()[:2])
+            checksum = sum(i * int(d) for i, d in enumerate(reversed(digits), 1))
+            if checksum % 10 == int(match.group(3)):
+                return cls.CAS, identifier
+        return None
+
+    @classmethod
+    @instrumented
+    def resolve(cls, identifiers, batch_size=500, using=None):
+        """Maps the identifiers (of mixed kinds) to their Species, with a single
+        query per kind (and batch of batch_size identifiers).
+
+        Parameters
+        ----------
+        identifiers : iterable
+            The identifiers, as accepted by parse.
+        batch_size : int
+            The maximal number of identifiers looked up by a single query.
+        using : str, optional
+            The database alias, defaults to the routed read database.
+
+        Returns
+        -------
+        dict
+            The Species (with their markup deferred) by identifier, without the
+            identifiers not found or not recognised.
+        """
+        by_kind = {}
+        for identifier in identifiers:
+            parsed = cls.parse(identifier)
+            if parsed is not None:
+                kind, value = parsed
+                by_kind.setdefault(kind, {}).setdefault(value, []).append(identifier)
+        resolved = {}
+        for kind, values in by_kind.items():
+            values_list = sorted(values)
+            for i in range(0, len(values_list), batch_size):
+                rows = (
+                    cls.objects.using(using)
+                    .filter(kind=kind, value__in=values_list[i : i + batch_size])
+                    .select_related("species")
+                    .defer("species__html")
+                )
+                for row in rows:
+                    for identifier in values[row.value]:
+                        resolved[identifier] = row.species
+        return resolved
+
+
+class RP(QualifiedIDMixin, ProvenanceMixin, MarkupPendingMixin, models.Model):
     qid_prefix = "RP"
 
     id = models.AutoField(primary_key=True)
     species = models.ForeignKey(Species, on_delete=models.CASCADE)
 
-    text = models.CharField(max_length=200)
+    text = models.CharField(max_length=200, db_index=True)
     html = models.CharField(max_length=600)
 
+    objects = LeanKeysetQuerySet.as_manager()
+    keyset_ordering = ("text", "id")
+
+    class Meta:
+        indexes = [models.Index(fields=["text", "id"])]
+
     def __str__(self):
         return self.text
 
     @classmethod
-    def get_from_text(cls, text):
+    @instrumented
+    def get_from_text(cls, text, using=None):
         """Looks for RP with equivalent canonicalised version of the
         text. Uses pyvalem StatefulSpecies.__repr__ for the canonicalisation.
         If not present, RP.DoesNotExist is raised.
@@ -94,25 +341,32 @@ class RP(QualifiedIDMixin, models.Model):
         Parameters
         ----------
         text : str
+        using : str, optional
+            The database alias, defaults to the routed read database.
 
         Returns
         -------
         RP
         """
-        text_can = repr(StatefulSpecies(text))
+        with parse_timer():
+            text_can = repr(StatefulSpecies(text))
         # TODO Look up Species formula in SpeciesAlias table.
-        return cls.objects.get(text=text_can)
+        return cls.objects.using(using).select_related("species").get(text=text_can)
 
     @classmethod
-    def filter_from_text(cls, text, inchi_lookup=False):
+    @instrumented
+    def filter_from_text(cls, text, inchi_lookup=False, using=None):
         """Filters for RP using canonicalised version of the StatefulSpecies
         represented by text, having first resolved the Species formula into
         its canonical form for this database by looking it up in the
-        SpeciesAlias table.
+        SpeciesAlias table. A leading InChI or InChIKey is resolved in the
+        SpeciesIdentifier table (or, failing that, in the SpeciesAlias table).
 
         Parameters
         ----------
         text : str
+        using : str, optional
+            The database alias, defaults to the routed read database.
 
         Returns
         -------
@@ -123,20 +377,38 @@ class RP(QualifiedIDMixin, models.Model):
         if text.startswith("InChI=") or text.startswith("1S/") or re.match(patt, text):
             chunks = text.split()
             species_text, states = chunks[0], chunks[1:]
-            try:
-                species = SpeciesAlias.objects.get(text=species_text).species
-            except SpeciesAlias.DoesNotExist:
-                return cls.objects.none()
+            species = SpeciesIdentifier.resolve([species_text], using=using).get(
+                species_text
+            )
+            if species is None:
+                try:
+                    species = (
+                        SpeciesAlias.objects.using(using)
+                        .select_related("species")
+                        .defer("species__html")
+                        .get(text=species_text)
+                        .species
+                    )
+                except SpeciesAlias.DoesNotExist:
+                    return cls.objects.using(using).none()
             # Replace the InChI / InChIKey with the canonical text representation
             text = " ".join([species.text] + states)
 
-        ss = StatefulSpecies(text)
+        with parse_timer():
+            ss = StatefulSpecies(text)
 
+        rps = cls.objects.using(using).select_related("species")
         try:
-            species = SpeciesAlias.objects.get(text=ss.formula).species
-            rps = cls.objects.filter(species__text=species.text)
+            species = (
+                SpeciesAlias.objects.using(using)
+                .select_related("species")
+                .defer("species__html")
+                .get(text=ss.formula)
+                .species
+            )
+            rps = rps.filter(species__text=species.text)
         except SpeciesAlias.DoesNotExist:
-            rps = cls.objects.filter(species__text=ss.formula)
+            rps = rps.filter(species__text=ss.formula)
 
         for state in ss.states:
             rps = rps.filter(state__text=state)
@@ -144,42 +416,73 @@ class RP(QualifiedIDMixin, models.Model):
         return rps
 
     @classmethod
-    def get_or_create_from_text(cls, text):
+    @instrumented
+    def get_or_create_from_text(cls, text, lean=False, using=None):
         """Looks for a Species with equivalent canonicalised version of the
         text.
 
         Parameters
         ----------
         text : str
+        lean : bool
+            Defer the markup fields of an existing RP and of its Species, if only
+            their ids, texts and charge are needed.
+        using : str, optional
+            The database alias, defaults to the routed read database for the
+            lookup, and to the write database for the creation (see
+            _utils.routers.lookup_databases).
 
         Returns
         -------
         (RP, bool)
         """
-        pyvalem_stateful_species = StatefulSpecies(text)
-        text_can = repr(pyvalem_stateful_species)
-        try:
-            return cls.objects.get(text=text_can), False
-        except cls.DoesNotExist:
-            pyvalem_formula = pyvalem_stateful_species.formula
-            species, _ = Species.get_or_create_from_text(repr(pyvalem_formula))
+        with parse_timer():
+            pyvalem_stateful_species = StatefulSpecies(text)
+            text_can = repr(pyvalem_stateful_species)
+        rps = cls.objects.select_related("species")
+        if lean:
+            rps = rps.lean("species")
+        databases = lookup_databases(cls, using)
+        for db in databases:
+            try:
+                return rps.using(db).get(text=text_can), False
+            except cls.DoesNotExist:
+                pass
+        db = databases[-1]
+        mark_written(db)
+        pyvalem_formula = pyvalem_stateful_species.formula
+        # only the id of the species is needed
+        species, _ = Species.get_or_create_from_text(
+            repr(pyvalem_formula), lean=True, using=db
+        )
+        pending = markup_deferred()
+        if not pending:
             # re-instantiate the pyvalem_stateful_species with canonicalised
             # text to canonicalise html also and sort the states consistently
             # with the text and html:
-            pyvalem_stateful_species = StatefulSpecies(text_can)
-            # build the RP instance:
-            rp = cls.objects.create(
-                species=species, text=text_can, html=pyvalem_stateful_species.html
-            )
-            # attach the states:
-            for pyvalem_state in pyvalem_stateful_species.states:
-                State.objects.create(
+            with parse_timer():
+                pyvalem_stateful_species = StatefulSpecies(text_can)
+        # build the RP instance:
+        rp = cls.objects.using(db).create(
+            species=species,
+            text=text_can,
+            html="" if pending else pyvalem_stateful_species.html,
+            markup_pending=pending,
+        )
+        # attach the states:
+        State.objects.using(db).bulk_create(
+            [
+                State(
                     rp=rp,
                     text=repr(pyvalem_state),
-                    html=pyvalem_state.html,
+                    html="" if pending else pyvalem_state.html,
                     state_type=State.STATE_TYPE_MAP[pyvalem_state.__class__.__name__],
+                    markup_pending=pending,
                 )
-            return rp, True
+                for pyvalem_state in pyvalem_stateful_species.states
+            ]
+        )
+        return rp, True
 
     @property
     def charge(self):
@@ -187,7 +490,7 @@ class RP(QualifiedIDMixin, models.Model):
         return self.species.charge
 
 
-class State(QualifiedIDMixin, models.Model):
+class State(QualifiedIDMixin, MarkupPendingMixin, models.Model):
     qid_prefix = "S"
 
     KEY_VALUE_PAIR = 0
@@ -218,8 +521,37 @@ class State(QualifiedIDMixin, models.Model):
     rp = models.ForeignKey(RP, on_delete=models.CASCADE)
 
     state_type = models.SmallIntegerField(choices=STATE_TYPE_CHOICES)
-    text = models.CharField(max_length=64)
+    text = models.CharField(max_length=64, db_index=True)
     html = models.CharField(max_length=100)
 
+    objects = LeanQuerySet.as_manager()
+
     def __str__(self):
         return self.text
+
+
+class Tombstone(models.Model):
+    """A record of the deletion of a ProvenanceMixin model instance.
+
+    The tombstones are written by a post_delete signal receiver connected for all the
+    ProvenanceMixin models (see RpConfig.ready), and read by the change feed (see
+    ds.changefeed) to propagate the deletions.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    time_deleted = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["model", "time_deleted"])]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
+
+    @classmethod
+    def record_deletion(cls, sender, instance, using, **kwargs):
+        """The post_delete signal receiver."""
+        cls.objects.using(using).create(
+            model=sender._meta.label_lower, object_id=instance.pk
+        )
@@ -1,6 +1,49 @@
 from django.contrib import admin
-from .models import ProcessType, Reaction
 
-# Register your models here.
-admin.site.register(ProcessType)
-admin.site.register(Reaction)
+from _utils.admin import (
+    KeysetModelAdmin,
+    ScalableModelAdmin,
+    BoundedTabularInline,
+)
+from .models import ProcessType, Reaction, ReactantList, ProductList, SpeciesStats
+
+
+class ReactantListInline(BoundedTabularInline):
+    model = ReactantList
+    autocomplete_fields = ("rp",)
+
+
+class ProductListInline(BoundedTabularInline):
+    model = ProductList
+    autocomplete_fields = ("rp",)
+
+
+@admin.register(ProcessType)
+class ProcessTypeAdmin(admin.ModelAdmin):
+    list_display = ("abbreviation", "description")
+    search_fields = ("abbreviation", "description")
+
+
+@admin.register(Reaction)
+class ReactionAdmin(KeysetModelAdmin):
+    list_display = ("id", "text", "comment")
+    list_filter = ("process_types",)
+    search_fields = ("text__startswith",)
+    inlines = (ReactantListInline, ProductListInline)
+
+
+@admin.register(SpeciesStats)
+class SpeciesStatsAdmin(ScalableModelAdmin):
+    list_display = (
+        "species",
+        "rp",
+        "process_type",
+        "reactions",
+        "reactant_reactions",
+        "product_reactions",
+        "datasets",
+    )
+    list_select_related = ("species", "rp", "process_type")
+    list_filter = ("process_type",)
+    search_fields = ("species__text__startswith",)
+    raw_id_fields = ("species", "rp")
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class RxnConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rxn"
+
+    def ready(self):
+        if getattr(settings, "VALEM_SPECIES_STATS", False):
+            from .stats import connect_signals
+
+            connect_signals()
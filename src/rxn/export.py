@@ -0,0 +1,111 @@
+"""Streaming export of Reaction instances.
+
+The reactions are read with a chunked iterator, and for every chunk their reactants,
+products (with their states) and process types are fetched with a fixed number of
+values() queries, so the export runs in constant memory and with a number of queries
+proportional to the number of chunks, regardless of the size of the table.
+"""
+
+from collections import defaultdict
+
+from _utils.export import chunked
+from rp.models import RP, State
+from .models import Reaction, ReactantList, ProductList
+
+REACTION_FIELDS = ("id", "text", "ordered_text", "html", "latex", "comment")
+
+
+def rp_records(queryset, state_html=False):
+    """Returns the export records of the RPs of the queryset, in its ordering, as
+    dicts with their id, text, html and species_id, the charge of their species
+    and the list of their states: their texts, or dicts with their text and html
+    if state_html. The states are fetched from the database of the queryset.
+    """
+    using = queryset.db
+    rows = list(
+        queryset.using(using).values_list(
+            "id", "text", "html", "species_id", "species__charge"
+        )
+    )
+    states = defaultdict(list)
+    for rp_id, text, html in (
+        State.objects.using(using)
+        .filter(rp_id__in=[row[0] for row in rows])
+        .order_by("id")
+        .values_list("rp_id", "text", "html")
+    ):
+        states[rp_id].append({"text": text, "html": html} if state_html else text)
+    return [
+        {
+            "id": rp_id,
+            "text": text,
+            "html": html,
+            "species_id": species_id,
+            "charge": charge,
+            "states": states[rp_id],
+        }
+        for rp_id, text, html, species_id, charge in rows
+    ]
+
+
+def reaction_records(rows, using=None, fields=REACTION_FIELDS, state_html=False):
+    """Returns the export records of the reactions given as a list of dicts with
+    (at least) their fields, e.g. from Reaction.objects.values(), with their
+    process types, reactants and products (see rp_records) fetched from the
+    database using (the routed one by default).
+    """
+    reaction_ids = [row["id"] for row in rows]
+    sides = {}
+    rp_ids = set()
+    for side, Intermediate in ("reactants", ReactantList), ("products", ProductList):
+        sides[side] = defaultdict(list)
+        for reaction_id, rp_id in (
+            Intermediate.objects.using(using)
+            .filter(reaction_id__in=reaction_ids)
+            .order_by("id")
+            .values_list("reaction_id", "rp_id")
+        ):
+            sides[side][reaction_id].append(rp_id)
+            rp_ids.add(rp_id)
+    rps = {
+        record["id"]: record
+        for record in rp_records(
+            RP.objects.using(using).filter(id__in=rp_ids), state_html
+        )
+    }
+
+    process_types = defaultdict(list)
+    for reaction_id, abbreviation in (
+        Reaction.process_types.through.objects.using(using)
+        .filter(reaction_id__in=reaction_ids)
+        .order_by("processtype__abbreviation")
+        .values_list("reaction_id", "processtype__abbreviation")
+    ):
+        process_types[reaction_id].append(abbreviation)
+
+    records = []
+    for row in rows:
+        record = {field: row[field] for field in fields}
+        record["process_types"] = process_types[row["id"]]
+        for side in "reactants", "products":
+            record[side] = [rps[rp_id] for rp_id in sides[side][row["id"]]]
+        records.append(record)
+    return records
+
+
+def iter_reactions(queryset=None, chunk_size=2000):
+    """Yields the export records of the reactions of the queryset (by default all
+    of them) ordered by their id, as dicts with the REACTION_FIELDS and the
+    process_types abbreviations, reactants and products.
+    """
+    if queryset is None:
+        queryset = Reaction.objects.all()
+    using = queryset.db
+    rows = (
+        queryset.using(using)
+        .order_by("id")
+        .values(*REACTION_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for chunk in chunked(rows, chunk_size):
+        yield from reaction_records(chunk, using)
@@ -0,0 +1,196 @@
+"""Set-based garbage collection of the orphaned RP, State and Species rows.
+
+An RP is an orphan if no reaction (nor any other model, e.g. of the project apps)
+references it, and a Species if no alias, no identifier and no RP other than the
+orphaned ones references it. The orphans are found with NOT EXISTS anti-join queries
+and deleted in batches of ids, each batch in its own transaction, with the raw
+DELETE statements of the rows owned by them (the States of the RPs, the
+SpeciesComposition and the SpeciesStats), so no model instances are ever loaded.
+As the post_delete signals are not sent, the Tombstones of the deleted rows are
+bulk-created instead, for the change feed.
+
+    report = collect_orphans(dry_run=True)
+    print(report)
+"""
+
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.db import transaction, DEFAULT_DB_ALIAS
+from django.db.models import Exists, OuterRef, Q
+
+from _utils.models import ProvenanceMixin
+from rp.models import RP, Species, Tombstone
+
+# the models whose rows only describe the rows of the model they reference, and
+# do not prevent them from being collected
+OWNED_MODELS = {
+    "rp.RP": {"rp.State", "rxn.SpeciesStats"},
+    "rp.Species": {"rp.SpeciesComposition", "rxn.SpeciesStats"},
+    "rxn.Reaction": {"rxn.ReactantList", "rxn.ProductList"},
+}
+
+
+def _relations(model, owned):
+    """Returns the reverse foreign key relations to the model from the owned
+    models (if owned is True) or from all the other models."""
+    owned_models = {apps.get_model(label) for label in OWNED_MODELS[model._meta.label]}
+    return [
+        rel
+        for rel in model._meta.related_objects
+        if not rel.many_to_many and (rel.related_model in owned_models) == owned
+    ]
+
+
+def _references(model, using, exclude=()):
+    """Returns the Exists expressions of the rows of the model referenced by each
+    relation other than the owned and excluded ones, by the name of the relation."""
+    references = {}
+    for rel in _relations(model, owned=False):
+        if rel.related_model in exclude:
+            continue
+        references[f"referenced_by_{rel.name}"] = Exists(
+            rel.related_model._base_manager.using(using).filter(
+                **{rel.field.name: OuterRef("pk")}
+            )
+        )
+    return references
+
+
+def _unreferenced(model, using, exclude=()):
+    """Returns the queryset of the rows of the model referenced by none of the
+    relations other than the owned and excluded ones."""
+    # the Exists expressions are annotated rather than combined with | (or chained
+    # in exclude() calls), which the older Django versions do not support
+    references = _references(model, using, exclude)
+    return (
+        model.objects.using(using)
+        .annotate(**references)
+        .filter(**{name: False for name in references})
+    )
+
+
+def orphan_rps(using=DEFAULT_DB_ALIAS):
+    """Returns the queryset of the orphaned RPs."""
+    return _unreferenced(RP, using)
+
+
+def orphan_species(using=DEFAULT_DB_ALIAS):
+    """Returns the queryset of the Species which are or would be orphans once the
+    orphaned RPs are collected."""
+    references = _references(RP, using)
+    is_referenced = Q(pk__in=[])
+    for name in references:
+        is_referenced |= Q(**{name: True})
+    live_rps = (
+        RP.objects.using(using)
+        .annotate(**references)
+        .filter(is_referenced, species=OuterRef("pk"))
+    )
+    return _unreferenced(Species, using, exclude=(RP,)).exclude(Exists(live_rps))
+
+
+class CollectionReport:
+    """The numbers of the rows deleted (or to be deleted, in a dry run) by model,
+    with the number of the batches and the elapsed time."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.counts = Counter()
+        self.batches = 0
+        self.seconds = 0.0
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    @property
+    def rows_per_second(self):
+        return self.total / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        verb = "Would delete" if self.dry_run else "Deleted"
+        lines = [f"{verb} {n} {label} rows" for label, n in sorted(self.counts.items())]
+        lines.append(
+            f"{self.total} rows in {self.batches} batches, {self.seconds:.2f} s "
+            f"({self.rows_per_second:.0f} rows/s)"
+        )
+        return "\n".join(lines)
+
+
+def _count_owned(model, orphans, report, using):
+    for rel in _relations(model, owned=True):
+        report.counts[rel.related_model._meta.label] += (
+            rel.related_model._base_manager.using(using)
+            .filter(**{f"{rel.field.name}__in": orphans.values("pk")})
+            .count()
+        )
+
+
+def _delete_batch(model, ids, counts, using):
+    """Deletes the rows of the model with ids and the rows owned by them (and
+    their rows of the auto-created many-to-many through tables), adding the
+    numbers of the deleted rows by model to the counts."""
+    for rel in _relations(model, owned=True):
+        related = rel.related_model._base_manager.using(using)
+        counts[rel.related_model._meta.label] += related.filter(
+            **{f"{rel.field.attname}__in": ids}
+        )._raw_delete(using)
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if through._meta.auto_created:
+            counts[through._meta.label] += (
+                through._base_manager.using(using)
+                .filter(**{f"{field.m2m_field_name()}__in": ids})
+                ._raw_delete(using)
+            )
+    counts[model._meta.label] += (
+        model._base_manager.using(using).filter(pk__in=ids)._raw_delete(using)
+    )
+    if issubclass(model, ProvenanceMixin):
+        Tombstone.objects.using(using).bulk_create(
+            [Tombstone(model=model._meta.label_lower, object_id=pk) for pk in ids]
+        )
+
+
+def collect_orphans(dry_run=False, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """Deletes the orphaned RPs (with their States) and Species.
+
+    Parameters
+    ----------
+    dry_run : bool
+        Only count the rows which would be deleted.
+    batch_size : int
+        The maximal number of the RPs or Species deleted in a single transaction.
+    using : str
+
+    Returns
+    -------
+    CollectionReport
+    """
+    report = CollectionReport(dry_run)
+    start = time.perf_counter()
+    for model, orphans in (RP, orphan_rps), (Species, orphan_species):
+        if dry_run:
+            report.counts[model._meta.label] += orphans(using).count()
+            _count_owned(model, orphans(using), report, using)
+            continue
+        # the batches are taken in the order of the pks, each one scanning only
+        # the rows after the previous one (whose deletion orphans no other rows)
+        last_pk = None
+        while True:
+            with transaction.atomic(using=using):
+                batch = orphans(using)
+                if last_pk is not None:
+                    batch = batch.filter(pk__gt=last_pk)
+                ids = list(
+                    batch.order_by("pk").values_list("pk", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                _delete_batch(model, ids, report.counts, using)
+            last_pk = ids[-1]
+            report.batches += 1
+    report.seconds = time.perf_counter() - start
+    return report
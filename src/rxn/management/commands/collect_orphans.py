@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from rxn.gc import collect_orphans
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the RPs (with their States) and Species which are not referenced "
+        "by any reaction or alias."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report the numbers of the rows which would be deleted",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="the maximal number of RPs or Species deleted per transaction",
+        )
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        report = collect_orphans(
+            dry_run=options["dry_run"],
+            batch_size=options["batch_size"],
+            using=options["database"],
+        )
+        self.stdout.write(str(report))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from _utils.export import EXPORT_FORMATS, write_records
+from rxn.export import iter_reactions
+
+
+class Command(BaseCommand):
+    help = "Streams all the reactions with their reactants, products and process types."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--output", help="output file, defaults to stdout")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        records = iter_reactions(chunk_size=options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as fo:
+                n = write_records(records, fo, options["format"])
+        else:
+            n = write_records(records, self.stdout, options["format"])
+        self.stderr.write(f"Exported {n} reactions.")
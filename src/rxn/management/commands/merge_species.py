@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rp.models import Species
+from rxn.merge import merge_species
+
+
+class Command(BaseCommand):
+    help = (
+        "Merges the source species into the target species, repointing their RPs, "
+        "aliases and reactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("target", help="the formula of the species to keep")
+        parser.add_argument(
+            "sources", nargs="+", help="the formulas of the species to merge into it"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report the numbers of the rows, rolling the merge back",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="the number of rows deleted or rebuilt per statement",
+        )
+        parser.add_argument("--database", default="default")
+
+    def get_species(self, text, using):
+        try:
+            return Species.objects.using(using).get(text=text)
+        except Species.DoesNotExist:
+            raise CommandError(f"No such species: {text}")
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        target = self.get_species(options["target"], using)
+        sources = [self.get_species(text, using) for text in options["sources"]]
+        try:
+            report = merge_species(
+                target,
+                sources,
+                dry_run=options["dry_run"],
+                batch_size=options["batch_size"],
+                using=using,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(str(report))
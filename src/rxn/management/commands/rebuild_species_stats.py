@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from rxn.stats import rebuild_species_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the materialised reaction statistics of all the species."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="the number of species recomputed at once",
+        )
+
+    def handle(self, *args, **options):
+        n = rebuild_species_stats(batch_size=options["batch_size"])
+        self.stderr.write(f"Wrote {n} species statistics.")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from rxn.markup import pending_markup, render_pending_markup
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the html and latex markup of the species, RPs, states and "
+        "reactions created with their markup deferred. Resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="only report the numbers of the rows with their markup pending",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="the number of rendering processes, defaults to the number of CPUs",
+        )
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            for label, n in pending_markup(using=options["database"]).items():
+                self.stdout.write(f"{label}: {n} pending")
+            return
+        report = render_pending_markup(
+            batch_size=options["batch_size"],
+            processes=options["processes"],
+            using=options["database"],
+        )
+        self.stdout.write(str(report))
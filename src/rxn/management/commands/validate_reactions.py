@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from rxn.validation import validate_reactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the reaction texts of a file (one per line) without writing to the "
+        "database: reports the lines not parsing strictly and the species, RPs and "
+        "reactions their import would create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="the reaction file")
+        parser.add_argument(
+            "--output", help="write the full report to this file as JSON"
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="the number of parsing processes, defaults to the number of CPUs",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10000)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        with open(options["input"], encoding="utf-8") as fi:
+            report = validate_reactions(
+                fi,
+                processes=options["processes"],
+                chunk_size=options["chunk_size"],
+                using=options["database"],
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fo:
+                json.dump(report.as_dict(), fo, ensure_ascii=False, indent=1)
+        for issue in report.issues:
+            self.stdout.write(
+                f"{issue.line}: {issue.status}: {issue.text}: {issue.message}"
+            )
+        self.stderr.write(str(report))
@@ -0,0 +1,150 @@
+"""Backfill of the markup deferred by _utils.markup.deferred_markup.
+
+render_pending_markup renders the html (and latex) of the Species, RPs, States and
+Reactions flagged with markup_pending, model by model, in batches of the flagged rows
+in the order of their primary keys: the distinct texts of a batch are rendered with
+pyvalem in a pool of worker processes (the States with the RP they belong to), and
+the batch is written with a single bulk_update, clearing the flags, in its own
+transaction. An interrupted backfill thus simply resumes with the rows still
+flagged. The rows pyvalem cannot render are counted as failed and stay flagged.
+
+    pending_markup()
+    {"rp.Species": 12, "rp.RP": 40, "rp.State": 51, "rxn.Reaction": 35}
+    print(render_pending_markup(processes=4))
+
+Also available as the render_markup management command.
+"""
+
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from django.db import transaction, DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from _utils.markup import render_markup
+from _utils.models import ProvenanceMixin
+from rp.models import Species, RP, State
+from .models import Reaction
+
+# the models, with the kind and the lookup of the text rendered and the fields set
+_MARKUP_MODELS = (
+    (Species, "species", "text", ("html",)),
+    (RP, "rp", "text", ("html",)),
+    (State, "rp", "rp__text", ("html",)),
+    (Reaction, "reaction", "text", ("html", "latex")),
+)
+
+
+def pending_markup(using=DEFAULT_DB_ALIAS):
+    """Returns the numbers of the rows with their markup pending, by model label."""
+    return {
+        model._meta.label: model.objects.using(using)
+        .filter(markup_pending=True)
+        .count()
+        for model, *_ in _MARKUP_MODELS
+    }
+
+
+class MarkupReport:
+    """The numbers of the rows rendered and failed by model, with the number of the
+    batches and the elapsed time."""
+
+    def __init__(self):
+        self.rendered = Counter()
+        self.failed = Counter()
+        self.batches = 0
+        self.seconds = 0.0
+
+    def __str__(self):
+        lines = [
+            f"Rendered {n} {label} rows" for label, n in sorted(self.rendered.items())
+        ]
+        lines.extend(
+            f"Failed to render {n} {label} rows"
+            for label, n in sorted(self.failed.items())
+        )
+        lines.append(f"in {self.batches} batches, {self.seconds:.2f} s")
+        return "\n".join(lines)
+
+
+def _values(model, text, rendered):
+    """Returns the field values of the row of the model with text from its rendered
+    markup, or None if it failed."""
+    if rendered is None:
+        return None
+    if model is State:
+        html = rendered["states"].get(text)
+        return None if html is None else {"html": html}
+    return rendered
+
+
+def render_pending_markup(batch_size=1000, processes=None, using=DEFAULT_DB_ALIAS):
+    """Renders the pending markup of all the models.
+
+    Parameters
+    ----------
+    batch_size : int
+        The number of rows rendered and updated at a time.
+    processes : int, optional
+        The number of the rendering worker processes. Defaults to the number of
+        CPUs, 1 renders in the current process.
+    using : str
+
+    Returns
+    -------
+    MarkupReport
+    """
+    report = MarkupReport()
+    start = time.perf_counter()
+    pool = Pool(processes) if processes != 1 else None
+    try:
+        for model, kind, source, fields in _MARKUP_MODELS:
+            label = model._meta.label
+            update_fields = [*fields, "markup_pending"]
+            provenance = issubclass(model, ProvenanceMixin)
+            if provenance:
+                update_fields.append("time_modified")
+            last_pk = 0
+            while True:
+                rows = list(
+                    model.objects.using(using)
+                    .filter(markup_pending=True, pk__gt=last_pk)
+                    .order_by("pk")
+                    .values_list("pk", "text", source)[:batch_size]
+                )
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                items = sorted({(kind, row[2]) for row in rows})
+                if pool is not None:
+                    rendered = pool.map(render_markup, items, 64)
+                else:
+                    rendered = [render_markup(item) for item in items]
+                rendered = {text: values for (_, text), values in zip(items, rendered)}
+
+                extra = {"time_modified": timezone.now()} if provenance else {}
+                objs = []
+                for pk, text, source_text in rows:
+                    values = _values(model, text, rendered[source_text])
+                    if values is None:
+                        report.failed[label] += 1
+                        continue
+                    objs.append(
+                        model(
+                            pk=pk,
+                            markup_pending=False,
+                            **{field: values[field] for field in fields},
+                            **extra,
+                        )
+                    )
+                with transaction.atomic(using=using):
+                    model.objects.using(using).bulk_update(objs, update_fields)
+                report.rendered[label] += len(objs)
+                report.batches += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    report.seconds = time.perf_counter() - start
+    return report
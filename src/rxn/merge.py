@@ -0,0 +1,281 @@
+"""Merging of the Species rows found to be the same molecule.
+
+merge_species(target, sources) repoints everything referencing the source species to
+the target species and deletes the sources, in a single transaction:
+
+* the RPs of the sources are repointed to the target, and their text and html
+  re-prefixed with those of the target, by a single UPDATE per source species (the
+  canonical text of an RP being the text of its species followed by its states),
+  as are the SpeciesAlias rows and any other (not owned) references to the sources;
+  the texts of the sources become aliases of the target;
+* the RPs of the target which now share their canonical text are merged into the
+  one with the smallest id: the ReactantList and ProductList rows (and any other
+  references to them) are repointed by a single UPDATE with a correlated subquery
+  per relation, and the duplicates are deleted with their States, as by rxn.gc;
+* the text, ordered_text, html and latex of the reactions of the repointed RPs are
+  rebuilt with pyvalem (the only per-row work, done in batches), and the reactions
+  which now have the same text, comment and process types are merged too, the
+  datasets of the duplicates being repointed to the one with the smallest id and
+  the duplicates deleted with their through rows, as the RPs.
+
+    report = merge_species(Species.objects.get(text="CO"), [isotopologue])
+    print(report)
+
+Also available as the merge_species management command.
+"""
+
+import time
+from collections import Counter, defaultdict
+
+from django.db import transaction, DEFAULT_DB_ALIAS
+from django.db.models import Case, Exists, OuterRef, Subquery, Value, When
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
+from pyvalem.reaction import Reaction as PVReaction
+
+from _utils.models import ProvenanceMixin
+from rp.models import RP, Species, SpeciesAlias
+from .gc import _delete_batch, _relations
+from .models import Reaction, ReactantList, ProductList
+from .stats import mark_stale
+
+
+class MergeReport:
+    """The numbers of the rows repointed, rebuilt and deleted by model, with the
+    elapsed time."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.repointed = Counter()
+        self.rebuilt = Counter()
+        self.deleted = Counter()
+        self.seconds = 0.0
+
+    def __str__(self):
+        lines = []
+        for verb, counts in (
+            ("Repointed", self.repointed),
+            ("Rebuilt", self.rebuilt),
+            ("Deleted", self.deleted),
+        ):
+            lines.extend(
+                f"{verb} {n} {label} rows" for label, n in sorted(counts.items()) if n
+            )
+        if self.dry_run:
+            lines.append("(dry run, rolled back)")
+        lines.append(f"in {self.seconds:.2f} s")
+        return "\n".join(lines)
+
+
+def _provenance(model, now):
+    return {"time_modified": now} if issubclass(model, ProvenanceMixin) else {}
+
+
+def _repoint_species(target, sources, report, now, using):
+    """Repoints the RPs and all the other (not owned) references to the sources."""
+    for source in sources:
+        report.repointed[RP._meta.label] += (
+            RP.objects.using(using)
+            .filter(species=source)
+            .update(
+                species=target,
+                text=Concat(Value(target.text), Substr("text", len(source.text) + 1)),
+                html=Concat(Value(target.html), Substr("html", len(source.html) + 1)),
+                time_modified=now,
+            )
+        )
+    for rel in _relations(Species, owned=False):
+        if rel.related_model is RP:
+            continue
+        report.repointed[rel.related_model._meta.label] += (
+            rel.related_model._base_manager.using(using)
+            .filter(**{f"{rel.field.name}__in": sources})
+            .update(**{rel.field.name: target}, **_provenance(rel.related_model, now))
+        )
+    aliases = [SpeciesAlias(text=source.text, species=target) for source in sources]
+    SpeciesAlias.objects.using(using).bulk_create(aliases, ignore_conflicts=True)
+
+
+def _merge_rps(target, report, now, batch_size, using):
+    """Merges the RPs of the target sharing their text into the one with the
+    smallest id."""
+    rps = RP.objects.using(using).filter(species=target)
+    duplicates = rps.filter(
+        Exists(rps.filter(text=OuterRef("text"), pk__lt=OuterRef("pk")))
+    )
+    duplicate_ids = list(duplicates.order_by("pk").values_list("pk", flat=True))
+    if not duplicate_ids:
+        return
+    for rel in _relations(RP, owned=False):
+        name = rel.field.name
+        # the first RP of the target with the text of the referenced RP
+        keeper = (
+            rps.filter(
+                text=Subquery(
+                    RP.objects.using(using)
+                    .filter(pk=OuterRef(OuterRef(name)))
+                    .values("text")[:1]
+                )
+            )
+            .order_by("pk")
+            .values("pk")[:1]
+        )
+        report.repointed[rel.related_model._meta.label] += (
+            rel.related_model._base_manager.using(using)
+            .filter(**{f"{name}__in": duplicates.values("pk")})
+            .update(**{name: Subquery(keeper)}, **_provenance(rel.related_model, now))
+        )
+    for i in range(0, len(duplicate_ids), batch_size):
+        _delete_batch(RP, duplicate_ids[i : i + batch_size], report.deleted, using)
+
+
+def _rewrite(text, renames):
+    """Returns the text of the reaction with the formulas of its terms renamed."""
+    pyvalem_reaction = PVReaction(text, strict=False)
+    sides = []
+    for terms in pyvalem_reaction.reactants, pyvalem_reaction.products:
+        rewritten = []
+        for n, stateful_species in terms:
+            rp_text = repr(stateful_species)
+            formula = repr(stateful_species.formula)
+            if formula in renames:
+                rp_text = renames[formula] + rp_text[len(formula) :]
+            rewritten.append(f"{n if n > 1 else ''}{rp_text}")
+        sides.append(" + ".join(rewritten))
+    return f" {pyvalem_reaction.sep} ".join(sides)
+
+
+def _rebuild_reactions(reaction_ids, renames, report, now, batch_size, using):
+    """Rebuilds the text, ordered_text, html and latex of the reactions, returning
+    their new texts."""
+    texts = set()
+    reaction_ids = sorted(reaction_ids)
+    fields = ["text", "ordered_text", "html", "latex", "time_modified"]
+    for i in range(0, len(reaction_ids), batch_size):
+        reactions = list(
+            Reaction.objects.using(using)
+            .filter(pk__in=reaction_ids[i : i + batch_size])
+            .only("text")
+        )
+        for reaction in reactions:
+            text_can = repr(PVReaction(_rewrite(reaction.text, renames), strict=False))
+            # as in Reaction.get_or_create_from_text, to reset the html to canonic
+            pyvalem_reaction = PVReaction(text_can, strict=False)
+            reaction.text = text_can
+            reaction.ordered_text = Reaction._get_ordered_text(pyvalem_reaction)
+            reaction.html = pyvalem_reaction.html
+            reaction.latex = pyvalem_reaction.latex
+            reaction.time_modified = now
+            texts.add(text_can)
+        Reaction.objects.using(using).bulk_update(reactions, fields)
+        report.rebuilt[Reaction._meta.label] += len(reactions)
+    return texts
+
+
+def _merge_reactions(texts, report, batch_size, using):
+    """Merges the reactions with the same text, comment and process types (and
+    one of the texts) into the one with the smallest id, returning the ids of the
+    kept reactions."""
+    texts = sorted(texts)
+    keys = defaultdict(lambda: ["", "", []])
+    for i in range(0, len(texts), batch_size):
+        rows = (
+            Reaction.objects.using(using)
+            .filter(text__in=texts[i : i + batch_size])
+            .values_list("id", "text", "comment", "process_types")
+        )
+        for reaction_id, text, comment, process_type_id in rows:
+            key = keys[reaction_id]
+            key[:2] = text, comment
+            if process_type_id is not None:
+                key[2].append(process_type_id)
+
+    keepers = {}
+    duplicates = {}
+    for reaction_id in sorted(keys):
+        text, comment, process_type_ids = keys[reaction_id]
+        key = (text, comment, tuple(sorted(process_type_ids)))
+        if key in keepers:
+            duplicates[reaction_id] = keepers[key]
+        else:
+            keepers[key] = reaction_id
+    if not duplicates:
+        return []
+
+    # the datasets and any other references, but the through rows and process
+    # types, which are deleted with the duplicates
+    relations = _relations(Reaction, owned=False)
+    duplicate_ids = sorted(duplicates)
+    for i in range(0, len(duplicate_ids), batch_size):
+        batch = duplicate_ids[i : i + batch_size]
+        for rel in relations:
+            attname = rel.field.attname
+            keeper = Case(
+                *[When(**{attname: pk}, then=Value(duplicates[pk])) for pk in batch]
+            )
+            report.repointed[rel.related_model._meta.label] += (
+                rel.related_model._base_manager.using(using)
+                .filter(**{f"{attname}__in": batch})
+                .update(**{attname: keeper})
+            )
+        _delete_batch(Reaction, batch, report.deleted, using)
+    return sorted(set(duplicates.values()))
+
+
+def merge_species(
+    target, sources, dry_run=False, batch_size=1000, using=DEFAULT_DB_ALIAS
+):
+    """Merges the source species into the target species.
+
+    Parameters
+    ----------
+    target : Species or int
+    sources : iterable of Species or int
+    dry_run : bool
+        Roll the transaction back, only reporting the numbers of the rows.
+    batch_size : int
+        The number of the rows deleted or rebuilt per statement.
+    using : str
+
+    Returns
+    -------
+    MergeReport
+    """
+    report = MergeReport(dry_run)
+    start = time.perf_counter()
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        target = Species.objects.using(using).get(pk=getattr(target, "pk", target))
+        source_ids = {getattr(source, "pk", source) for source in sources}
+        if target.pk in source_ids:
+            raise ValueError(f"Cannot merge {target} into itself")
+        sources = list(Species.objects.using(using).filter(pk__in=source_ids))
+        if len(sources) != len(source_ids):
+            raise Species.DoesNotExist
+        for source in sources:
+            if source.charge != target.charge:
+                raise ValueError(f"Cannot merge {source} into {target}: charges differ")
+
+        reaction_ids = set()
+        for Intermediate in ReactantList, ProductList:
+            reaction_ids.update(
+                Intermediate.objects.using(using)
+                .filter(rp__species__in=sources)
+                .values_list("reaction_id", flat=True)
+            )
+
+        _repoint_species(target, sources, report, now, using)
+        _merge_rps(target, report, now, batch_size, using)
+        _delete_batch(Species, [s.pk for s in sources], report.deleted, using)
+        renames = {source.text: target.text for source in sources}
+        texts = _rebuild_reactions(
+            reaction_ids, renames, report, now, batch_size, using
+        )
+        kept_ids = _merge_reactions(texts, report, batch_size, using)
+
+        if dry_run:
+            transaction.set_rollback(True, using=using)
+        else:
+            mark_stale(species_ids=[target.pk], reaction_ids=kept_ids, using=using)
+    report.seconds = time.perf_counter() - start
+    return report
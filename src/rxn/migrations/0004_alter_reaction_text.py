@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rxn", "0003_reaction_ordered_text"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="reaction",
+            name="text",
+            field=models.CharField(db_index=True, editable=False, max_length=256),
+        ),
+    ]
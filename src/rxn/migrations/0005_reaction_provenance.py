@@ -0,0 +1,30 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rxn", "0004_alter_reaction_text"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reaction",
+            name="added_by_user_id",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="reaction",
+            name="time_added",
+            field=models.DateTimeField(
+                auto_now_add=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="reaction",
+            name="time_modified",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
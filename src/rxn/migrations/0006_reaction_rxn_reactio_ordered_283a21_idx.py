@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rp", "0005_rp_rp_rp_text_de1731_idx"),
+        ("rxn", "0005_reaction_provenance"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reaction",
+            index=models.Index(
+                fields=["ordered_text", "id"], name="rxn_reactio_ordered_283a21_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rp", "0005_rp_rp_rp_text_de1731_idx"),
+        ("rxn", "0006_reaction_rxn_reactio_ordered_283a21_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpeciesStats",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("reactions", models.PositiveIntegerField(default=0)),
+                ("reactant_reactions", models.PositiveIntegerField(default=0)),
+                ("product_reactions", models.PositiveIntegerField(default=0)),
+                ("datasets", models.PositiveIntegerField(default=0)),
+                ("reactant_datasets", models.PositiveIntegerField(default=0)),
+                ("product_datasets", models.PositiveIntegerField(default=0)),
+                (
+                    "process_type",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="rxn.processtype",
+                    ),
+                ),
+                (
+                    "rp",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="rp.rp",
+                    ),
+                ),
+                (
+                    "species",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="rp.species"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Species stats",
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rxn", "0007_speciesstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reaction",
+            name="markup_pending",
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -1,9 +1,19 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import models, transaction
 from pyvalem.reaction import Reaction as PVReaction
 from pyvalem.reaction import ReactionParseError
 
-from _utils.models import QualifiedIDMixin
-from rp.models import RP
+from _utils.instrumentation import instrumented, parse_timer
+from _utils.markup import markup_deferred
+from _utils.models import (
+    LeanKeysetQuerySet,
+    MarkupPendingMixin,
+    ProvenanceMixin,
+    QualifiedIDMixin,
+)
+from _utils.routers import lookup_databases, mark_written
+from rp.models import Species, RP
 
 
 class ProcessType(QualifiedIDMixin, models.Model):
@@ -29,7 +39,7 @@ class ProcessType(QualifiedIDMixin, models.Model):
         return f"{self.abbreviation}"
 
 
-class Reaction(QualifiedIDMixin, models.Model):
+class Reaction(QualifiedIDMixin, ProvenanceMixin, MarkupPendingMixin, models.Model):
     qid_prefix = "R"
 
     id = models.AutoField(primary_key=True)
@@ -42,17 +52,25 @@ class Reaction(QualifiedIDMixin, models.Model):
     )
     process_types = models.ManyToManyField(ProcessType)
 
-    text = models.CharField(max_length=256, editable=False)
+    text = models.CharField(max_length=256, editable=False, db_index=True)
     ordered_text = models.CharField(max_length=256, editable=False)
     html = models.CharField(max_length=1024, editable=False)
     latex = models.CharField(max_length=1024, editable=False)
     comment = models.CharField(max_length=1024, blank=True)
 
+    objects = LeanKeysetQuerySet.as_manager()
+    keyset_ordering = ("ordered_text", "id")
+    markup_fields = ("html", "latex")
+
+    class Meta:
+        indexes = [models.Index(fields=["ordered_text", "id"])]
+
     def __str__(self):
         return self.text
 
     @classmethod
-    def all_from_text(cls, text, strict=True):
+    @instrumented
+    def all_from_text(cls, text, strict=True, using=None):
         """Uses pyvalem to get a canonicalised version of the text and filters
         the database objects by that text. If no reactions equivalent to passed
         text are found, returns an empty query.
@@ -60,17 +78,21 @@ class Reaction(QualifiedIDMixin, models.Model):
         Parameters
         ----------
         text : str
+        using : str, optional
+            The database alias, defaults to the routed read database.
 
         Returns
         -------
         Query
         """
-        text_can = repr(PVReaction(text, strict=strict))
-        return cls.objects.filter(text=text_can)
+        with parse_timer():
+            text_can = repr(PVReaction(text, strict=strict))
+        return cls.objects.using(using).filter(text=text_can)
 
     @classmethod
+    @instrumented
     def get_from_text(
-        cls, text, comment="", process_type_abbreviations=(), strict=True
+        cls, text, comment="", process_type_abbreviations=(), strict=True, using=None
     ):
         """Looks for an RP with equivalent canonicalised version of the text AND
         identical comment AND the same process_type_abbreviations.
@@ -82,23 +104,89 @@ class Reaction(QualifiedIDMixin, models.Model):
         text : str
         comment : str
         process_type_abbreviations : tuple of str
+        using : str, optional
+            The database alias, defaults to the routed read database.
 
         Returns
         -------
         Reaction
         """
-        text_can = repr(PVReaction(text, strict=strict))
-        all_with_text_and_comment = cls.objects.filter(text=text_can, comment=comment)
-        for reaction in all_with_text_and_comment:
-            if sorted(pt.abbreviation for pt in reaction.process_types.all()) == sorted(
-                process_type_abbreviations
-            ):
-                return reaction
+        with parse_timer():
+            text_can = repr(PVReaction(text, strict=strict))
+        # the process types of all the reactions with the text and comment are
+        # compared first, and only the matching reaction is loaded in full
+        process_types = defaultdict(list)
+        for reaction_id, abbreviation in (
+            cls.objects.using(using)
+            .filter(text=text_can, comment=comment)
+            .values_list("id", "process_types__abbreviation")
+        ):
+            if abbreviation is not None:
+                process_types[reaction_id].append(abbreviation)
+            else:
+                process_types.setdefault(reaction_id, [])
+        for reaction_id in sorted(process_types):
+            if sorted(process_types[reaction_id]) == sorted(process_type_abbreviations):
+                return cls.objects.using(using).get(pk=reaction_id)
         raise cls.DoesNotExist
 
     @classmethod
+    @instrumented
+    def ids_from_texts(cls, keys, strict=True, batch_size=500, using=None):
+        """The bulk version of get_from_text: resolves many reactions, given by
+        their text, comment and process_type_abbreviations, in a few queries.
+
+        Parameters
+        ----------
+        keys : iterable of (str, str, tuple of str)
+            The (text, comment, process_type_abbreviations) of the reactions.
+        strict : bool
+        batch_size : int
+            The maximal number of texts looked up by a single query.
+        using : str, optional
+            The database alias, defaults to the routed read database.
+
+        Returns
+        -------
+        dict
+            Maps the keys to the ids of the matching reactions. The keys without any
+            matching reaction are missing.
+        """
+        canonical = {}
+        wanted = {}
+        for key in keys:
+            text, comment, abbreviations = key
+            if text not in canonical:
+                with parse_timer():
+                    canonical[text] = repr(PVReaction(text, strict=strict))
+            wanted[key] = (canonical[text], comment, tuple(sorted(abbreviations)))
+
+        texts = sorted(set(canonical.values()))
+        process_types = defaultdict(list)
+        found = {}
+        for i in range(0, len(texts), batch_size):
+            rows = (
+                cls.objects.using(using)
+                .filter(text__in=texts[i : i + batch_size])
+                .values_list("id", "text", "comment", "process_types__abbreviation")
+            )
+            for reaction_id, text, comment, abbreviation in rows:
+                found[reaction_id] = (text, comment)
+                if abbreviation is not None:
+                    process_types[reaction_id].append(abbreviation)
+
+        ids = {}
+        for reaction_id in sorted(found, reverse=True):
+            text, comment = found[reaction_id]
+            ids[(text, comment, tuple(sorted(process_types[reaction_id])))] = (
+                reaction_id
+            )
+        return {key: ids[value] for key, value in wanted.items() if value in ids}
+
+    @classmethod
+    @instrumented
     def get_or_create_from_text(
-        cls, text, comment="", process_type_abbreviations=(), strict=True
+        cls, text, comment="", process_type_abbreviations=(), strict=True, using=None
     ):
         """
 
@@ -107,52 +195,78 @@ class Reaction(QualifiedIDMixin, models.Model):
         text : str
         comment : str
         process_type_abbreviations : tuple of str
+        using : str, optional
+            The database alias, defaults to the routed read database for the
+            lookup, and to the write database for the creation (see
+            _utils.routers.lookup_databases).
 
         Returns
         -------
         (Reaction, bool)
         """
-        try:
-            return (
-                cls.get_from_text(text, comment, process_type_abbreviations, strict),
-                False,
-            )
-        except cls.DoesNotExist:
-            # canonicalised text and html:
-            text_can = repr(PVReaction(text, strict=strict))
-            pyvalem_reaction = PVReaction(
-                text_can, strict=strict
-            )  # to reset the html to canonic.
-            ordered_text = cls._get_ordered_text(pyvalem_reaction)
-            html = pyvalem_reaction.html
-            latex = pyvalem_reaction.latex
+        databases = lookup_databases(cls, using)
+        for db in databases:
+            try:
+                return (
+                    cls.get_from_text(
+                        text, comment, process_type_abbreviations, strict, using=db
+                    ),
+                    False,
+                )
+            except cls.DoesNotExist:
+                pass
+        db = databases[-1]
+        mark_written(db)
+        # canonicalised text and html:
+        pending = markup_deferred()
+        with parse_timer():
+            pyvalem_reaction = PVReaction(text, strict=strict)
+            text_can = repr(pyvalem_reaction)
+            if not pending:
+                # to reset the html to canonic.
+                pyvalem_reaction = PVReaction(text_can, strict=strict)
+        ordered_text = cls._get_ordered_text(pyvalem_reaction)
+        html = "" if pending else pyvalem_reaction.html
+        latex = "" if pending else pyvalem_reaction.latex
+        # a failure (e.g. of the process types) leaves no partial reaction:
+        with transaction.atomic(using=db):
             # create the Reaction object:
-            reaction = cls.objects.create(
+            reaction = cls.objects.using(db).create(
                 text=text_can,
                 ordered_text=ordered_text,
                 html=html,
                 latex=latex,
                 comment=comment,
+                markup_pending=pending,
             )
             # populate the reactants and products with RP instances:
             for attr, Intermediate in zip(
                 ["reactants", "products"], [ReactantList, ProductList]
             ):
+                intermediates = []
                 for stoich, stateful_species in getattr(pyvalem_reaction, attr):
-                    for _ in range(stoich):
-                        Intermediate.objects.create(
-                            reaction=reaction,
-                            rp=RP.get_or_create_from_text(repr(stateful_species))[0],
-                        )
+                    rp = RP.get_or_create_from_text(
+                        repr(stateful_species), lean=True, using=db
+                    )[0]
+                    intermediates.extend(
+                        Intermediate(reaction=reaction, rp=rp) for _ in range(stoich)
+                    )
+                Intermediate.objects.using(db).bulk_create(intermediates)
             # assign the ProcessTypes:
-            process_types = [
-                ProcessType.objects.get(abbreviation=abbrev)
-                for abbrev in process_type_abbreviations
-            ]
-            for process_type in process_types:
-                reaction.process_types.add(process_type)
-
-            return reaction, True
+            process_types = ProcessType.objects.using(db).filter(
+                abbreviation__in=process_type_abbreviations
+            )
+            if len(process_types) != len(set(process_type_abbreviations)):
+                missing = sorted(
+                    set(process_type_abbreviations)
+                    - {process_type.abbreviation for process_type in process_types}
+                )
+                raise ProcessType.DoesNotExist(
+                    f"Unknown process types: {', '.join(missing)}"
+                )
+            reaction.process_types.add(*process_types)
+
+        return reaction, True
 
     @classmethod
     def _get_ordered_text(cls, pyvalem_reaction):
@@ -172,6 +286,8 @@ class Reaction(QualifiedIDMixin, models.Model):
     @property
     def molecularity(self):
         """Return the molecularity of the reaction (number of reactants)."""
+        if "reactants" in getattr(self, "_prefetched_objects_cache", {}):
+            return len(self.reactants.all())
         return self.reactants.count()
 
     def _reset_html(self):
@@ -204,3 +320,34 @@ class ProductList(models.Model):
 
     class Meta:
         db_table = "rxn_reaction_products"
+
+
+class SpeciesStats(models.Model):
+    """The materialised reaction statistics of a Species (if rp is None) or of one
+    of its RPs, over all the reactions (if process_type is None) or over the
+    reactions of a single process type.
+
+    The rows are maintained by rxn.stats.
+    """
+
+    species = models.ForeignKey(Species, on_delete=models.CASCADE)
+    rp = models.ForeignKey(RP, on_delete=models.CASCADE, null=True, blank=True)
+    process_type = models.ForeignKey(
+        ProcessType, on_delete=models.CASCADE, null=True, blank=True
+    )
+
+    reactions = models.PositiveIntegerField(default=0)
+    reactant_reactions = models.PositiveIntegerField(default=0)
+    product_reactions = models.PositiveIntegerField(default=0)
+    datasets = models.PositiveIntegerField(default=0)
+    reactant_datasets = models.PositiveIntegerField(default=0)
+    product_datasets = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Species stats"
+
+    def __str__(self):
+        subject = self.rp or self.species
+        if self.process_type is None:
+            return f"{subject}: {self.reactions} reactions"
+        return f"{subject} ({self.process_type}): {self.reactions} reactions"
@@ -0,0 +1,301 @@
+"""The in-memory reaction network, for the pathway searches and the mechanism
+extraction.
+
+ReactionNetwork loads the ReactantList and ProductList tables (two values_list
+queries) into compact integer arrays: the nodes (Species or RPs, depending on the
+level of the network) and the reactions are numbered by the positions of their
+sorted ids, and the reactants and products of every reaction, as well as the
+reactions consuming and producing every node, are stored in the CSR (compressed
+sparse row) form, i.e. as an indptr array of the row offsets into an indices array.
+A search then expands a whole BFS frontier at each step with a few NumPy array
+operations, without any further queries:
+
+    network = ReactionNetwork.load(level="species")
+    e = Species.objects.get(text="e-")
+    for pathway in network.pathways(h2, h3p, max_steps=3, ubiquitous=[e]):
+        ...
+
+The ubiquitous species (electrons, photons, third bodies, ...) are taken to be
+always present: they do not link the pathways and do not limit the mechanism
+closures. Requires NumPy.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .models import Reaction, ReactantList, ProductList
+
+Pathway = namedtuple("Pathway", "nodes reactions")
+Pathway.__doc__ = """A chain of reactions: reactions[i] consumes nodes[i] and produces
+nodes[i + 1] (all given by their ids)."""
+
+Mechanism = namedtuple("Mechanism", "nodes reactions")
+Mechanism.__doc__ = """The ids of the nodes and the reactions of a reachable closure."""
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+_SIDES = (("reactants", ReactantList), ("products", ProductList))
+
+
+def _csr(rows, cols, n_rows):
+    """Returns the (indptr, indices) CSR arrays of the sorted (rows, cols) pairs."""
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols
+
+
+def _row(csr, row):
+    """Returns the CSR indices of the row."""
+    indptr, indices = csr
+    return indices[indptr[row] : indptr[row + 1]]
+
+
+def _gather(indptr, indices, rows):
+    """Returns the concatenated CSR indices of all the rows."""
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return _EMPTY
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return indices[offsets + np.arange(total)]
+
+
+def _ids(values):
+    """Returns the model ids of the model instances or ids in values."""
+    if isinstance(values, np.ndarray):
+        return values.astype(np.int64)
+    if not isinstance(values, (list, tuple, set, frozenset)):
+        values = [values]
+    return np.array([getattr(v, "pk", v) for v in values], dtype=np.int64)
+
+
+class ReactionNetwork:
+    """The reaction network as a bipartite graph of the nodes (Species or RPs) and
+    the reactions, held in the CSR arrays.
+
+    Parameters
+    ----------
+    level : {"species", "rp"}
+    queryset : QuerySet of Reaction, optional
+        Restricts the network to these reactions, e.g. to some process types.
+    """
+
+    def __init__(self, level="species", queryset=None):
+        if level not in ("species", "rp"):
+            raise ValueError(f"Invalid network level: {level!r}")
+        self.level = level
+        self.queryset = queryset
+        self._pairs = {"reactants": (_EMPTY, _EMPTY), "products": (_EMPTY, _EMPTY)}
+        self._build()
+
+    @classmethod
+    def load(cls, level="species", queryset=None):
+        """Returns the network of all the reactions (of the queryset)."""
+        network = cls(level, queryset)
+        network.refresh()
+        return network
+
+    def __repr__(self):
+        return (
+            f"<ReactionNetwork ({self.level}): {self.node_ids.size} nodes, "
+            f"{self.reaction_ids.size} reactions>"
+        )
+
+    def _fetch(self, Intermediate, reaction_filter):
+        node_field = "rp__species_id" if self.level == "species" else "rp_id"
+        rows = Intermediate.objects.filter(**reaction_filter)
+        if self.queryset is not None:
+            rows = rows.filter(reaction__in=self.queryset.values("pk"))
+        rows = np.array(rows.values_list("reaction_id", node_field), dtype=np.int64)
+        return rows.reshape(-1, 2).T
+
+    def refresh(self, reaction_ids=None):
+        """Adds the reactions created since the network was loaded (with an id
+        greater than any of its reactions) or the reactions with the given ids,
+        rebuilding the arrays without re-reading the reactions already in the
+        network. The deleted reactions are only dropped by a new load().
+
+        Returns
+        -------
+        int
+            The number of the reactions added.
+        """
+        if reaction_ids is not None:
+            new_ids = np.setdiff1d(_ids(list(reaction_ids)), self.reaction_ids)
+            reaction_filter = {"reaction_id__in": new_ids.tolist()}
+        elif self.reaction_ids.size:
+            reaction_filter = {"reaction_id__gt": int(self.reaction_ids[-1])}
+        else:
+            reaction_filter = {}
+        n_reactions = self.reaction_ids.size
+        for side, Intermediate in _SIDES:
+            reactions, nodes = self._fetch(Intermediate, reaction_filter)
+            old_reactions, old_nodes = self._pairs[side]
+            self._pairs[side] = (
+                np.concatenate([old_reactions, reactions]),
+                np.concatenate([old_nodes, nodes]),
+            )
+        self._build()
+        return self.reaction_ids.size - n_reactions
+
+    def _build(self):
+        pairs = self._pairs
+        self.reaction_ids = np.unique(
+            np.concatenate([pairs["reactants"][0], pairs["products"][0]])
+        )
+        self.node_ids = np.unique(
+            np.concatenate([pairs["reactants"][1], pairs["products"][1]])
+        )
+        n_nodes, n_reactions = self.node_ids.size, self.reaction_ids.size
+        for side in "reactants", "products":
+            # the stoichiometric repetitions are irrelevant for the connectivity
+            edges = np.unique(
+                np.stack(
+                    [
+                        np.searchsorted(self.reaction_ids, pairs[side][0]),
+                        np.searchsorted(self.node_ids, pairs[side][1]),
+                    ],
+                    axis=1,
+                ),
+                axis=0,
+            )
+            rxn, node = edges[:, 0], edges[:, 1]
+            # reaction -> nodes, sorted by the reaction
+            setattr(self, f"_{side}", _csr(rxn, node, n_reactions))
+            # node -> reactions, sorted by the node
+            order = np.lexsort((rxn, node))
+            setattr(self, f"_{side}_of", _csr(node[order], rxn[order], n_nodes))
+
+    def node_index(self, nodes):
+        """Returns the indices of the nodes (instances or ids) in the network
+        arrays, raising KeyError for the nodes not in the network."""
+        ids = _ids(nodes)
+        index = np.searchsorted(self.node_ids, ids)
+        found = index < self.node_ids.size
+        found[found] = self.node_ids[index[found]] == ids[found]
+        if not found.all():
+            raise KeyError(f"Not in the network: {ids[~found].tolist()}")
+        return index
+
+    def _blocked(self, ubiquitous):
+        blocked = np.zeros(self.node_ids.size, dtype=bool)
+        if ubiquitous:
+            ids = _ids(ubiquitous)
+            blocked[
+                np.searchsorted(self.node_ids, ids[np.isin(ids, self.node_ids)])
+            ] = True
+        return blocked
+
+    def _distances(self, sources, max_steps, blocked, forwards=True):
+        """Returns the array of the minimal numbers of reactions from (or to, if
+        not forwards) the source node indices, -1 for the unreachable nodes."""
+        if forwards:
+            steps = self._reactants_of, self._products
+        else:
+            steps = self._products_of, self._reactants
+        distance = np.full(self.node_ids.size, -1, dtype=np.int64)
+        distance[sources] = 0
+        frontier = sources[~blocked[sources]]
+        step = 0
+        while frontier.size and (max_steps is None or step < max_steps):
+            step += 1
+            reactions = np.unique(_gather(*steps[0], frontier))
+            nodes = np.unique(_gather(*steps[1], reactions))
+            frontier = nodes[(distance[nodes] < 0) & ~blocked[nodes]]
+            distance[frontier] = step
+        return distance
+
+    def distances(self, sources, max_steps=None, ubiquitous=()):
+        """Returns a dict of the minimal number of reactions leading from any of
+        the sources to each reachable node, by the node ids."""
+        sources = self.node_index(sources)
+        distance = self._distances(sources, max_steps, self._blocked(ubiquitous))
+        reached = np.flatnonzero(distance >= 0)
+        return dict(zip(self.node_ids[reached].tolist(), distance[reached].tolist()))
+
+    def pathways(self, source, target, max_steps=5, k=10, ubiquitous=()):
+        """Yields up to k of the shortest pathways (in the number of reactions,
+        without revisiting any node) from the source to the target node.
+
+        The pathways are enumerated by a depth-first search of increasing depth,
+        pruned by the BFS distances of the nodes to the target, so only the nodes
+        on the pathways short enough are ever visited.
+
+        Parameters
+        ----------
+        source, target : model instance or id
+        max_steps : int
+        k : int
+        ubiquitous : iterable of model instances or ids
+
+        Returns
+        -------
+        generator of Pathway
+        """
+        source, target = self.node_index([source, target])
+        blocked = self._blocked(ubiquitous)
+        blocked[[source, target]] = False
+        to_target = self._distances(
+            np.array([target]), max_steps, blocked, forwards=False
+        )
+        if to_target[source] < 0:
+            return
+
+        def extend(nodes, reactions, remaining):
+            if nodes[-1] == target:
+                yield nodes, reactions
+                return
+            for reaction in _row(self._reactants_of, nodes[-1]):
+                for product in _row(self._products, reaction):
+                    if (
+                        0 <= to_target[product] < remaining
+                        and not blocked[product]
+                        and product not in nodes
+                    ):
+                        yield from extend(
+                            nodes + [product], reactions + [reaction], remaining - 1
+                        )
+
+        found = 0
+        for length in range(int(to_target[source]), max_steps + 1):
+            for nodes, reactions in extend([source], [], length):
+                if len(reactions) != length:
+                    continue
+                yield Pathway(
+                    tuple(self.node_ids[nodes].tolist()),
+                    tuple(self.reaction_ids[reactions].tolist()),
+                )
+                found += 1
+                if found == k:
+                    return
+
+    def closure(self, seeds, ubiquitous=()):
+        """Returns the Mechanism of the reactions which can take place starting
+        from the seed nodes: repeatedly, every reaction whose reactants are all
+        available (seeds, ubiquitous or produced) is added, and its products made
+        available, until no more reactions can be added.
+        """
+        available = self._blocked(ubiquitous)
+        available[self.node_index(seeds)] = True
+        rxn_indptr, rxn_nodes = self._reactants
+        n_reactants = np.diff(rxn_indptr)
+        reactant_rxn = np.repeat(np.arange(self.reaction_ids.size), n_reactants)
+        missing = np.bincount(
+            reactant_rxn[~available[rxn_nodes]], minlength=self.reaction_ids.size
+        )
+        fired = np.zeros(self.reaction_ids.size, dtype=bool)
+        while True:
+            new_reactions = np.flatnonzero((missing == 0) & ~fired)
+            if not new_reactions.size:
+                break
+            fired[new_reactions] = True
+            products = np.unique(_gather(*self._products, new_reactions))
+            new_nodes = products[~available[products]]
+            available[new_nodes] = True
+            np.subtract.at(missing, _gather(*self._reactants_of, new_nodes), 1)
+        reached = available & ~self._blocked(ubiquitous)
+        reached[self.node_index(seeds)] = True
+        return Mechanism(
+            self.node_ids[reached].tolist(), self.reaction_ids[fired].tolist()
+        )
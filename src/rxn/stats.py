@@ -0,0 +1,315 @@
+"""Maintenance of the materialised SpeciesStats table.
+
+The statistics of a set of species (and of all their RPs) are recomputed from the
+reactant and product through tables, the reaction process types and the datasets of
+all the ReactionDataSet subclasses with a fixed number of queries, and replace the
+previous rows of these species. rebuild_species_stats (also available as the
+rebuild_species_stats management command) does so for all the species, in batches.
+
+For the incremental maintenance, connect_signals() connects the receivers marking
+the species touched by the saved or deleted through rows, RPs, datasets (and those
+repointed to another reaction) and process types of the reactions as stale; the
+stale species are refreshed once per transaction, by a single on_commit callback of
+the database the rows were written to. It is called by RxnConfig.ready if the
+VALEM_SPECIES_STATS setting is True. Creating many reactions or datasets in a single
+transaction thus costs a single refresh, whereas with the maintenance disconnected,
+a bulk load should be followed by a rebuild.
+
+The bulk_create calls do not send any signals: the code creating the through rows
+or datasets in bulk should call mark_stale itself (a no-op if the maintenance is not
+connected), as ReactionDataSet.bulk_ingest does. The through rows bulk-created by
+Reaction.get_or_create_from_text are covered by the post_save of their reaction,
+created in the same transaction.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models import Count, Q
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+
+from rp.models import RP, Species
+from .models import Reaction, ReactantList, ProductList, SpeciesStats
+
+_SIDES = (("reactant", ReactantList), ("product", ProductList))
+
+
+def _dataset_models():
+    # ds depends on rxn, not the other way round
+    from ds.models import dataset_models
+
+    return dataset_models()
+
+
+def _compute(species_ids, using):
+    """Returns the SpeciesStats instances of the species with species_ids."""
+    participants = {}
+    for side, Intermediate in _SIDES:
+        participants[side] = set(
+            Intermediate.objects.using(using)
+            .filter(rp__species_id__in=species_ids)
+            .values_list("reaction_id", "rp_id", "rp__species_id")
+        )
+
+    # the subqueries avoid the very long IN lists of the hub species reactions
+    in_reactions = Q()
+    for _, Intermediate in _SIDES:
+        in_reactions |= Q(
+            reaction_id__in=Intermediate.objects.filter(
+                rp__species_id__in=species_ids
+            ).values("reaction_id")
+        )
+    process_types = defaultdict(list)
+    for reaction_id, process_type_id in (
+        Reaction.process_types.through.objects.using(using)
+        .filter(in_reactions)
+        .order_by("processtype_id")
+        .values_list("reaction_id", "processtype_id")
+    ):
+        process_types[reaction_id].append(process_type_id)
+    n_datasets = defaultdict(int)
+    for model in _dataset_models():
+        counts = (
+            model.objects.using(using)
+            .filter(in_reactions)
+            .values("reaction_id")
+            .annotate(n=Count("pk"))
+            .values_list("reaction_id", "n")
+        )
+        for reaction_id, n in counts:
+            n_datasets[reaction_id] += n
+
+    # the reaction ids of each (species, rp, process type) key and side
+    reactions = defaultdict(lambda: {"reactant": set(), "product": set()})
+    for side, rows in participants.items():
+        for reaction_id, rp_id, species_id in rows:
+            for process_type_id in [None] + process_types[reaction_id]:
+                reactions[species_id, rp_id, process_type_id][side].add(reaction_id)
+                reactions[species_id, None, process_type_id][side].add(reaction_id)
+
+    stats = []
+    for (species_id, rp_id, process_type_id), sides in reactions.items():
+        both = sides["reactant"] | sides["product"]
+        stats.append(
+            SpeciesStats(
+                species_id=species_id,
+                rp_id=rp_id,
+                process_type_id=process_type_id,
+                reactions=len(both),
+                reactant_reactions=len(sides["reactant"]),
+                product_reactions=len(sides["product"]),
+                datasets=sum(n_datasets[r] for r in both),
+                reactant_datasets=sum(n_datasets[r] for r in sides["reactant"]),
+                product_datasets=sum(n_datasets[r] for r in sides["product"]),
+            )
+        )
+    return stats
+
+
+def refresh_species_stats(species_ids, batch_size=1000, using=None):
+    """Recomputes the statistics of the species (and their RPs) with species_ids.
+
+    Parameters
+    ----------
+    species_ids : iterable of int
+    batch_size : int
+    using : str, optional
+        The database alias, defaults to the routed write database.
+
+    Returns
+    -------
+    int
+        The number of the SpeciesStats rows written.
+    """
+    using = using or router.db_for_write(SpeciesStats)
+    species_ids = sorted(set(species_ids))
+    n = 0
+    for i in range(0, len(species_ids), batch_size):
+        batch = species_ids[i : i + batch_size]
+        stats = _compute(batch, using)
+        with transaction.atomic(using=using):
+            SpeciesStats.objects.using(using).filter(species_id__in=batch).delete()
+            SpeciesStats.objects.using(using).bulk_create(stats, batch_size=batch_size)
+        n += len(stats)
+    return n
+
+
+def rebuild_species_stats(batch_size=1000, using=None):
+    """Recomputes the statistics of all the species, see refresh_species_stats."""
+    using = using or router.db_for_write(SpeciesStats)
+    SpeciesStats.objects.using(using).exclude(
+        species_id__in=Species.objects.using(using).values("id")
+    ).delete()
+    species_ids = (
+        Species.objects.using(using).order_by("id").values_list("id", flat=True)
+    )
+    return refresh_species_stats(species_ids, batch_size=batch_size, using=using)
+
+
+class _StaleIds:
+    """The ids marked as stale in the current transaction on a database."""
+
+    def __init__(self):
+        self.species_ids, self.rp_ids, self.reaction_ids = set(), set(), set()
+        self.callback = None
+
+
+class _Pending(threading.local):
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.by_database = defaultdict(_StaleIds)
+
+
+_pending = _Pending()
+_connected = False
+
+
+def _callback_registered(pending, using):
+    # the callbacks of the rolled-back transactions (and savepoints) are dropped
+    # from the run_on_commit list of the connection
+    return pending.callback is not None and any(
+        entry[1] is pending.callback
+        for entry in transaction.get_connection(using).run_on_commit
+    )
+
+
+def mark_stale(species_ids=(), rp_ids=(), reaction_ids=(), using=None):
+    """Marks the species (given directly, by their RPs or by the reactions they
+    take part in) to be refreshed on the commit of the current transaction on the
+    database using (the routed write database by default), if the incremental
+    maintenance is connected. A single refresh is registered per transaction,
+    whatever the number of the calls.
+    """
+    if not _connected:
+        return
+    using = using or router.db_for_write(SpeciesStats)
+    pending = _pending.by_database[using]
+    pending.species_ids.update(species_ids)
+    pending.rp_ids.update(rp_ids)
+    pending.reaction_ids.update(reaction_ids)
+    if not _callback_registered(pending, using):
+        # the ids of a rolled-back transaction are then refreshed (needlessly but
+        # harmlessly) on the next commit
+        pending.callback = lambda: flush(using)
+        transaction.on_commit(pending.callback, using=using)
+
+
+def flush(using=None):
+    """Refreshes the statistics of the species marked as stale on the database
+    using (the routed write database by default)."""
+    using = using or router.db_for_write(SpeciesStats)
+    pending = _pending.by_database.pop(using, None)
+    if pending is None:
+        return
+    species_ids, rp_ids, reaction_ids = (
+        pending.species_ids,
+        pending.rp_ids,
+        pending.reaction_ids,
+    )
+    if reaction_ids:
+        for _, Intermediate in _SIDES:
+            rp_ids.update(
+                Intermediate.objects.using(using)
+                .filter(reaction_id__in=reaction_ids)
+                .values_list("rp_id", flat=True)
+            )
+    if rp_ids:
+        species_ids.update(
+            RP.objects.using(using)
+            .filter(id__in=rp_ids)
+            .values_list("species_id", flat=True)
+        )
+    if species_ids:
+        refresh_species_stats(species_ids, using=using)
+
+
+def _intermediate_changed(sender, instance, using, **kwargs):
+    mark_stale(rp_ids=[instance.rp_id], using=using)
+
+
+def _rp_deleted(sender, instance, using, **kwargs):
+    mark_stale(species_ids=[instance.species_id], using=using)
+
+
+def _reaction_saved(sender, instance, created, using, **kwargs):
+    if created:
+        # its through rows are bulk-created in the same transaction
+        mark_stale(reaction_ids=[instance.pk], using=using)
+
+
+def _process_types_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        # instance is a ProcessType, pk_set the reaction ids (None for clear)
+        if pk_set is None:
+            pk_set = instance.reaction_set.using(using).values_list("pk", flat=True)
+        mark_stale(reaction_ids=pk_set, using=using)
+    else:
+        mark_stale(reaction_ids=[instance.pk], using=using)
+
+
+def _dataset_saving(sender, instance, using, update_fields=None, **kwargs):
+    # the reaction of an existing dataset, which it may be repointed from
+    previous = None
+    if not instance._state.adding and (
+        update_fields is None or {"reaction", "reaction_id"} & set(update_fields)
+    ):
+        previous = (
+            sender._base_manager.using(using)
+            .filter(pk=instance.pk)
+            .values_list("reaction_id", flat=True)
+            .first()
+        )
+    instance._previous_reaction_id = previous
+
+
+def _dataset_changed(sender, instance, using, created=True, **kwargs):
+    reaction_ids = [instance.reaction_id]
+    if not created:
+        previous = getattr(instance, "_previous_reaction_id", None)
+        if previous is None or previous == instance.reaction_id:
+            return
+        reaction_ids.append(previous)
+    mark_stale(reaction_ids=reaction_ids, using=using)
+
+
+def _receivers():
+    receivers = [
+        (post_save, _intermediate_changed, ReactantList),
+        (post_delete, _intermediate_changed, ReactantList),
+        (post_save, _intermediate_changed, ProductList),
+        (post_delete, _intermediate_changed, ProductList),
+        (post_delete, _rp_deleted, RP),
+        (post_save, _reaction_saved, Reaction),
+        (m2m_changed, _process_types_changed, Reaction.process_types.through),
+    ]
+    for model in _dataset_models():
+        receivers.append((pre_save, _dataset_saving, model))
+        receivers.append((post_save, _dataset_changed, model))
+        receivers.append((post_delete, _dataset_changed, model))
+    return receivers
+
+
+def connect_signals():
+    """Connects the incremental maintenance of the SpeciesStats."""
+    global _connected
+    for signal, receiver, sender in _receivers():
+        signal.connect(receiver, sender=sender, dispatch_uid=_uid(receiver, sender))
+    _connected = True
+
+
+def disconnect_signals():
+    """Disconnects the incremental maintenance of the SpeciesStats."""
+    global _connected
+    for signal, receiver, sender in _receivers():
+        signal.disconnect(receiver, sender=sender, dispatch_uid=_uid(receiver, sender))
+    _connected = False
+    _pending.clear()
+
+
+def _uid(receiver, sender):
+    return f"species_stats_{receiver.__name__}_{sender._meta.label_lower}"
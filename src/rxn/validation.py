@@ -0,0 +1,197 @@
+"""Dry-run validation of the reaction files, before their import.
+
+validate_reactions parses every line of a reaction file (one reaction text per line,
+the blank lines and the lines starting with # being skipped) with pyvalem, in a pool
+of worker processes, and sorts them into the lines parsing with
+PVReaction(strict=True), those parsing only with strict=False (e.g. not conserving
+the charge), and those not parsing at all. The canonical texts of the species, RPs
+and reactions of the parsed lines are then looked up in the database with batched
+text__in queries, to report the rows an import would create:
+
+    with open("reactions.txt") as fi:
+        report = validate_reactions(fi, processes=8)
+    print(report)
+    json.dump(report.as_dict(), fo)
+
+Nothing is ever written to the database: any other query than a SELECT raises a
+RuntimeError. Also available as the validate_reactions management command.
+"""
+
+from collections import namedtuple
+from multiprocessing import Pool
+
+from django.db import connections, DEFAULT_DB_ALIAS
+from pyvalem.reaction import Reaction as PVReaction
+
+from _utils.export import chunked
+
+STRICT = "strict"
+NON_STRICT = "non-strict"
+ERROR = "error"
+
+Issue = namedtuple("Issue", "line text status message")
+Issue.__doc__ = """A line of the file which does not parse with strict=True: its status
+is NON_STRICT if it parses with strict=False, ERROR otherwise, and the message is
+that of the (strict) pyvalem error."""
+
+
+def _parse_line(item):
+    """Returns the (line, text, status, message, reaction, rps, species) of the
+    numbered line, the last three being the canonical texts of the reaction and of
+    its RPs and species (None and empty for an ERROR). Runs in the worker processes.
+    """
+    line, text = item
+    status, message = STRICT, ""
+    # pyvalem raises many exception classes without a common base class
+    try:
+        pyvalem_reaction = PVReaction(text, strict=True)
+    except Exception as err:
+        status, message = NON_STRICT, f"{type(err).__name__}: {err}"
+        try:
+            pyvalem_reaction = PVReaction(text, strict=False)
+        except Exception:
+            return line, text, ERROR, message, None, (), ()
+    rps, species = [], []
+    for _, stateful_species in pyvalem_reaction.reactants + pyvalem_reaction.products:
+        rps.append(repr(stateful_species))
+        species.append(repr(stateful_species.formula))
+    return line, text, status, message, repr(pyvalem_reaction), rps, species
+
+
+class ValidationReport:
+    """The lines not parsing strictly and the new entities of a reaction file.
+
+    The new species, RPs and reactions (i.e. their canonical texts not in the
+    database) map to the number of the first line they appear on. The reactions are
+    compared by their text only, disregarding the comments and process types.
+    """
+
+    def __init__(self):
+        self.lines = 0
+        self.counts = dict.fromkeys((STRICT, NON_STRICT, ERROR), 0)
+        self.issues = []
+        self.new_species = {}
+        self.new_rps = {}
+        self.new_reactions = {}
+        self.existing_reactions = 0
+
+    def __str__(self):
+        return "\n".join(
+            [
+                f"{self.lines} reactions: {self.counts[STRICT]} strict, "
+                f"{self.counts[NON_STRICT]} only non-strict, "
+                f"{self.counts[ERROR]} not parsing",
+                f"{len(self.new_reactions)} new and {self.existing_reactions} "
+                "existing reactions",
+                f"{len(self.new_species)} new species, {len(self.new_rps)} new RPs",
+            ]
+        )
+
+    def as_dict(self):
+        return {
+            "lines": self.lines,
+            "counts": self.counts,
+            "issues": [issue._asdict() for issue in self.issues],
+            "new_species": self.new_species,
+            "new_rps": self.new_rps,
+            "new_reactions": self.new_reactions,
+            "existing_reactions": self.existing_reactions,
+        }
+
+
+def _read_only(execute, sql, params, many, context):
+    if not sql.lstrip().upper().startswith("SELECT"):
+        raise RuntimeError(f"Validation must not write to the database: {sql}")
+    return execute(sql, params, many, context)
+
+
+def _existing(model, texts, batch_size, using):
+    """Returns the set of the texts of the model rows among the texts."""
+    texts = sorted(texts)
+    existing = set()
+    for i in range(0, len(texts), batch_size):
+        existing.update(
+            model.objects.using(using)
+            .filter(text__in=texts[i : i + batch_size])
+            .values_list("text", flat=True)
+        )
+    return existing
+
+
+def _check_new(report, first_lines, seen, batch_size, using):
+    """Adds the texts of the chunk not in the database to the new entities."""
+    # imported here, as the worker processes only need pyvalem
+    from rp.models import Species, RP
+    from .models import Reaction
+
+    for key, model, new in (
+        ("species", Species, report.new_species),
+        ("rp", RP, report.new_rps),
+        ("reaction", Reaction, report.new_reactions),
+    ):
+        lines = first_lines[key]
+        unseen = set(lines) - seen[key]
+        seen[key].update(unseen)
+        existing = _existing(model, unseen, batch_size, using)
+        for text in sorted(unseen - existing, key=lines.get):
+            new[text] = lines[text]
+        if model is Reaction:
+            report.existing_reactions += len(existing)
+
+
+def validate_reactions(
+    lines, processes=None, chunk_size=10000, batch_size=500, using=DEFAULT_DB_ALIAS
+):
+    """Validates the reaction texts of the lines without writing to the database.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        The lines of the reaction file, e.g. the file object itself.
+    processes : int, optional
+        The number of worker processes parsing the reactions. Defaults to the
+        number of CPUs, 1 parses in the current process.
+    chunk_size : int
+        The number of lines parsed and checked at a time.
+    batch_size : int
+        The maximal number of texts looked up by a single query.
+    using : str
+
+    Returns
+    -------
+    ValidationReport
+    """
+    report = ValidationReport()
+    seen = {"species": set(), "rp": set(), "reaction": set()}
+    items = (
+        (n, line.strip())
+        for n, line in enumerate(lines, 1)
+        if line.strip() and not line.lstrip().startswith("#")
+    )
+    pool = Pool(processes) if processes != 1 else None
+    try:
+        with connections[using].execute_wrapper(_read_only):
+            for chunk in chunked(items, chunk_size):
+                if pool is not None:
+                    parsed = pool.map(_parse_line, chunk, 256)
+                else:
+                    parsed = [_parse_line(item) for item in chunk]
+                first_lines = {"species": {}, "rp": {}, "reaction": {}}
+                for line, text, status, message, reaction, rps, species in parsed:
+                    report.lines += 1
+                    report.counts[status] += 1
+                    if status != STRICT:
+                        report.issues.append(Issue(line, text, status, message))
+                    if reaction is None:
+                        continue
+                    first_lines["reaction"].setdefault(reaction, line)
+                    for rp_text in rps:
+                        first_lines["rp"].setdefault(rp_text, line)
+                    for species_text in species:
+                        first_lines["species"].setdefault(species_text, line)
+                _check_new(report, first_lines, seen, batch_size, using)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return report
@@ -1,8 +1,20 @@
 from django.db import models
 
+from _utils.fields import Float64ArrayField
 from ds.models import ReactionDataSet
+from ds.rates import RateCoefficientMixin
 
 
 class MyReactionDataSet(ReactionDataSet):
     json_data = models.TextField(null=True, blank=True)
     json_comment = models.TextField(null=True, blank=True)
+
+
+class MyArrayDataSet(ReactionDataSet):
+    json_data = models.TextField(null=True, blank=True)
+    data = Float64ArrayField(null=True, blank=True)
+    compressed_data = Float64ArrayField(null=True, blank=True, compress=True)
+
+
+class MyRateDataSet(RateCoefficientMixin, ReactionDataSet):
+    pass
@@ -0,0 +1,179 @@
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.forms.models import inlineformset_factory
+from django.test import TestCase, RequestFactory
+
+from _utils.admin import BoundedInlineFormSet, KeysetChangeList
+from _utils.pagination import (
+    EstimatedCountPaginator,
+    InvalidCursor,
+    estimated_count,
+    keyset_page,
+)
+from _utils.querybudget import QueryBudgetTestMixin
+from rp.models import Species, SpeciesAlias, RP, State
+from rxn.models import Reaction, ProcessType, SpeciesStats
+
+
+class TestAdmin(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        for text in "H2 v=0", "H2 v=1;J=1", "BeH+ v=2", "He *":
+            RP.get_or_create_from_text(text)
+        self.request = RequestFactory().get("/")
+        self.request.user = User.objects.create_superuser("admin", "", "admin")
+
+    def test_checks(self):
+        for model in (
+            Species,
+            SpeciesAlias,
+            RP,
+            State,
+            Reaction,
+            ProcessType,
+            SpeciesStats,
+        ):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(admin.site._registry[model].check(), [])
+
+    def test_changelist_select_related(self):
+        for model, attr in (RP, "species"), (State, "rp"):
+            changelist = admin.site._registry[model].get_changelist_instance(
+                self.request
+            )
+            with self.assertMaxQueries(1):
+                related = [str(getattr(obj, attr)) for obj in changelist.result_list]
+            self.assertEqual(len(related), model.objects.count())
+
+    def test_changelist_paginator(self):
+        changelist = admin.site._registry[State].get_changelist_instance(self.request)
+        self.assertIsInstance(changelist.paginator, EstimatedCountPaginator)
+
+    def test_keyset_changelist(self):
+        model_admin = admin.site._registry[RP]
+        model_admin.list_per_page = 3
+        try:
+            changelist = model_admin.get_changelist_instance(self.request)
+            self.assertIsInstance(changelist, KeysetChangeList)
+            self.assertEqual(
+                [rp.text for rp in changelist.result_list],
+                ["BeH+ v=2", "H2 v=0", "H2 v=1;J=1"],
+            )
+            self.assertIsNone(changelist.previous_url)
+            # the ordering of the keyset pages cannot be changed
+            self.assertEqual(model_admin.get_sortable_by(self.request), ())
+
+            request = RequestFactory().get(changelist.next_url)
+            request.user = self.request.user
+            with self.assertMaxQueries(1):
+                changelist = model_admin.get_changelist_instance(request)
+                self.assertEqual([rp.text for rp in changelist.result_list], ["He *"])
+            self.assertIsNone(changelist.next_url)
+            self.assertIsNotNone(changelist.previous_url)
+            response = model_admin.changelist_view(request)
+            self.assertContains(response, "Previous")
+        finally:
+            model_admin.list_per_page = 50
+
+    def test_bounded_inline_formset(self):
+        species = Species.objects.get(text="H2")
+        for alias in "(1H)2", "HH", "(1H)H":
+            SpeciesAlias.objects.create(text=alias, species=species)
+        FormSet = inlineformset_factory(
+            Species,
+            SpeciesAlias,
+            formset=BoundedInlineFormSet,
+            fields="__all__",
+            extra=0,
+        )
+        FormSet.max_objects = 2
+        self.assertEqual(len(FormSet(instance=species).forms), 2)
+
+
+class TestEstimatedCountPaginator(TestCase):
+    class Paginator(EstimatedCountPaginator):
+        estimate_threshold = 2
+
+    def setUp(self):
+        for text in "H", "H2", "He", "Li", "Be":
+            Species.get_or_create_from_text(text)
+
+    def test_estimated_count(self):
+        Species.objects.filter(text="He").delete()
+        # on SQLite, the maximal primary key: an upper bound, counting the deleted
+        self.assertEqual(estimated_count(Species.objects.all()), 5)
+        self.assertIsNone(estimated_count(Species.objects.filter(charge=0)))
+        self.assertIsNone(estimated_count(Species.objects.all()[:2]))
+
+    def test_count(self):
+        self.assertEqual(self.Paginator(Species.objects.order_by("id"), 2).count, 5)
+        self.assertEqual(
+            self.Paginator(Species.objects.filter(text__startswith="H"), 2).count, 3
+        )
+        # small tables are counted exactly
+        Species.objects.filter(text="Be").delete()
+        self.assertEqual(
+            EstimatedCountPaginator(Species.objects.order_by("id"), 2).count, 4
+        )
+
+
+class TestKeysetPagination(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        texts = ["H", "H2", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne"]
+        for i, text in enumerate(texts):
+            Species.get_or_create_from_text(text)
+            # duplicate texts are ordered by their id
+            if i % 3 == 0:
+                Species.objects.create(text=text, html=text)
+
+    def walk(self, queryset, ordering, per_page):
+        pages, cursor = [], None
+        while True:
+            with self.assertMaxQueries(1):
+                page = keyset_page(queryset, cursor, per_page, ordering)
+            pages.append(list(page))
+            if not page.has_next():
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_walk(self):
+        for ordering in ("pk",), ("text", "id"), ("-text", "id"), ("-text", "-id"):
+            with self.subTest(ordering=ordering):
+                queryset = Species.objects.all()
+                pages, page = self.walk(queryset, ordering, 4)
+                self.assertEqual(
+                    [obj for page in pages for obj in page],
+                    list(queryset.order_by(*ordering)),
+                )
+                self.assertEqual([len(page) for page in pages], [4, 4, 4, 3])
+
+                # and back again
+                backwards = []
+                while page.has_previous():
+                    page = keyset_page(queryset, page.previous_cursor, 4, ordering)
+                    backwards.append(list(page))
+                self.assertEqual(backwards, pages[-2::-1])
+                self.assertFalse(page.has_previous())
+
+    def test_filtered(self):
+        queryset = Species.objects.filter(text__startswith="H")
+        pages, _ = self.walk(queryset, ("text", "id"), 2)
+        self.assertEqual(
+            [[species.text for species in page] for page in pages],
+            [["H", "H"], ["H2", "He"]],
+        )
+
+    def test_queryset_method(self):
+        reaction, _ = Reaction.get_or_create_from_text("e- + H2 -> H2+ + 2e-")
+        page = Reaction.objects.keyset_page()
+        self.assertEqual(list(page), [reaction])
+        self.assertFalse(page.has_other_pages())
+        page = RP.objects.filter(text="H2").keyset_page(per_page=1)
+        self.assertEqual(len(page), 1)
+
+    def test_invalid_cursor(self):
+        for cursor in "not a cursor", "WyJ4IiwgWzFdXQ":
+            with self.assertRaises(InvalidCursor):
+                keyset_page(Species.objects.all(), cursor)
+        page = keyset_page(Species.objects.all(), None, 2, ("text", "id"))
+        with self.assertRaises(InvalidCursor):
+            keyset_page(Species.objects.all(), page.next_cursor, 2, ("id",))
@@ -0,0 +1,59 @@
+from django.test import TestCase
+
+from benchmarks.generator import SyntheticReactionDatabase
+from rp.models import Species, SpeciesAlias, SpeciesComposition, RP
+from rxn.models import Reaction
+from .models import MyReactionDataSet
+
+
+class TestSyntheticReactionDatabase(TestCase):
+    def setUp(self):
+        self.db = SyntheticReactionDatabase(seed=42, n_cores=10)
+
+    def test_deterministic(self):
+        other = SyntheticReactionDatabase(seed=42, n_cores=10)
+        self.assertEqual(self.db.cores, other.cores)
+        self.assertEqual(self.db.reaction_texts(20), other.reaction_texts(20))
+        self.assertEqual(
+            self.db.reaction_texts(5, start=15), other.reaction_texts(20)[15:]
+        )
+        self.assertNotEqual(
+            self.db.reaction_texts(20),
+            SyntheticReactionDatabase(seed=43, n_cores=10).reaction_texts(20),
+        )
+
+    def test_populate(self):
+        counts = self.db.populate(50, dataset_model=MyReactionDataSet, processes=1)
+        self.assertEqual(counts["Reaction"], Reaction.objects.count())
+        self.assertEqual(counts["DataSet"], counts["Reaction"])
+        self.assertEqual(counts["RP"], RP.objects.count())
+        self.assertEqual(counts["Species"], Species.objects.count())
+        # with their composition
+        self.assertFalse(Species.objects.filter(natoms__isnull=True).exists())
+        for species in Species.objects.exclude(text="e-"):
+            with self.subTest(species=species.text):
+                self.assertEqual(
+                    sum(
+                        SpeciesComposition.objects.filter(species=species).values_list(
+                            "count", flat=True
+                        )
+                    ),
+                    species.natoms,
+                )
+                self.assertGreater(species.natoms, 0)
+
+        # the populated rows are found by the text lookups
+        for text, abbreviation in self.db.reaction_texts(50):
+            with self.subTest(text=text):
+                Reaction.get_from_text(text, process_type_abbreviations=(abbreviation,))
+        for alias in SpeciesAlias.objects.all():
+            with self.subTest(alias=alias.text):
+                self.assertTrue(RP.filter_from_text(alias.text).exists())
+
+        # and they are the same get_or_create_from_text would have created
+        text, abbreviation = self.db.reaction_texts(1, start=50)[0]
+        reaction, created = Reaction.get_or_create_from_text(
+            text, process_type_abbreviations=(abbreviation,)
+        )
+        self.assertTrue(created)
+        self.assertEqual(RP.objects.count(), len(set(RP.objects.values_list("text"))))
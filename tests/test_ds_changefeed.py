@@ -0,0 +1,130 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from _utils.querybudget import QueryBudgetTestMixin
+from ds.changefeed import iter_changes, provenance_models
+from rp.models import Species, RP, Tombstone
+from rxn.models import Reaction
+from .models import MyReactionDataSet
+
+
+class TestChangeFeed(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.reaction, _ = Reaction.get_or_create_from_text("e- + H2 -> H2+ + 2e-")
+        self.dataset = MyReactionDataSet.objects.create(reaction=self.reaction)
+        self.watermark = timezone.now()
+
+    def changes(self, since=None, models=None):
+        return [
+            (change["model"], change["action"], change["id"])
+            for change in iter_changes(since, models=models)
+        ]
+
+    def test_provenance_models(self):
+        models = provenance_models()
+        for model in Species, RP, Reaction, MyReactionDataSet:
+            self.assertIn(model, models)
+
+    def test_full(self):
+        changes = self.changes(models=[Reaction, MyReactionDataSet])
+        self.assertEqual(
+            changes,
+            [
+                ("rxn.reaction", "added", self.reaction.id),
+                ("tests.myreactiondataset", "added", self.dataset.id),
+            ],
+        )
+
+    def test_incremental(self):
+        self.assertEqual(self.changes(self.watermark), [])
+
+        self.reaction.comment = "updated"
+        self.reaction.save()
+        species, _ = Species.get_or_create_from_text("CO2")
+        h2p = Species.objects.get(text="H2+")
+        rp_id = RP.objects.get(text="H2+").id
+        Species.objects.filter(text="H2+").delete()
+
+        changes = self.changes(self.watermark)
+        self.assertIn(("rp.species", "added", species.id), changes)
+        self.assertIn(("rxn.reaction", "modified", self.reaction.id), changes)
+        # the cascade deletions are recorded too
+        self.assertIn(("rp.rp", "deleted", rp_id), changes)
+
+        reaction_id = self.reaction.id
+        self.reaction.delete()
+        changes = self.changes(self.watermark)
+        self.assertIn(("rxn.reaction", "deleted", reaction_id), changes)
+        self.assertIn(("tests.myreactiondataset", "deleted", self.dataset.id), changes)
+        self.assertEqual(Tombstone.objects.filter(model="rp.rp").count(), 1)
+
+        changes = self.changes(self.watermark, models=[Species])
+        self.assertEqual(
+            changes,
+            [("rp.species", "added", species.id), ("rp.species", "deleted", h2p.id)],
+        )
+        self.assertEqual(self.changes(timezone.now()), [])
+
+    def test_records(self):
+        changes = {
+            change["model"]: change
+            for change in iter_changes(models=provenance_models())
+        }
+        record = changes["rxn.reaction"]["record"]
+        self.assertEqual(record["text"], "e- + H2 → H2+ + 2e-")
+        self.assertEqual(len(record["reactants"]), 2)
+        record = changes["tests.myreactiondataset"]["record"]
+        self.assertEqual(record["reaction_id"], self.reaction.id)
+        self.assertEqual(changes["rp.species"]["record"]["text"], "H2+")
+
+    def test_query_budget(self):
+        for text in ("H", "He", "Li", "Be"):
+            Species.get_or_create_from_text(text)
+        # the ids chunk, the records and the tombstones queries
+        with self.assertMaxQueries(3):
+            changes = list(iter_changes(self.watermark, models=[Species]))
+        self.assertEqual(len(changes), 4)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            watermark_file = os.path.join(tmpdir, "watermark")
+            out = StringIO()
+            call_command(
+                "export_changes",
+                "rxn.Reaction",
+                watermark_file=watermark_file,
+                stdout=out,
+                stderr=StringIO(),
+            )
+            changes = [json.loads(line) for line in out.getvalue().splitlines()]
+            self.assertEqual(len(changes), 1)
+            self.assertEqual(changes[0]["action"], "added")
+
+            reaction_id = self.reaction.id
+            self.reaction.delete()
+            out = StringIO()
+            call_command(
+                "export_changes",
+                "rxn.Reaction",
+                watermark_file=watermark_file,
+                stdout=out,
+                stderr=StringIO(),
+            )
+            changes = [json.loads(line) for line in out.getvalue().splitlines()]
+            self.assertEqual(
+                changes,
+                [
+                    {
+                        "model": "rxn.reaction",
+                        "action": "deleted",
+                        "id": reaction_id,
+                        "time": changes[0]["time"],
+                    }
+                ],
+            )
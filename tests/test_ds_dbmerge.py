@@ -0,0 +1,127 @@
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from refs.models import Ref
+
+from _utils.bulk import can_bulk_return_pks
+from ds.dbmerge import merge_database
+from rp.models import Species, SpeciesAlias, SpeciesComposition, RP, State
+from rxn.models import ProcessType, Reaction, ReactantList
+from .models import MyArrayDataSet, MyReactionDataSet
+
+# canonical texts
+SHARED = "e- + H2 v=0 → H2 v=1 + e-"
+NEW = "e- + CO2 → CO2+ + 2e-"
+
+
+class TestMergeDatabase(TestCase):
+    # the "replica" database is used as the source of the merges
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        for using in "default", "replica":
+            ProcessType.objects.using(using).create(abbreviation="EEX")
+            shared, _ = Reaction.get_or_create_from_text(
+                SHARED, process_type_abbreviations=("EEX",), using=using
+            )
+        # ids diverging between the databases
+        Reaction.get_or_create_from_text("H + H -> H2", using="default")
+        ProcessType.objects.using("replica").create(abbreviation="EXV")
+        Reaction.get_or_create_from_text(SHARED, using="replica")
+        reaction, _ = Reaction.get_or_create_from_text(
+            NEW, process_type_abbreviations=("EXV",), using="replica"
+        )
+        SpeciesAlias.objects.using("replica").create(
+            text="carbon dioxide",
+            species=Species.objects.using("replica").get(text="CO2"),
+        )
+        ref = Ref.objects.using("replica").create(doi="10.1000/1", year=2020)
+        dataset = MyArrayDataSet.objects.using("replica").create(
+            reaction=reaction, data=np.arange(6.0).reshape(2, 3)
+        )
+        dataset.refs.add(ref)
+        MyReactionDataSet.objects.using("replica").create(
+            reaction=shared, json_data="{}"
+        )
+
+    def reactions(self, using="default"):
+        return sorted(
+            (
+                reaction.text,
+                reaction.molecularity,
+                tuple(reaction.process_types.values_list("abbreviation", flat=True)),
+            )
+            for reaction in Reaction.objects.using(using)
+        )
+
+    def test_merge(self):
+        expected = sorted(
+            set(self.reactions("default")) | set(self.reactions("replica"))
+        )
+        report = merge_database("replica", batch_size=2)
+        self.assertEqual(self.reactions(), expected)
+        self.assertEqual(report.matched["rxn.Reaction"], 1)
+        self.assertEqual(report.inserted["rxn.Reaction"], 2)
+        self.assertEqual(report.inserted["rxn.ProcessType"], 1)
+        self.assertEqual(
+            Species.objects.values("text").distinct().count(), Species.objects.count()
+        )
+        self.assertEqual(
+            RP.objects.values("text").distinct().count(), RP.objects.count()
+        )
+        self.assertEqual(
+            sorted(State.objects.values_list("text", flat=True)), ["v=0", "v=1"]
+        )
+        self.assertEqual(
+            SpeciesAlias.objects.get(text="carbon dioxide").species.text, "CO2"
+        )
+        self.assertEqual(
+            SpeciesComposition.objects.filter(species__text="CO2+").count(), 2
+        )
+
+        dataset = MyArrayDataSet.objects.get()
+        self.assertEqual(dataset.reaction.text, NEW)
+        np.testing.assert_array_equal(dataset.data, np.arange(6.0).reshape(2, 3))
+        self.assertEqual([ref.doi for ref in dataset.refs.all()], ["10.1000/1"])
+        dataset = MyReactionDataSet.objects.get()
+        self.assertEqual(
+            list(dataset.reaction.process_types.values_list("abbreviation", flat=True)),
+            ["EEX"],
+        )
+
+        # merging again inserts nothing
+        report = merge_database("replica", batch_size=2)
+        self.assertEqual(sum(report.inserted.values()), 0)
+        self.assertEqual(report.matched["tests.MyArrayDataSet"], 1)
+        self.assertEqual(self.reactions(), expected)
+
+    def test_query_budget(self):
+        # a fixed number of queries per batch, whatever the number of rows, but for
+        # the backends which cannot return the pks of a bulk insert, saving the 2
+        # species, 2 RPs and 2 reactions inserted one at a time
+        n_queries = 23 if can_bulk_return_pks("default") else 26
+        with self.assertNumQueries(n_queries, using="default"):
+            merge_database("replica", batch_size=100)
+
+    def test_dry_run(self):
+        expected = self.reactions()
+        report = merge_database("replica", dry_run=True)
+        self.assertEqual(report.inserted["rxn.Reaction"], 2)
+        self.assertIn("(dry run, rolled back)", str(report))
+        self.assertEqual(self.reactions(), expected)
+        self.assertFalse(MyArrayDataSet.objects.exists())
+        self.assertEqual(ReactantList.objects.count(), 4)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            merge_database("default", "default")
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "merge_database", "replica", "tests.MyArrayDataSet", "--dry-run", stdout=out
+        )
+        self.assertIn("Inserted 1 tests.MyArrayDataSet rows", out.getvalue())
+        self.assertNotIn("tests.MyReactionDataSet", out.getvalue())
@@ -0,0 +1,68 @@
+import numpy as np
+from django.test import TestCase
+
+from _utils.querybudget import QueryBudgetTestMixin
+from ds.rates import evaluate_rates
+from rxn.models import Reaction
+from .models import MyRateDataSet
+
+
+class TestRates(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.reaction, _ = Reaction.get_or_create_from_text("e- + H2 -> H2+ + 2e-")
+        self.T = np.array([100.0, 300.0, 1000.0, 3000.0])
+
+    def create(self, **kwargs):
+        return MyRateDataSet.objects.create(reaction=self.reaction, **kwargs)
+
+    def test_arrhenius(self):
+        params = [(1e-10, 0, 0), (2e-10, 0.5, 1000), (3e-11, -1.2, 50)]
+        datasets = [self.create(A=A, n=n, Ea=Ea) for A, n, Ea in params]
+        with self.assertMaxQueries(1):
+            rates = evaluate_rates(MyRateDataSet.objects.all(), self.T)
+        self.assertEqual(list(rates.ids), [ds.id for ds in datasets])
+        self.assertEqual(rates.k.shape, (3, 4))
+        for (A, n, Ea), k in zip(params, rates.k):
+            np.testing.assert_allclose(
+                k, A * (self.T / 300) ** n * np.exp(-Ea / self.T)
+            )
+        np.testing.assert_allclose(datasets[1].rate(self.T), rates.k[1])
+        self.assertAlmostEqual(datasets[0].rate(500), 1e-10)
+
+    def test_validity_range(self):
+        self.create(A=1e-10, T_min=200, T_max=2000)
+        k = evaluate_rates(MyRateDataSet.objects.all(), self.T).k[0]
+        self.assertTrue(np.isnan(k[[0, 3]]).all())
+        np.testing.assert_allclose(k[1:3], 1e-10)
+        k = evaluate_rates(MyRateDataSet.objects.all(), self.T, extrapolate=True).k[0]
+        np.testing.assert_allclose(k, 1e-10)
+
+    def test_tabulated(self):
+        grid = [100.0, 1000.0, 10000.0]
+        tables = [
+            [grid, [1e-12, 1e-11, 1e-10]],
+            [grid, [2e-12, 2e-11, 0]],
+            [[200.0, 2000.0], [1e-9, 1e-9]],
+        ]
+        for table in tables:
+            self.create(rate_kind=MyRateDataSet.TABULATED, rate_table=table)
+        self.create(A=1e-10)
+
+        T = np.array([50.0, 100.0, np.sqrt(1e5), 1000.0, 5000.0])
+        k = evaluate_rates(MyRateDataSet.objects.all(), T).k
+        # log-log interpolation
+        np.testing.assert_allclose(k[0, 1:4], [1e-12, np.sqrt(1e-23), 1e-11])
+        self.assertTrue(np.isnan(k[0, 0]))
+        np.testing.assert_allclose(k[1, 3], 2e-11)
+        self.assertEqual(k[1, 4], 0)
+        self.assertTrue(np.isnan(k[2, [0, 1, 4]]).all())
+        np.testing.assert_allclose(k[2, 2:4], 1e-9)
+        np.testing.assert_allclose(k[3], 1e-10)
+
+        k = evaluate_rates(MyRateDataSet.objects.all(), T, extrapolate=True).k
+        np.testing.assert_allclose(k[0, 0], 1e-12)
+        np.testing.assert_allclose(k[2], 1e-9)
+
+    def test_empty(self):
+        rates = evaluate_rates(MyRateDataSet.objects.all(), self.T)
+        self.assertEqual(rates.k.shape, (0, 4))
@@ -1,11 +1,14 @@
+from django.db import DEFAULT_DB_ALIAS
 from django.test import TestCase
 from refs.models import Ref
 
+from _utils.bulk import can_bulk_return_pks
+from _utils.querybudget import QueryBudgetTestMixin
 from rxn.models import Reaction, ProcessType
 from .models import MyReactionDataSet
 
 
-class TestReactionDataSet(TestCase):
+class TestReactionDataSet(QueryBudgetTestMixin, TestCase):
     def setUp(self):
         process_types_raw = [
             ["EEX", "Excitation", "e<sup>-</sup> + A → e<sup>-</sup> + A<sup>*</sup>"],
@@ -56,3 +59,80 @@ class TestReactionDataSet(TestCase):
     def test_repr(self):
         ds = MyReactionDataSet.objects.create(id=42, reaction=self.test_reaction)
         self.assertEqual(repr(ds), f"<D42: {str(self.test_reaction)}>")
+
+    def test_bulk_ingest(self):
+        other_reaction, _ = Reaction.get_or_create_from_text(
+            "BeH+ v=0 + e- -> BeH+ v=10 + e-", process_type_abbreviations=("EEX",)
+        )
+        ref2 = Ref.objects.create(doi="10.1000/2", year=2020)
+        entries = [
+            {
+                "reaction": "e- + BeH+ v=0 -> e- + BeH+ v=10",
+                "process_types": ("EXV", "EEX"),
+                "refs": [self.doi, ref2],
+                "json_data": f'{{"i": {i}}}',
+            }
+            for i in range(50)
+        ]
+        entries.append(
+            {
+                "reaction": "e- + BeH+ v=0 -> e- + BeH+ v=10",
+                "process_types": ("EEX",),
+                "refs": [ref2.id],
+            }
+        )
+        entries.append(
+            {"reaction": other_reaction, "json_comment": "x", "process_types": ()}
+        )
+        # reaction lookup, refs DOIs, datasets and refs through rows inserts and
+        # the transaction savepoint and its release, the datasets being inserted
+        # one at a time by the backends not returning the bulk-inserted pks
+        n_inserts = 1 if can_bulk_return_pks(DEFAULT_DB_ALIAS) else len(entries)
+        with self.assertMaxQueries(5 + n_inserts):
+            datasets = MyReactionDataSet.bulk_ingest(entries, added_by_user_id=7)
+        self.assertEqual(len(datasets), 52)
+        self.assertEqual(MyReactionDataSet.objects.count(), 52)
+        self.assertTrue(all(ds.pk for ds in datasets))
+        self.assertEqual(
+            MyReactionDataSet.objects.filter(reaction=self.test_reaction).count(), 50
+        )
+        self.assertEqual(
+            MyReactionDataSet.objects.filter(reaction=other_reaction).count(), 2
+        )
+        self.assertEqual(datasets[10].refs.count(), 2)
+        self.assertEqual(list(datasets[50].refs.all()), [ref2])
+        self.assertEqual(datasets[51].refs.count(), 0)
+        self.assertEqual(
+            set(MyReactionDataSet.objects.values_list("added_by_user_id", flat=True)),
+            {7},
+        )
+        self.assertIsNotNone(datasets[0].time_added)
+        self.assertEqual(datasets[10].json_data, '{"i": 10}')
+
+    def test_bulk_ingest_missing(self):
+        with self.assertRaises(Reaction.DoesNotExist):
+            MyReactionDataSet.bulk_ingest(
+                [{"reaction": "e- + BeH+ v=0 -> e- + BeH+ v=10", "comment": "x"}]
+            )
+        with self.assertRaises(Ref.DoesNotExist):
+            MyReactionDataSet.bulk_ingest(
+                [{"reaction": self.test_reaction, "refs": ["10.1000/missing"]}]
+            )
+        self.assertEqual(MyReactionDataSet.objects.count(), 0)
+
+    def test_bulk_ingest_resolution_keys(self):
+        for reaction in self.test_reaction, self.test_reaction.id:
+            with self.subTest(reaction=reaction):
+                with self.assertRaises(ValueError):
+                    MyReactionDataSet.bulk_ingest(
+                        [{"reaction": reaction, "process_types": ("EEX",)}]
+                    )
+                with self.assertRaises(ValueError):
+                    MyReactionDataSet.bulk_ingest(
+                        [{"reaction": reaction, "comment": "x"}]
+                    )
+        self.assertEqual(MyReactionDataSet.objects.count(), 0)
+        datasets = MyReactionDataSet.bulk_ingest(
+            [{"reaction": self.test_reaction.id, "comment": ""}]
+        )
+        self.assertEqual(datasets[0].reaction_id, self.test_reaction.id)
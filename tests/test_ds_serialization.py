@@ -0,0 +1,126 @@
+import json
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase
+from refs.models import Ref
+
+from ds import serialization
+from ds.serialization import (
+    dumps,
+    serialize_datasets,
+    serialize_reactions,
+    serialize_rps,
+    serialize_species,
+)
+from rp.models import Species, RP
+from rxn.models import Reaction, ProcessType
+from .models import MyArrayDataSet
+
+
+class TestSerialization(TestCase):
+    def setUp(self):
+        ProcessType.objects.create(abbreviation="EEX", description="Excitation")
+        ProcessType.objects.create(abbreviation="EIN", description="Ionization")
+        self.reactions = [
+            Reaction.get_or_create_from_text(text, process_type_abbreviations=pts)[0]
+            for text, pts in [
+                ("e- + BeH+ v=0;J=1 -> e- + BeH+ v=2;J=1", ("EEX",)),
+                ("e- + H2 -> H2+ + 2e-", ("EIN", "EEX")),
+                ("He+ + H -> He + H+", ()),
+            ]
+        ]
+        ref = Ref.objects.create(doi="10.1000/xyz", year=2020)
+        for i, reaction in enumerate(self.reactions):
+            dataset = MyArrayDataSet.objects.create(
+                reaction=reaction, data=np.arange(3.0) * i
+            )
+            if i % 2:
+                dataset.refs.add(ref)
+
+    def test_serialize_species(self):
+        with self.assertNumQueries(1):
+            records = serialize_species(Species.objects.filter(text__startswith="H"))
+        self.assertEqual(
+            [record["text"] for record in records],
+            ["H2", "H2+", "He+", "H", "He", "H+"],
+        )
+        self.assertEqual(records[1]["charge"], 1)
+        self.assertEqual(len(serialize_species(Species)), Species.objects.count())
+
+    def test_serialize_rps(self):
+        with self.assertNumQueries(2):
+            records = serialize_rps(RP.objects.filter(text__startswith="BeH+"))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[1]["text"], "BeH+ v=2;J=1")
+        self.assertEqual(records[1]["charge"], 1)
+        self.assertEqual(
+            records[1]["states"],
+            [{"text": "v=2", "html": "v=2"}, {"text": "J=1", "html": "J=1"}],
+        )
+        self.assertEqual(records[1]["species_id"], Species.objects.get(text="BeH+").id)
+
+    def test_serialize_reactions(self):
+        # the same number of queries for any number of reactions
+        with self.assertNumQueries(6):
+            serialize_reactions(Reaction.objects.filter(id=self.reactions[0].id))
+        with self.assertNumQueries(6):
+            records = serialize_reactions(Reaction.objects.order_by("-id"))
+        self.assertEqual(
+            [record["id"] for record in records],
+            [reaction.id for reaction in reversed(self.reactions)],
+        )
+        record = records[1]
+        self.assertEqual(record["text"], self.reactions[1].text)
+        self.assertEqual(record["html"], self.reactions[1].html)
+        self.assertEqual(record["process_types"], ["EEX", "EIN"])
+        self.assertEqual(
+            [rp["text"] for rp in record["reactants"]],
+            [rp.text for rp in self.reactions[1].reactants.order_by("reactantlist")],
+        )
+        self.assertEqual([rp["text"] for rp in record["products"]], ["H2+", "e-", "e-"])
+        products = {rp["text"]: rp for rp in records[2]["products"]}
+        self.assertEqual(products["BeH+ v=2;J=1"]["states"][0]["text"], "v=2")
+        self.assertEqual(records[0]["process_types"], [])
+
+    def test_serialize_page(self):
+        page = Reaction.objects.order_by("-id").keyset_page(
+            per_page=2, ordering=["-id"]
+        )
+        with self.assertNumQueries(6):
+            records = serialize_reactions(page)
+        self.assertEqual(
+            [record["id"] for record in records], [reaction.id for reaction in page]
+        )
+        self.assertEqual(records[1]["process_types"], ["EEX", "EIN"])
+        self.assertEqual(serialize_rps([]), [])
+
+    def test_serialize_datasets(self):
+        with self.assertNumQueries(8):
+            records = serialize_datasets(MyArrayDataSet)
+        self.assertEqual(len(records), 3)
+        np.testing.assert_array_equal(records[2]["data"], [0.0, 2.0, 4.0])
+        self.assertEqual(records[1]["refs"], [{"id": 1, "doi": "10.1000/xyz"}])
+        self.assertEqual(records[0]["refs"], [])
+        self.assertEqual(records[0]["reaction"]["text"], self.reactions[0].text)
+        self.assertNotIn("reaction_id", records[0])
+
+        with self.assertNumQueries(2):
+            records = serialize_datasets(
+                MyArrayDataSet.objects.filter(id__gt=1), with_reactions=False
+            )
+        self.assertEqual(
+            [r["reaction_id"] for r in records], [r.id for r in self.reactions[1:]]
+        )
+
+    def test_dumps(self):
+        records = serialize_datasets(MyArrayDataSet)
+        decoded = json.loads(dumps(records))
+        self.assertEqual(decoded[1]["data"], [0.0, 1.0, 2.0])
+        self.assertEqual(decoded[1]["reaction"]["process_types"], ["EEX", "EIN"])
+        # the standard library fallback encodes the same records
+        with mock.patch.object(serialization, "orjson", None):
+            fallback = json.loads(dumps(records))
+        for record in decoded + fallback:
+            del record["time_added"], record["time_modified"]
+        self.assertEqual(fallback, decoded)
@@ -0,0 +1,101 @@
+import io
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from ds.snapshot import dump_snapshot, load_snapshot, SNAPSHOT_MODELS
+from rp.models import Species, SpeciesAlias, RP, State
+from rxn.models import ProcessType, Reaction, ReactantList, ProductList
+from .models import MyArrayDataSet
+
+EXTRA_MODELS = ["tests.MyArrayDataSet"]
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        ProcessType.objects.create(abbreviation="EEX", description="excitation")
+        Reaction.get_or_create_from_text(
+            "e- + H2 v=0 -> e- + H2 v=1", process_type_abbreviations=("EEX",)
+        )
+        reaction, _ = Reaction.get_or_create_from_text("e- + CO2 -> CO2+ + 2e-")
+        SpeciesAlias.objects.create(
+            text="carbon dioxide", species=Species.objects.get(text="CO2")
+        )
+        MyArrayDataSet.objects.create(
+            reaction=reaction, data=np.arange(6.0).reshape(2, 3), compressed_data=None
+        )
+        self.models = [
+            Species,
+            SpeciesAlias,
+            RP,
+            State,
+            Reaction,
+            Reaction.process_types.through,
+            ReactantList,
+            ProductList,
+            ProcessType,
+        ]
+
+    def rows(self, model):
+        return list(model.objects.order_by("pk").values_list())
+
+    def delete_all(self):
+        MyArrayDataSet.objects.all().delete()
+        for model in Reaction, RP, Species, ProcessType:
+            model.objects.all().delete()
+
+    def test_round_trip(self):
+        expected = {model: self.rows(model) for model in self.models}
+        dataset = MyArrayDataSet.objects.get()
+        stream = io.BytesIO()
+        counts = dump_snapshot(stream, extra_models=EXTRA_MODELS, batch_size=2)
+        self.assertEqual(counts["rp.RP"], RP.objects.count())
+        self.assertEqual(counts["rxn.Reaction_process_types"], 1)
+        self.assertEqual(list(counts)[: len(SNAPSHOT_MODELS)], list(SNAPSHOT_MODELS))
+
+        self.delete_all()
+        stream.seek(0)
+        with self.assertNumQueries(4 * 2 + 5 + 3 + 1 + 1 + 3):
+            # a savepoint, and an INSERT per batch of 2 rows: 4 species, 1 alias,
+            # 5 composition rows, 5 RPs, 3 states, 2 reactions, 1 process type row, 5 reactant and 5
+            # product rows, 1 process type and 1 dataset
+            load_snapshot(stream, batch_size=2)
+        for model, rows in expected.items():
+            self.assertEqual(self.rows(model), rows, model)
+        loaded = MyArrayDataSet.objects.get()
+        self.assertEqual(loaded.pk, dataset.pk)
+        self.assertEqual(loaded.time_added, dataset.time_added)
+        np.testing.assert_array_equal(loaded.data, dataset.data)
+        self.assertIsNone(loaded.compressed_data)
+
+        # new rows do not collide with the loaded primary keys
+        last = Reaction.objects.order_by("pk").last()
+        reaction, _ = Reaction.get_or_create_from_text("e- + O2 -> O2+ + 2e-")
+        self.assertGreater(reaction.pk, last.pk)
+
+    def test_format(self):
+        stream = io.BytesIO()
+        dump_snapshot(stream, batch_size=2)
+        with zipfile.ZipFile(stream) as archive:
+            names = archive.namelist()
+            self.assertIn("manifest.json", names)
+            self.assertIn("rp.rp/000002.json", names)
+            self.assertNotIn("rp.rp/000003.json", names)
+
+        with self.assertRaises(ValueError):
+            load_snapshot(io.BytesIO(b"PK\x05\x06" + bytes(18)))
+
+    def test_commands(self):
+        expected = self.rows(Reaction)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "valem.snapshot")
+            call_command("dump_snapshot", path, *EXTRA_MODELS, stderr=io.StringIO())
+            self.delete_all()
+            call_command("load_snapshot", path, stderr=io.StringIO())
+            with self.assertRaises(CommandError):
+                call_command("dump_snapshot", path, "tests.Missing")
+        self.assertEqual(self.rows(Reaction), expected)
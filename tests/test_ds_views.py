@@ -0,0 +1,145 @@
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from refs.models import Ref
+
+from rp.models import Species, RP
+from rxn.models import Reaction, ProcessType
+from .models import MyReactionDataSet
+
+
+class TestViews(TestCase):
+    def setUp(self):
+        ProcessType.objects.create(abbreviation="EEX", description="Excitation")
+        self.reactions = [
+            Reaction.get_or_create_from_text(text, process_type_abbreviations=pts)[0]
+            for text, pts in [
+                ("e- + H2 v=0 -> e- + H2 v=1", ("EEX",)),
+                ("e- + H2 -> H2+ + 2e-", ()),
+                ("He+ + H -> He + H+", ()),
+            ]
+        ]
+        ref = Ref.objects.create(doi="10.1000/xyz", year=2020)
+        self.dataset = MyReactionDataSet.objects.create(
+            reaction=self.reactions[0], json_data="{}"
+        )
+        self.dataset.refs.add(ref)
+
+    def get(self, url, status=200, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_list(self):
+        url = reverse("ds:species-list")
+        response = self.get(url + "?per_page=3")
+        data = json.loads(response.content)
+        self.assertEqual(
+            [record["text"] for record in data["results"]], ["H", "H+", "H2"]
+        )
+        self.assertIsNone(data["previous"])
+        self.assertEqual(response["Cache-Control"], "no-cache")
+
+        data = json.loads(self.get(f"{url}?per_page=3&cursor={data['next']}").content)
+        self.assertEqual(
+            [record["text"] for record in data["results"]], ["H2+", "He", "He+"]
+        )
+        self.assertIsNotNone(data["previous"])
+
+        data = json.loads(self.get(reverse("ds:reaction-list")).content)
+        self.assertEqual(len(data["results"]), 3)
+        self.assertIsNone(data["next"])
+        record = next(r for r in data["results"] if r["id"] == self.reactions[0].id)
+        self.assertEqual(record["process_types"], ["EEX"])
+        self.assertEqual(len(record["reactants"]), 2)
+
+        data = json.loads(self.get(reverse("ds:rp-list") + "?per_page=1").content)
+        self.assertEqual(
+            data["results"][0]["text"], RP.objects.order_by("text")[0].text
+        )
+
+        self.get(url + "?per_page=0", status=400)
+        self.get(url + "?per_page=x", status=400)
+        self.get(url + "?cursor=x", status=400)
+
+    def test_detail(self):
+        reaction = self.reactions[1]
+        data = json.loads(
+            self.get(reverse("ds:reaction-detail", args=[reaction.id])).content
+        )
+        self.assertEqual(data["text"], reaction.text)
+        self.assertEqual([rp["text"] for rp in data["products"]], ["H2+", "e-", "e-"])
+        species = Species.objects.get(text="H2+")
+        data = json.loads(
+            self.get(reverse("ds:species-detail", args=[species.id])).content
+        )
+        self.assertEqual(
+            data, {"id": species.id, "text": "H2+", "html": species.html, "charge": 1}
+        )
+        self.get(reverse("ds:rp-detail", args=[0]), status=404)
+
+    def test_datasets(self):
+        url = reverse("ds:dataset-list", args=["tests.MyReactionDataSet"])
+        data = json.loads(self.get(url).content)
+        self.assertEqual(data["results"][0]["refs"], [{"id": 1, "doi": "10.1000/xyz"}])
+        self.assertEqual(data["results"][0]["reaction"]["text"], self.reactions[0].text)
+        url = reverse(
+            "ds:dataset-detail", args=["tests.myreactiondataset", self.dataset.id]
+        )
+        self.assertEqual(json.loads(self.get(url).content)["id"], self.dataset.id)
+        self.get(reverse("ds:dataset-list", args=["rp.Species"]), status=404)
+
+    def test_conditional_detail(self):
+        reaction = self.reactions[0]
+        url = reverse("ds:reaction-detail", args=[reaction.id])
+        response = self.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        # checked with a single query, without serialising the reaction
+        with self.assertNumQueries(1):
+            response = self.get(url, status=304, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response["ETag"], etag)
+        self.get(url, status=304, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.get(url, HTTP_IF_NONE_MATCH='"other"')
+
+        reaction.comment = "updated"
+        reaction.save()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(json.loads(response.content)["comment"], "updated")
+
+        # changed by a modification of a related row of the record
+        etag = response["ETag"]
+        rp = reaction.products.first()
+        rp.html = "modified"
+        rp.save()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertIn(
+            "modified", [rp["html"] for rp in json.loads(response.content)["products"]]
+        )
+
+        url = reverse(
+            "ds:dataset-detail", args=["tests.MyReactionDataSet", self.dataset.id]
+        )
+        etag = self.get(url)["ETag"]
+        self.get(url, status=304, HTTP_IF_NONE_MATCH=etag)
+        reaction.save()
+        self.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_conditional_list(self):
+        url = reverse("ds:reaction-list")
+        etag = self.get(url)["ETag"]
+        with self.assertNumQueries(2):
+            self.get(url, status=304, HTTP_IF_NONE_MATCH=etag)
+        # the ETags differ between the pages
+        self.assertNotEqual(self.get(url + "?per_page=2")["ETag"], etag)
+
+        # changed by a modification of a row of the page
+        self.reactions[2].save()
+        etag = self.get(url, status=200, HTTP_IF_NONE_MATCH=etag)["ETag"]
+        # and by a deletion
+        self.reactions[1].delete()
+        response = self.get(url, status=200, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(json.loads(response.content)["results"]), 2)
+        self.get(url, status=304, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
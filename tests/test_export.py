@@ -0,0 +1,139 @@
+import io
+import csv
+import json
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from refs.models import Ref
+
+from _utils.export import write_records
+from _utils.querybudget import QueryBudgetTestMixin
+from ds.export import iter_datasets
+from rxn.export import iter_reactions
+from rxn.models import Reaction, ProcessType
+from .models import MyArrayDataSet, MyReactionDataSet
+
+
+class TestExport(QueryBudgetTestMixin, TestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        ProcessType.objects.create(abbreviation="EEX", description="Excitation")
+        ProcessType.objects.create(abbreviation="EIN", description="Ionization")
+        self.texts = [
+            "e- + H2 v=0 -> e- + H2 v=1",
+            "e- + H2 -> H2+ + 2e-",
+            "e- + BeH+ v=0;J=1 -> e- + BeH+ v=2;J=1",
+            "He+ + H -> He + H+",
+            "e- + He -> He+ + 2e-",
+        ]
+        self.reactions = [
+            Reaction.get_or_create_from_text(text, process_type_abbreviations=pts)[0]
+            for text, pts in zip(
+                self.texts, [("EEX",), ("EIN",), ("EEX",), (), ("EIN", "EEX")]
+            )
+        ]
+        ref = Ref.objects.create(doi="10.1000/xyz", year=2020)
+        for i, reaction in enumerate(self.reactions):
+            dataset = MyReactionDataSet.objects.create(
+                reaction=reaction, json_data=json.dumps({"i": i})
+            )
+            if i % 2:
+                dataset.refs.add(ref)
+
+    def test_iter_reactions(self):
+        records = list(iter_reactions())
+        self.assertEqual([r["id"] for r in records], [r.id for r in self.reactions])
+        record = records[2]
+        self.assertEqual(record["text"], self.reactions[2].text)
+        self.assertEqual(record["process_types"], ["EEX"])
+        self.assertEqual(
+            [rp["text"] for rp in record["reactants"]],
+            [rp.text for rp in self.reactions[2].reactants.order_by("reactantlist")],
+        )
+        self.assertEqual(record["products"][0]["charge"], 1)
+        self.assertEqual(sorted(record["products"][0]["states"]), ["J=1", "v=2"])
+        self.assertEqual(records[4]["process_types"], ["EEX", "EIN"])
+        self.assertEqual(
+            [rp["text"] for rp in records[1]["products"]], ["H2+", "e-", "e-"]
+        )
+
+    def test_other_database(self):
+        # the related rows are read from the database of the queryset
+        Reaction.get_or_create_from_text(self.texts[1], using="replica")
+        with self.assertNumQueries(0, using="default"):
+            (record,) = iter_reactions(Reaction.objects.using("replica"))
+        self.assertEqual([rp["text"] for rp in record["products"]], ["H2+", "e-", "e-"])
+
+    def test_chunked_queries(self):
+        # 1 query for the reactions + 5 for every chunk (reactants, products, their
+        # RPs and states and the process types)
+        with self.assertMaxQueries(1 + 5 * 3):
+            self.assertEqual(len(list(iter_reactions(chunk_size=2))), 5)
+        with self.assertMaxQueries(1 + 5):
+            list(iter_reactions(Reaction.objects.filter(text__contains="H2")))
+
+    def test_iter_datasets(self):
+        # and 2 more for every chunk of the datasets: their refs and reactions
+        with self.assertMaxQueries(1 + 7 * 3):
+            records = list(iter_datasets(MyReactionDataSet, chunk_size=2))
+        self.assertEqual(len(records), 5)
+        self.assertEqual(json.loads(records[3]["json_data"]), {"i": 3})
+        self.assertEqual(records[3]["refs"], [{"id": 1, "doi": "10.1000/xyz"}])
+        self.assertEqual(records[2]["refs"], [])
+        self.assertEqual(records[2]["reaction"]["text"], self.reactions[2].text)
+
+        records = list(
+            iter_datasets(
+                MyReactionDataSet.objects.filter(id__gt=3), with_reactions=False
+            )
+        )
+        self.assertEqual(
+            [r["reaction_id"] for r in records], [r.id for r in self.reactions[3:]]
+        )
+
+    def test_write_records(self):
+        stream = io.StringIO()
+        self.assertEqual(write_records(iter_reactions(), stream, "ndjson"), 5)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])["text"], self.reactions[0].text)
+
+        stream = io.StringIO()
+        write_records(iter_reactions(), stream, "csv")
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[4]["process_types"], "EEX;EIN")
+        self.assertEqual(rows[1]["products"], "H2+;e-;e-")
+
+        with self.assertRaises(ValueError):
+            write_records([], stream, "xml")
+
+    def test_csv_arrays(self):
+        data = np.arange(2000.0) / 3
+        MyArrayDataSet.objects.create(reaction=self.reactions[0], data=data)
+        stream = io.StringIO()
+        write_records(iter_datasets(MyArrayDataSet), stream, "csv")
+        (row,) = csv.DictReader(io.StringIO(stream.getvalue()))
+        # not truncated by numpy, nor rounded
+        np.testing.assert_array_equal(
+            [float(value) for value in row["data"].split(";")], data
+        )
+        self.assertEqual(row["compressed_data"], "")
+
+    def test_commands(self):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("export_reactions", stdout=out, stderr=err)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+        self.assertIn("Exported 5 reactions.", err.getvalue())
+
+        out = io.StringIO()
+        call_command(
+            "export_datasets",
+            "tests.MyReactionDataSet",
+            "--format=csv",
+            stdout=out,
+            stderr=err,
+        )
+        self.assertEqual(len(out.getvalue().splitlines()), 6)
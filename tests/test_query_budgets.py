@@ -0,0 +1,132 @@
+import warnings
+
+from django.test import TestCase
+
+from _utils.querybudget import (
+    query_budget,
+    sql_shape,
+    QueryBudgetExceeded,
+    QueryBudgetTestMixin,
+    QueryBudgetWarning,
+)
+from rp.models import Species, SpeciesAlias, RP
+from rxn.models import ProcessType, Reaction
+
+
+class TestQueryBudget(TestCase):
+    def test_sql_shape(self):
+        self.assertEqual(
+            sql_shape('SELECT "id" FROM "rp_rp" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+            'SELECT "id" FROM "rp_rp" WHERE "id" IN (...) LIMIT N',
+        )
+
+    def test_within_budget(self):
+        with query_budget(2) as recorder:
+            Species.objects.count()
+            Species.objects.count()
+        self.assertEqual(len(recorder), 2)
+
+    def test_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded) as cm:
+            with query_budget(1):
+                for text in ("H", "He", "Li"):
+                    Species.objects.filter(text=text).exists()
+        self.assertIn("3 queries executed, the budget is 1", str(cm.exception))
+        self.assertIn("Repeated SQL shapes:\n  3x SELECT", str(cm.exception))
+
+    def test_max_repeats(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(max_repeats=1):
+                Species.objects.filter(id=1).exists()
+                Species.objects.filter(id=2).exists()
+
+    def test_warn(self):
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            with query_budget(0, action="warn"):
+                Species.objects.count()
+        self.assertEqual(len(w), 1)
+        self.assertIs(w[0].category, QueryBudgetWarning)
+
+    def test_decorator(self):
+        @query_budget(0)
+        def count_species():
+            return Species.objects.count()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            count_species()
+
+
+class TestAPIQueryBudgets(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        for abbreviation in "EEX", "EXV":
+            ProcessType.objects.create(abbreviation=abbreviation, description="")
+        self.reaction, _ = Reaction.get_or_create_from_text(
+            "BeH+ v=0 + e- -> BeH+ v=10 + e-", process_type_abbreviations=("EEX",)
+        )
+        for abbreviations in ("EXV",), ("EEX", "EXV"), ():
+            Reaction.get_or_create_from_text(
+                "BeH+ v=0 + e- -> BeH+ v=10 + e-",
+                process_type_abbreviations=abbreviations,
+            )
+        SpeciesAlias.objects.create(
+            text="HBe+", species=Species.objects.get(text="BeH+")
+        )
+
+    def test_species(self):
+        with self.assertMaxQueries(1):
+            Species.get_from_text("BeH+")
+        with self.assertMaxQueries(1):
+            Species.get_or_create_from_text("BeH+")
+        # lookup, insert and insert of the composition
+        with self.assertMaxQueries(3):
+            Species.get_or_create_from_text("BeH")
+
+    def test_rp(self):
+        with self.assertMaxQueries(1):
+            rp = RP.get_from_text("BeH+ v=0")
+            self.assertEqual(rp.charge, 1)
+        with self.assertMaxQueries(1):
+            rp, _ = RP.get_or_create_from_text("BeH+ v=0")
+            self.assertEqual(rp.charge, 1)
+        # new species with its composition, RP and two states
+        with self.assertMaxQueries(6):
+            RP.get_or_create_from_text("H2 v=1;J=2")
+
+    def test_rp_filter_from_text(self):
+        with self.assertMaxQueries(2):
+            rps = list(RP.filter_from_text("HBe+"))
+        with self.assertMaxQueries(0):
+            self.assertEqual([rp.charge for rp in rps], [1, 1])
+
+    def test_reaction_get_from_text(self):
+        # independent of the number of reactions sharing the text
+        with self.assertMaxQueries(2):
+            reaction = Reaction.get_from_text(
+                "BeH+ v=0 + e- -> BeH+ v=10 + e-", process_type_abbreviations=("EXV",)
+            )
+        with self.assertMaxQueries(2):
+            with self.assertRaises(Reaction.DoesNotExist):
+                Reaction.get_from_text("BeH+ v=0 + e- -> BeH+ v=10 + e-", comment="x")
+        with self.assertMaxQueries(1):
+            self.assertEqual(reaction.molecularity, 2)
+
+    def test_reaction_get_or_create_from_text(self):
+        # existing RPs: lookup, insert, 4 RP lookups and 2 bulk inserts of the RPs,
+        # within a savepoint
+        with self.assertMaxQueries(10):
+            Reaction.get_or_create_from_text(
+                "BeH+ v=0 + e- -> BeH+ v=10 + e-", comment="new"
+            )
+
+    def test_molecularity_prefetched(self):
+        reactions = list(Reaction.objects.prefetch_related("reactants"))
+        with self.assertMaxQueries(0):
+            self.assertEqual([r.molecularity for r in reactions], [2] * 4)
+
+    def test_species_alias_str(self):
+        with self.assertMaxQueries(1):
+            aliases = [
+                str(alias) for alias in SpeciesAlias.objects.select_related("species")
+            ]
+        self.assertEqual(aliases, ["HBe+ -> BeH+"])
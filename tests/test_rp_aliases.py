@@ -0,0 +1,90 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from rp import aliases
+from rp.aliases import upsert_aliases
+from rp.models import Species, SpeciesAlias
+
+
+class TestUpsertAliases(TestCase):
+    def setUp(self):
+        for text in "H2O", "CH3OH", "CO2":
+            Species.get_or_create_from_text(text)
+        SpeciesAlias.objects.create(
+            text="water", species=Species.objects.get(text="H2O")
+        )
+        SpeciesAlias.objects.create(
+            text="wood alcohol", species=Species.objects.get(text="H2O")
+        )
+        self.rows = [
+            ("water", "H2O"),
+            ("methanol", "CH3OH"),
+            ("wood alcohol", "CH3OH"),
+            ("carbon dioxide", "CO2"),
+            ("dry ice", "CO2"),
+            ("methanol", "H2O"),
+            ("ammonia", "NH3"),
+            ("junk", "Xx2+"),
+        ]
+
+    def aliases(self):
+        return dict(SpeciesAlias.objects.values_list("text", "species__text"))
+
+    def test_insert(self):
+        with self.assertNumQueries(3 * 5 - 1):
+            # per batch: the savepoint, the species and aliases lookups, the
+            # insert and the release, the last batch having nothing to insert
+            report = upsert_aliases(self.rows, batch_size=3)
+        self.assertEqual(report.inserted, 3)
+        self.assertEqual(report.updated, 0)
+        self.assertEqual(report.unchanged, 1)
+        self.assertEqual(report.conflicting, 1)
+        self.assertEqual(report.duplicates, 1)
+        self.assertEqual(report.unresolved, 1)
+        self.assertEqual(report.invalid, 1)
+        self.assertEqual(report.batches, 3)
+        self.assertEqual(
+            self.aliases(),
+            {
+                "water": "H2O",
+                "wood alcohol": "H2O",
+                "methanol": "CH3OH",
+                "carbon dioxide": "CO2",
+                "dry ice": "CO2",
+            },
+        )
+
+    def test_update(self):
+        report = upsert_aliases(self.rows, update=True, create_species=True)
+        self.assertEqual(report.inserted, 4)
+        self.assertEqual(report.updated, 1)
+        self.assertEqual(report.unchanged, 1)
+        self.assertEqual(report.unresolved, 0)
+        self.assertEqual(self.aliases()["wood alcohol"], "CH3OH")
+        self.assertEqual(self.aliases()["ammonia"], "NH3")
+        self.assertIn("Updated 1 rp.SpeciesAlias rows", str(report))
+
+    def test_update_without_upsert(self):
+        # the backends and django versions without INSERT ... ON CONFLICT UPDATE
+        with mock.patch.object(aliases, "can_bulk_upsert", return_value=False):
+            report = upsert_aliases(self.rows, update=True)
+        self.assertEqual(report.inserted, 3)
+        self.assertEqual(report.updated, 1)
+        self.assertEqual(self.aliases()["wood alcohol"], "CH3OH")
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "synonyms.tsv")
+            with open(path, "w") as fo:
+                fo.write("# alias\tformula\n")
+                fo.writelines(f"{text}\t{formula}\n" for text, formula in self.rows)
+            out = StringIO()
+            call_command("load_aliases", path, "--update", stdout=out)
+        self.assertIn("Inserted 3 rp.SpeciesAlias rows", out.getvalue())
+        self.assertIn("Skipped 1 invalid and 1 unresolved", out.getvalue())
+        self.assertEqual(self.aliases()["wood alcohol"], "CH3OH")
@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from _utils.markup import deferred_markup
+from rp.composition import index_composition
+from rp.models import Species, SpeciesComposition
+
+TEXTS = "BeH", "BeH2+", "H2", "CH3OH", "CO2+", "(13C)O", "e-", "Be"
+
+
+class TestSpeciesComposition(TestCase):
+    def setUp(self):
+        for text in TEXTS:
+            Species.get_or_create_from_text(text)
+
+    def texts(self, species):
+        return sorted(species.values_list("text", flat=True))
+
+    def composition(self):
+        return sorted(
+            SpeciesComposition.objects.values_list("species__text", "element", "count")
+        )
+
+    def test_created(self):
+        methanol = Species.objects.get(text="CH3OH")
+        self.assertEqual(methanol.natoms, 6)
+        self.assertAlmostEqual(methanol.mass, 32.042)
+        self.assertEqual(
+            dict(methanol.composition.values_list("element", "count")),
+            {"C": 1, "H": 4, "O": 1},
+        )
+        # isotopes are counted as their element
+        self.assertEqual(
+            list(
+                SpeciesComposition.objects.filter(species__text="(13C)O")
+                .order_by("element")
+                .values_list("element", "count")
+            ),
+            [("C", 1), ("O", 1)],
+        )
+        electron = Species.objects.get(text="e-")
+        self.assertEqual(electron.natoms, 0)
+        self.assertFalse(electron.composition.exists())
+
+    def test_created_deferred(self):
+        with deferred_markup():
+            species, _ = Species.get_or_create_from_text("NH3")
+        self.assertEqual(species.natoms, 4)
+        self.assertEqual(species.composition.count(), 2)
+
+    def test_containing(self):
+        species = Species.objects.containing("Be", "H")
+        self.assertEqual(self.texts(species), ["BeH", "BeH2+"])
+        self.assertEqual(self.texts(species.natoms_between(max=2)), ["BeH"])
+        self.assertEqual(self.texts(Species.objects.containing(H=2)), ["BeH2+", "H2"])
+        self.assertEqual(
+            self.texts(Species.objects.containing("C", H__gte=2)), ["CH3OH"]
+        )
+        ions = Species.objects.containing("C").exclude(charge=0)
+        self.assertEqual(self.texts(ions), ["CO2+"])
+
+    def test_composed_of(self):
+        self.assertEqual(
+            self.texts(Species.objects.composed_of("Be", "H")),
+            ["Be", "BeH", "BeH2+", "H2", "e-"],
+        )
+        self.assertEqual(
+            self.texts(Species.objects.composed_of("C", "O").natoms_between(min=1)),
+            ["(13C)O", "CO2+"],
+        )
+
+    def test_mass_between(self):
+        self.assertEqual(
+            self.texts(Species.objects.mass_between(9, 12)), ["Be", "BeH", "BeH2+"]
+        )
+        self.assertEqual(self.texts(Species.objects.mass_between(min=40)), ["CO2+"])
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            list(
+                Species.objects.containing("Be", H__lte=2)
+                .composed_of("Be", "H")
+                .mass_between(0, 20)
+            )
+
+    def test_index_composition(self):
+        expected = self.composition()
+        SpeciesComposition.objects.all().delete()
+        Species.objects.update(natoms=None, mass=None)
+        Species.objects.create(text="not a formula", html="")
+
+        report = index_composition(batch_size=3)
+        self.assertEqual(report.indexed, len(TEXTS))
+        self.assertEqual(report.failed, 1)
+        self.assertEqual(report.batches, 3)
+        self.assertEqual(self.composition(), expected)
+        self.assertEqual(Species.objects.get(text="CH3OH").natoms, 6)
+        self.assertEqual(index_composition().indexed, 0)
+
+        # the rebuild replaces the composition rows
+        self.assertEqual(index_composition(rebuild=True).indexed, len(TEXTS))
+        self.assertEqual(self.composition(), expected)
+
+    def test_command(self):
+        Species.objects.update(natoms=None)
+        out = StringIO()
+        call_command("index_composition", "--batch-size", "5", stdout=out)
+        self.assertIn(f"Indexed {len(TEXTS)} rp.Species rows", out.getvalue())
+        self.assertFalse(Species.objects.filter(natoms__isnull=True).exists())
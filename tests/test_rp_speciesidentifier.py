@@ -0,0 +1,94 @@
+from django.db.utils import IntegrityError
+from django.test import TestCase
+
+from rp.models import Species, SpeciesAlias, SpeciesIdentifier, RP
+
+WATER_INCHI = "InChI=1S/H2O/h1H2"
+WATER_INCHIKEY = "XLYOFNOQVPJJNP-UHFFFAOYSA-N"
+METHANOL_INCHIKEY = "OKKJLVBELUTLKV-UHFFFAOYSA-N"
+
+
+class TestSpeciesIdentifier(TestCase):
+    def setUp(self):
+        self.water, _ = Species.get_or_create_from_text("H2O")
+        self.methanol, _ = Species.get_or_create_from_text("CH3OH")
+        for species, kind, value in (
+            (self.water, SpeciesIdentifier.INCHI, WATER_INCHI),
+            (self.water, SpeciesIdentifier.INCHIKEY, WATER_INCHIKEY),
+            (self.water, SpeciesIdentifier.CAS, "7732-18-5"),
+            (self.water, SpeciesIdentifier.SMILES, "O"),
+            (self.methanol, SpeciesIdentifier.INCHIKEY, METHANOL_INCHIKEY),
+            (self.methanol, SpeciesIdentifier.SMILES, "CO"),
+        ):
+            SpeciesIdentifier.objects.create(species=species, kind=kind, value=value)
+
+    def test_parse(self):
+        parse = SpeciesIdentifier.parse
+        self.assertEqual(parse(WATER_INCHI), (SpeciesIdentifier.INCHI, WATER_INCHI))
+        self.assertEqual(parse("1S/H2O/h1H2"), (SpeciesIdentifier.INCHI, WATER_INCHI))
+        self.assertEqual(
+            parse(WATER_INCHIKEY), (SpeciesIdentifier.INCHIKEY, WATER_INCHIKEY)
+        )
+        self.assertEqual(parse("7732-18-5"), (SpeciesIdentifier.CAS, "7732-18-5"))
+        # a wrong check digit
+        self.assertIsNone(parse("7732-18-4"))
+        self.assertIsNone(parse("H2O"))
+        self.assertEqual(parse(("SMILES", "O")), (SpeciesIdentifier.SMILES, "O"))
+        self.assertEqual(
+            parse((SpeciesIdentifier.INCHI, "1S/H2O/h1H2")),
+            (SpeciesIdentifier.INCHI, WATER_INCHI),
+        )
+        # unknown kinds
+        self.assertIsNone(parse(("PubChem", "962")))
+        self.assertIsNone(parse((7, "962")))
+
+    def test_unique(self):
+        with self.assertRaises(IntegrityError):
+            SpeciesIdentifier.objects.create(
+                species=self.methanol, kind=SpeciesIdentifier.SMILES, value="O"
+            )
+
+    def test_resolve(self):
+        identifiers = [
+            WATER_INCHI,
+            "1S/H2O/h1H2",
+            WATER_INCHIKEY,
+            METHANOL_INCHIKEY,
+            "7732-18-5",
+            ("SMILES", "CO"),
+            "VNWKTOKETHGBQD-UHFFFAOYSA-N",
+            "not an identifier",
+        ]
+        # one query per kind
+        with self.assertNumQueries(4):
+            resolved = SpeciesIdentifier.resolve(identifiers)
+        self.assertEqual(
+            {identifier: species.text for identifier, species in resolved.items()},
+            {
+                WATER_INCHI: "H2O",
+                "1S/H2O/h1H2": "H2O",
+                WATER_INCHIKEY: "H2O",
+                METHANOL_INCHIKEY: "CH3OH",
+                "7732-18-5": "H2O",
+                ("SMILES", "CO"): "CH3OH",
+            },
+        )
+
+    def test_resolve_batches(self):
+        with self.assertNumQueries(2):
+            resolved = SpeciesIdentifier.resolve(
+                [WATER_INCHIKEY, METHANOL_INCHIKEY], batch_size=1
+            )
+        self.assertEqual(len(resolved), 2)
+
+    def test_filter_RP_from_text(self):
+        rp, _ = RP.get_or_create_from_text("H2O v=1")
+        self.assertEqual(list(RP.filter_from_text(f"{WATER_INCHIKEY} v=1")), [rp])
+        self.assertEqual(list(RP.filter_from_text("1S/H2O/h1H2 v=1")), [rp])
+        # still resolved through the aliases if not an identifier
+        SpeciesAlias.objects.create(
+            text="InChI=1S/CH4O/c1-2/h2H,1H3", species=self.methanol
+        )
+        rp, _ = RP.get_or_create_from_text("CH3OH")
+        self.assertEqual(list(RP.filter_from_text("InChI=1S/CH4O/c1-2/h2H,1H3")), [rp])
+        self.assertFalse(RP.filter_from_text("InChI=1S/He").exists())
@@ -0,0 +1,79 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from _utils.querybudget import QueryBudgetTestMixin
+from rp.models import Species, SpeciesAlias, RP, State, Tombstone
+from rxn.gc import collect_orphans, orphan_rps, orphan_species
+from rxn.models import Reaction
+
+
+class TestCollectOrphans(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.kept, _ = Reaction.get_or_create_from_text("e- + H2 v=0 -> e- + H2 v=1")
+        self.deleted, _ = Reaction.get_or_create_from_text(
+            "e- + CO2 v=2 -> e- + CO2 v=0;J=1"
+        )
+        # RPs which were never in any reaction, CO having an alias
+        RP.get_or_create_from_text("He 1s2")
+        rp, _ = RP.get_or_create_from_text("CO v=2")
+        SpeciesAlias.objects.create(text="(12C)O", species=rp.species)
+        self.deleted.delete()
+
+    def texts(self, queryset):
+        return sorted(queryset.values_list("text", flat=True))
+
+    def test_orphans(self):
+        self.assertEqual(
+            self.texts(orphan_rps()), ["CO v=2", "CO2 v=0;J=1", "CO2 v=2", "He 1s2"]
+        )
+        self.assertEqual(self.texts(orphan_species()), ["CO2", "He"])
+
+    def test_dry_run(self):
+        n_rps = RP.objects.count()
+        report = collect_orphans(dry_run=True)
+        self.assertEqual(report.counts["rp.RP"], 4)
+        self.assertEqual(report.counts["rp.State"], 5)
+        self.assertEqual(report.counts["rp.Species"], 2)
+        self.assertEqual(report.batches, 0)
+        self.assertEqual(RP.objects.count(), n_rps)
+        self.assertIn("Would delete 4 rp.RP rows", str(report))
+
+    def test_collect(self):
+        n_states = State.objects.count()
+        # a fixed number of queries per batch: the savepoint, the ids, the deletes
+        # of the owned rows and of the batch rows, and the tombstones
+        with self.assertMaxQueries(2 * 7 + 3 + 6 + 3 + 1):
+            with CaptureQueriesContext(connection) as queries:
+                report = collect_orphans(batch_size=2)
+        # the next batches only scan the rows after the previous one
+        selects = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "rp_rp"."id"')
+        ]
+        self.assertEqual(len(selects), 3)
+        self.assertNotIn('"rp_rp"."id" >', selects[0])
+        self.assertIn('"rp_rp"."id" >', selects[1])
+        self.assertEqual(report.counts["rp.RP"], 4)
+        self.assertEqual(report.counts["rp.Species"], 2)
+        self.assertEqual(report.batches, 3)
+        self.assertEqual(self.texts(RP.objects.all()), ["H2 v=0", "H2 v=1", "e-"])
+        self.assertEqual(self.texts(Species.objects.all()), ["CO", "H2", "e-"])
+        self.assertEqual(State.objects.count(), n_states - 5)
+        self.assertEqual(Tombstone.objects.filter(model="rp.rp").count(), 4)
+        self.assertEqual(Tombstone.objects.filter(model="rp.species").count(), 2)
+        self.assertEqual(Reaction.objects.get().text, self.kept.text)
+
+        self.assertEqual(collect_orphans().total, 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("collect_orphans", dry_run=True, stdout=out)
+        self.assertIn("Would delete 2 rp.Species rows", out.getvalue())
+        out = StringIO()
+        call_command("collect_orphans", stdout=out)
+        self.assertIn("Deleted 4 rp.RP rows", out.getvalue())
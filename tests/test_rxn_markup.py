@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from _utils.markup import deferred_markup, markup_deferred
+from rp.models import Species, RP, State
+from rxn.markup import pending_markup, render_pending_markup
+from rxn.models import Reaction
+
+TEXT = "e- + CO2 v=2 -> e- + CO2 v=0;J=1"
+
+
+class TestDeferredMarkup(TestCase):
+    def markup(self):
+        return {
+            "species": sorted(Species.objects.values_list("text", "html")),
+            "rps": sorted(RP.objects.values_list("text", "html")),
+            "states": sorted(State.objects.values_list("text", "html")),
+            "reactions": list(Reaction.objects.values_list("text", "html", "latex")),
+        }
+
+    def setUp(self):
+        # the markup rendered immediately, for the comparison
+        reaction, _ = Reaction.get_or_create_from_text(TEXT)
+        self.expected = self.markup()
+        reaction.delete()
+        RP.objects.all().delete()
+        Species.objects.all().delete()
+
+    def create_deferred(self):
+        with deferred_markup():
+            self.assertTrue(markup_deferred())
+            reaction, _ = Reaction.get_or_create_from_text(TEXT)
+        self.assertFalse(markup_deferred())
+        return reaction
+
+    def test_deferred(self):
+        reaction = self.create_deferred()
+        self.assertTrue(reaction.markup_pending)
+        self.assertEqual(reaction.html, "")
+        self.assertEqual(reaction.text, self.expected["reactions"][0][0])
+        self.assertEqual(
+            pending_markup(),
+            {"rp.Species": 2, "rp.RP": 3, "rp.State": 3, "rxn.Reaction": 1},
+        )
+        self.assertFalse(RP.objects.filter(markup_pending=False).exists())
+        self.assertEqual(
+            sorted(RP.objects.values_list("text", flat=True)),
+            [text for text, _ in self.expected["rps"]],
+        )
+
+    def test_render(self):
+        self.create_deferred()
+        report = render_pending_markup(batch_size=2, processes=1)
+        self.assertEqual(report.rendered["rp.RP"], 3)
+        self.assertEqual(report.batches, 1 + 2 + 2 + 1)
+        self.assertEqual(self.markup(), self.expected)
+        self.assertEqual(set(pending_markup().values()), {0})
+        self.assertEqual(render_pending_markup(processes=1).batches, 0)
+
+    def test_render_pool(self):
+        self.create_deferred()
+        render_pending_markup(processes=2)
+        self.assertEqual(self.markup(), self.expected)
+
+    def test_resume(self):
+        self.create_deferred()
+        # a backfill interrupted after the species and a reaction created since
+        Species.objects.update(markup_pending=False, html="x")
+        with deferred_markup():
+            Reaction.get_or_create_from_text("e- + CO2 -> 2e- + CO2+")
+        report = render_pending_markup(processes=1)
+        self.assertEqual(report.rendered["rp.Species"], 1)
+        self.assertEqual(report.rendered["rxn.Reaction"], 2)
+
+    def test_failed(self):
+        self.create_deferred()
+        Reaction.objects.update(text="not a reaction")
+        report = render_pending_markup(processes=1)
+        self.assertEqual(report.failed["rxn.Reaction"], 1)
+        self.assertEqual(pending_markup()["rxn.Reaction"], 1)
+
+    def test_command(self):
+        self.create_deferred()
+        out = StringIO()
+        call_command("render_markup", status=True, stdout=out)
+        self.assertIn("rp.State: 3 pending", out.getvalue())
+        out = StringIO()
+        call_command("render_markup", processes=1, stdout=out)
+        self.assertIn("Rendered 1 rxn.Reaction rows", out.getvalue())
@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from _utils.querybudget import QueryBudgetTestMixin
+from rp.models import Species, SpeciesAlias, RP, State, Tombstone
+from rxn.merge import merge_species
+from rxn.models import ProcessType, Reaction, ReactantList
+from .models import MyReactionDataSet
+
+
+class TestMergeSpecies(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        ProcessType.objects.create(abbreviation="EEX", description="")
+        self.kept, _ = Reaction.get_or_create_from_text(
+            "e- + CH3OH v=1 -> e- + CH3OH", process_type_abbreviations=("EEX",)
+        )
+        # the same reaction, once CH4O is merged into CH3OH
+        self.duplicate, _ = Reaction.get_or_create_from_text(
+            "e- + CH4O v=1 -> e- + CH4O", process_type_abbreviations=("EEX",)
+        )
+        # a different reaction because of its process types
+        self.distinct, _ = Reaction.get_or_create_from_text(
+            "e- + CH4O v=1 -> e- + CH4O"
+        )
+        self.abstraction, _ = Reaction.get_or_create_from_text("CH4O + H -> H2 + CH3O")
+        self.dataset = MyReactionDataSet.objects.create(reaction=self.duplicate)
+        self.target = Species.objects.get(text="CH3OH")
+        self.source = Species.objects.get(text="CH4O")
+        SpeciesAlias.objects.create(text="methanol", species=self.source)
+
+    def texts(self, queryset):
+        return sorted(queryset.values_list("text", flat=True))
+
+    def test_merge(self):
+        n_states = State.objects.count()
+        report = merge_species(self.target, [self.source])
+
+        self.assertFalse(Species.objects.filter(text="CH4O").exists())
+        self.assertEqual(
+            self.texts(RP.objects.filter(species=self.target)),
+            ["CH3OH", "CH3OH v=1"],
+        )
+        self.assertEqual(RP.objects.get(text="CH3OH v=1").html, "CH<sub>3</sub>OH v=1")
+        self.assertEqual(State.objects.count(), n_states - 1)
+        self.assertEqual(
+            self.texts(SpeciesAlias.objects.filter(species=self.target)),
+            ["CH4O", "methanol"],
+        )
+
+        self.assertFalse(Reaction.objects.filter(pk=self.duplicate.pk).exists())
+        self.assertFalse(
+            ReactantList.objects.filter(reaction_id=self.duplicate.pk).exists()
+        )
+        self.assertFalse(
+            Reaction.process_types.through.objects.filter(
+                reaction_id=self.duplicate.pk
+            ).exists()
+        )
+        self.dataset.refresh_from_db()
+        self.assertEqual(self.dataset.reaction_id, self.kept.pk)
+        self.distinct.refresh_from_db()
+        self.assertEqual(self.distinct.text, self.kept.text)
+        self.assertEqual(self.distinct.html, Reaction.objects.get(pk=self.kept.pk).html)
+        self.abstraction.refresh_from_db()
+        self.assertEqual(self.abstraction.text, "CH3OH + H → H2 + CH3O")
+        self.assertEqual(self.abstraction.ordered_text, "CH3OH + H → CH3O + H2")
+        self.assertIn("CH<sub>3</sub>OH", self.abstraction.html)
+        self.assertEqual(
+            self.texts(RP.objects.filter(reactants_related=self.abstraction)),
+            ["CH3OH", "H"],
+        )
+        self.assertEqual(
+            ReactantList.objects.filter(rp__species=self.target).count(), 3
+        )
+
+        self.assertEqual(report.repointed["rp.RP"], 2)
+        self.assertEqual(report.repointed["rp.SpeciesAlias"], 1)
+        self.assertEqual(report.repointed["tests.MyReactionDataSet"], 1)
+        self.assertEqual(report.deleted["rp.RP"], 2)
+        self.assertEqual(report.deleted["rp.Species"], 1)
+        self.assertEqual(report.deleted["rxn.Reaction"], 1)
+        self.assertEqual(report.deleted["rxn.ReactantList"], 2)
+        self.assertEqual(report.rebuilt["rxn.Reaction"], 3)
+        self.assertEqual(Tombstone.objects.filter(model="rp.rp").count(), 2)
+        self.assertEqual(Tombstone.objects.filter(model="rxn.reaction").count(), 1)
+
+    def test_query_budget(self):
+        # a fixed number of statements per source species, relation and batch,
+        # the 3 reactions to rebuild taking 2 batches of 2
+        with self.assertMaxQueries(38):
+            merge_species(self.target.pk, [self.source.pk], batch_size=2)
+
+    def test_dry_run(self):
+        n_rps = RP.objects.count()
+        report = merge_species(self.target, [self.source], dry_run=True)
+        self.assertEqual(report.deleted["rp.RP"], 2)
+        self.assertEqual(RP.objects.count(), n_rps)
+        self.assertTrue(Species.objects.filter(text="CH4O").exists())
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            merge_species(self.target, [self.target])
+        cation, _ = Species.get_or_create_from_text("CH4O+")
+        with self.assertRaises(ValueError):
+            merge_species(self.target, [cation])
+
+    def test_command(self):
+        out = StringIO()
+        call_command("merge_species", "CH3OH", "CH4O", stdout=out)
+        self.assertIn("Deleted 1 rp.Species rows", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("merge_species", "CH3OH", "CH4O")
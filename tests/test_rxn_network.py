@@ -0,0 +1,133 @@
+from django.test import TestCase
+
+from _utils.querybudget import QueryBudgetTestMixin
+from rp.models import Species, RP
+from rxn.models import Reaction, ProcessType
+from rxn.network import ReactionNetwork, Pathway
+
+
+class TestReactionNetwork(QueryBudgetTestMixin, TestCase):
+    texts = [
+        "e- + H2 -> H2+ + 2e-",
+        "H2+ + H2 -> H3+ + H",
+        "e- + H3+ -> H2 + H",
+        "e- + H2 -> 2H + e-",
+        "H + H+ -> H2+",
+        "e- + H2+ -> H+ + H + e-",
+    ]
+
+    def setUp(self):
+        self.reactions = [
+            Reaction.get_or_create_from_text(text)[0] for text in self.texts
+        ]
+        self.species = {s.text: s.id for s in Species.objects.all()}
+        self.e = self.species["e-"]
+
+    def rids(self, *indices):
+        return tuple(self.reactions[i - 1].id for i in indices)
+
+    def sids(self, *texts):
+        return tuple(self.species[text] for text in texts)
+
+    def test_load(self):
+        with self.assertMaxQueries(2):
+            network = ReactionNetwork.load()
+        self.assertEqual(network.reaction_ids.size, 6)
+        self.assertEqual(network.node_ids.size, 6)
+        self.assertIn("6 nodes, 6 reactions", repr(network))
+        with self.assertRaises(KeyError):
+            network.node_index(0)
+        with self.assertRaises(ValueError):
+            ReactionNetwork(level="state")
+
+    def test_distances(self):
+        network = ReactionNetwork.load()
+        H2, H = self.species["H2"], self.species["H"]
+        # the co-reactants do not limit the pathways
+        distances = network.distances(H, ubiquitous=[self.e])
+        self.assertEqual(
+            distances,
+            dict(zip(self.sids("H", "H2+", "H3+", "H+", "H2"), [0, 1, 2, 2, 3])),
+        )
+        distances = network.distances(H2, ubiquitous=[self.e])
+        self.assertEqual(distances[self.species["H3+"]], 1)
+        self.assertEqual(distances[self.species["H+"]], 2)
+        self.assertNotIn(self.e, distances)
+        self.assertEqual(network.distances(H2, max_steps=1)[self.species["H2+"]], 1)
+        # without the ubiquitous electrons, everything is one step from e-
+        self.assertEqual(set(network.distances(self.e, max_steps=1).values()), {0, 1})
+
+    def test_pathways(self):
+        network = ReactionNetwork.load()
+        H2, H3p = self.species["H2"], self.species["H3+"]
+        with self.assertNumQueries(0):
+            pathways = list(network.pathways(H2, H3p, max_steps=3, ubiquitous=[self.e]))
+        self.assertEqual(pathways[0], Pathway(self.sids("H2", "H3+"), self.rids(2)))
+        self.assertEqual(
+            pathways[1], Pathway(self.sids("H2", "H2+", "H3+"), self.rids(1, 2))
+        )
+        self.assertEqual(
+            set(pathways[2:]),
+            {
+                Pathway(self.sids("H2", "H", "H2+", "H3+"), self.rids(4, 5, 2)),
+                Pathway(self.sids("H2", "H", "H2+", "H3+"), self.rids(2, 5, 2)),
+            },
+        )
+        self.assertEqual(
+            len(list(network.pathways(H2, H3p, max_steps=3, k=2, ubiquitous=[self.e]))),
+            2,
+        )
+        self.assertEqual(
+            list(network.pathways(H3p, self.species["H+"], max_steps=1)), []
+        )
+
+    def test_closure(self):
+        network = ReactionNetwork.load()
+        mechanism = network.closure([self.species["H2"]], ubiquitous=[self.e])
+        self.assertEqual(set(mechanism.reactions), set(self.rids(1, 2, 3, 4, 5, 6)))
+        self.assertNotIn(self.e, mechanism.nodes)
+
+        mechanism = network.closure(self.sids("H"), ubiquitous=[self.e])
+        self.assertEqual(mechanism, ([self.species["H"]], []))
+        mechanism = network.closure(self.sids("H", "H+"), ubiquitous=[self.e])
+        self.assertEqual(set(mechanism.reactions), set(self.rids(5, 6)))
+        self.assertEqual(set(mechanism.nodes), set(self.sids("H", "H+", "H2+")))
+        # the electrons are needed by the reaction 6
+        mechanism = network.closure(self.sids("H", "H+"))
+        self.assertEqual(mechanism.reactions, list(self.rids(5)))
+
+    def test_rp_level(self):
+        Reaction.get_or_create_from_text("e- + H2 v=1 -> e- + H2 v=0")
+        network = ReactionNetwork.load(level="rp")
+        self.assertEqual(network.node_ids.size, RP.objects.count())
+        rp = {rp.text: rp.id for rp in RP.objects.all()}
+        self.assertEqual(
+            network.distances(rp["H2 v=1"], ubiquitous=[rp["e-"]]),
+            {rp["H2 v=1"]: 0, rp["H2 v=0"]: 1},
+        )
+
+    def test_refresh(self):
+        network = ReactionNetwork.load()
+        self.assertEqual(network.refresh(), 0)
+        reaction, _ = Reaction.get_or_create_from_text("H3+ + e- -> H+ + H2 + e-")
+        with self.assertMaxQueries(2):
+            self.assertEqual(network.refresh(), 1)
+        self.assertEqual(network.reaction_ids[-1], reaction.id)
+        self.assertEqual(
+            network.distances(self.species["H3+"], ubiquitous=[self.e])[
+                self.species["H+"]
+            ],
+            1,
+        )
+        self.assertEqual(network.refresh([reaction.id, self.reactions[0].id]), 0)
+
+    def test_queryset(self):
+        ProcessType.objects.create(abbreviation="EIN", description="")
+        reaction, _ = Reaction.get_or_create_from_text(
+            self.texts[0], process_type_abbreviations=("EIN",)
+        )
+        network = ReactionNetwork.load(
+            queryset=Reaction.objects.filter(process_types__abbreviation="EIN")
+        )
+        self.assertEqual(network.reaction_ids.tolist(), [reaction.id])
+        self.assertEqual(set(network.node_ids), set(self.sids("e-", "H2", "H2+")))
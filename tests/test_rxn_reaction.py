@@ -204,6 +204,16 @@ class TestReaction(TestCase):
         self.assertEqual(list(r.process_types.all()), [self.pt_oth])
         self.assertEqual(list(self.pt_oth.reaction_set.all()), [r])
 
+    def test_unknown_process_types(self):
+        with self.assertRaisesMessage(
+            ProcessType.DoesNotExist, "Unknown process types: AAA, ZZZ"
+        ):
+            Reaction.get_or_create_from_text(
+                "H + H -> H2", process_type_abbreviations=("ZZZ", "HDS", "AAA")
+            )
+        # without any partial reaction left
+        self.assertFalse(Reaction.objects.exists())
+
     def test_comment(self):
         r, _ = Reaction.get_or_create_from_text("H + H -> H + H", comment="foo")
         self.assertEqual(r.comment, "foo")
@@ -237,3 +247,23 @@ class TestReaction(TestCase):
             r.latex,
             r"\mathrm{e}^- + \mathrm{Be}\mathrm{H}^{+} \; X{}^{1}\Sigma^+ \; v=0 \rightarrow \mathrm{Be}\mathrm{H}^{+} \; X{}^{1}\Sigma^+ \; v=3 + \mathrm{e}^-",
         )
+
+    def test_ids_from_texts(self):
+        r1, _ = Reaction.get_or_create_from_text("e- + H2 -> H2+ + 2e-")
+        r2, _ = Reaction.get_or_create_from_text(
+            "e- + H2 -> H2+ + 2e-", process_type_abbreviations=("HDS", "ENI")
+        )
+        r3, _ = Reaction.get_or_create_from_text(
+            "e- + H2 -> H2+ + 2e-", comment="comment"
+        )
+        keys = [
+            ("H2 + e- -> H2+ + e- + e-", "", ()),
+            ("e- + H2 -> H2+ + 2e-", "", ("ENI", "HDS")),
+            ("e- + H2 -> H2+ + 2e-", "comment", ()),
+            ("e- + H2 -> H2+ + 2e-", "other comment", ()),
+            ("e- + H2 -> H + H + e-", "", ()),
+        ]
+        self.assertEqual(
+            Reaction.ids_from_texts(keys),
+            {keys[0]: r1.id, keys[1]: r2.id, keys[2]: r3.id},
+        )
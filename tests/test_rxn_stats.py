@@ -0,0 +1,180 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+
+from rp.models import Species, RP
+from rxn.models import ProcessType, Reaction, SpeciesStats
+from rxn.stats import (
+    connect_signals,
+    disconnect_signals,
+    rebuild_species_stats,
+    refresh_species_stats,
+)
+from .models import MyReactionDataSet
+
+
+def counts(stats):
+    return (
+        stats.reactions,
+        stats.reactant_reactions,
+        stats.product_reactions,
+        stats.datasets,
+        stats.reactant_datasets,
+        stats.product_datasets,
+    )
+
+
+class TestSpeciesStats(TestCase):
+    def setUp(self):
+        for abbreviation in "EEX", "EIN":
+            ProcessType.objects.create(abbreviation=abbreviation, description="")
+        self.r1, _ = Reaction.get_or_create_from_text(
+            "e- + H2 v=0 -> e- + H2 v=1", process_type_abbreviations=("EEX",)
+        )
+        self.r2, _ = Reaction.get_or_create_from_text(
+            "e- + H2 v=0 -> 2e- + H2+", process_type_abbreviations=("EIN",)
+        )
+        self.r3, _ = Reaction.get_or_create_from_text("H2+ + H2 -> H3+ + H")
+        for reaction in self.r1, self.r1, self.r2:
+            MyReactionDataSet.objects.create(reaction=reaction)
+
+    def get(self, text, rp=None, process_type=None):
+        return SpeciesStats.objects.get(
+            species__text=text,
+            rp__text=rp,
+            process_type__abbreviation=process_type,
+        )
+
+    def test_rebuild(self):
+        with self.assertNumQueries(1 + 1 + 3 + 3 + 4):
+            # stale rows, species ids, through tables and process types, the
+            # datasets of the three test models, and the delete and insert within
+            # a savepoint
+            rebuild_species_stats()
+        # H2 is a reactant in all three, but a product in r1 only
+        self.assertEqual(counts(self.get("H2")), (3, 3, 1, 3, 3, 2))
+        self.assertEqual(counts(self.get("H2", "H2 v=0")), (2, 2, 0, 3, 3, 0))
+        self.assertEqual(counts(self.get("H2", "H2 v=1")), (1, 0, 1, 2, 0, 2))
+        self.assertEqual(counts(self.get("H2", process_type="EIN")), (1, 1, 0, 1, 1, 0))
+        self.assertEqual(counts(self.get("e-")), (2, 2, 2, 3, 3, 3))
+        self.assertEqual(counts(self.get("H3+")), (1, 0, 1, 0, 0, 0))
+        self.assertFalse(
+            SpeciesStats.objects.filter(
+                species__text="H3+", process_type__isnull=False
+            ).exists()
+        )
+        self.assertEqual(str(self.get("H3+")), "H3+: 1 reactions")
+
+        # idempotent
+        n = SpeciesStats.objects.count()
+        self.assertEqual(rebuild_species_stats(batch_size=2), n)
+        self.assertEqual(SpeciesStats.objects.count(), n)
+
+    def test_refresh(self):
+        h2 = Species.objects.get(text="H2")
+        # H2 and H2 v=0 (all, EEX and EIN), H2 v=1 (all and EEX) and the RP H2
+        self.assertEqual(refresh_species_stats([h2.id]), 9)
+        self.assertEqual(
+            set(SpeciesStats.objects.values_list("species_id", flat=True)), {h2.id}
+        )
+
+    def test_command(self):
+        stderr = StringIO()
+        call_command("rebuild_species_stats", stderr=stderr)
+        self.assertIn(f"Wrote {SpeciesStats.objects.count()}", stderr.getvalue())
+
+
+class TestSpeciesStatsMaintenance(TransactionTestCase):
+    # the statistics are refreshed on the real commits of the transactions
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        connect_signals()
+        self.addCleanup(disconnect_signals)
+        ProcessType.objects.create(abbreviation="EIN", description="")
+
+    def get(self, text, using="default", **kwargs):
+        return SpeciesStats.objects.using(using).get(
+            species__text=text, rp=None, process_type=None, **kwargs
+        )
+
+    def test_reactions(self):
+        reaction, _ = Reaction.get_or_create_from_text("e- + H2 -> 2e- + H2+")
+        self.assertEqual(counts(self.get("H2")), (1, 1, 0, 0, 0, 0))
+
+        with transaction.atomic():
+            reaction.process_types.add(ProcessType.objects.get())
+            MyReactionDataSet.objects.create(reaction=reaction)
+        self.assertEqual(counts(self.get("H2+")), (1, 0, 1, 1, 0, 1))
+        stats = SpeciesStats.objects.get(
+            species__text="H2+", rp=None, process_type__isnull=False
+        )
+        self.assertEqual(stats.process_type.abbreviation, "EIN")
+
+        MyReactionDataSet.bulk_ingest([{"reaction": reaction.id}] * 2)
+        self.assertEqual(self.get("e-").datasets, 3)
+
+        reaction.delete()
+        self.assertFalse(SpeciesStats.objects.exists())
+
+    def test_single_refresh(self):
+        connection = transaction.get_connection()
+        with transaction.atomic():
+            for text in "e- + H2 v=1 -> e- + H2 v=0", "e- + H2 v=2 -> e- + H2 v=0":
+                reaction, _ = Reaction.get_or_create_from_text(text)
+                MyReactionDataSet.objects.create(reaction=reaction)
+            # a single callback for all the changes of the transaction
+            self.assertEqual(len(connection.run_on_commit), 1)
+        self.assertEqual(self.get("H2").datasets, 2)
+
+        # the stale ids of a rolled-back savepoint are refreshed on the next commit
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    MyReactionDataSet.objects.create(reaction=reaction)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertEqual(connection.run_on_commit, [])
+            MyReactionDataSet.objects.create(reaction=reaction)
+            self.assertEqual(len(connection.run_on_commit), 1)
+        self.assertEqual(self.get("H2").datasets, 3)
+
+    def test_rp_deleted(self):
+        with transaction.atomic():
+            Reaction.get_or_create_from_text("e- + H2 v=1 -> e- + H2 v=0")
+            Reaction.get_or_create_from_text("e- + H2 v=2 -> e- + H2 v=0")
+        self.assertEqual(self.get("H2").reactant_reactions, 2)
+        RP.objects.get(text="H2 v=2").delete()
+        self.assertEqual(self.get("H2").reactant_reactions, 1)
+        self.assertFalse(SpeciesStats.objects.filter(rp__text="H2 v=2").exists())
+
+    def test_dataset_repointed(self):
+        with transaction.atomic():
+            reaction, _ = Reaction.get_or_create_from_text("e- + H2 -> 2e- + H2+")
+            other, _ = Reaction.get_or_create_from_text("e- + He -> 2e- + He+")
+            dataset = MyReactionDataSet.objects.create(reaction=reaction)
+        self.assertEqual((self.get("H2").datasets, self.get("He").datasets), (1, 0))
+        dataset.reaction = other
+        dataset.save()
+        self.assertEqual((self.get("H2").datasets, self.get("He").datasets), (0, 1))
+        # the UPDATE only, when the reaction is not among the saved fields
+        dataset.json_data = "{}"
+        with self.assertNumQueries(1):
+            dataset.save(update_fields=["json_data"])
+
+    def test_other_database(self):
+        with transaction.atomic(using="replica"):
+            Reaction.get_or_create_from_text("e- + H2 -> 2e- + H2+", using="replica")
+            self.assertEqual(transaction.get_connection().run_on_commit, [])
+        self.assertEqual(counts(self.get("H2", using="replica")), (1, 1, 0, 0, 0, 0))
+        self.assertFalse(SpeciesStats.objects.using("default").exists())
+
+    def test_disconnected(self):
+        disconnect_signals()
+        with transaction.atomic():
+            Reaction.get_or_create_from_text("e- + H2 -> 2e- + H2+")
+            self.assertEqual(transaction.get_connection().run_on_commit, [])
+        self.assertFalse(SpeciesStats.objects.exists())
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from rp.models import Species, RP
+from rxn.models import Reaction
+from rxn.validation import validate_reactions, _read_only, ERROR, NON_STRICT, STRICT
+
+LINES = [
+    "# a comment",
+    "e- + H2 v=0 -> e- + H2 v=1",
+    "",
+    "e- + H2 v=0 -> 2e- + H2+",
+    "e- + H2 -> H2+",
+    "e- + H2 -> H3+ + e-",
+    "e- + Xx2 -> e- + Xx2",
+    "H2+ + H2 -> H3+ + H",
+    "e- + H2 v=0 -> e- + H2 v=1",
+]
+
+
+class TestValidateReactions(TestCase):
+    def setUp(self):
+        Reaction.get_or_create_from_text("e- + H2 v=0 -> e- + H2 v=1")
+        self.counts = [model.objects.count() for model in (Species, RP, Reaction)]
+
+    def test_validate(self):
+        # the species, RPs and reactions looked up in a single batch each
+        with self.assertNumQueries(3):
+            report = validate_reactions(LINES, processes=1)
+        self.assertEqual(report.lines, 7)
+        self.assertEqual(report.counts, {STRICT: 4, NON_STRICT: 2, ERROR: 1})
+        self.assertEqual(
+            [(issue.line, issue.status) for issue in report.issues],
+            [(5, NON_STRICT), (6, NON_STRICT), (7, ERROR)],
+        )
+        self.assertIn("Charge", report.issues[0].message)
+        self.assertIn("Stoichiometry", report.issues[1].message)
+        self.assertEqual(report.new_species, {"H2+": 4, "H3+": 6, "H": 8})
+        self.assertEqual(report.new_rps, {"H2+": 4, "H2": 5, "H3+": 6, "H": 8})
+        self.assertEqual(list(report.new_reactions.values()), [4, 5, 6, 8])
+        self.assertEqual(report.existing_reactions, 1)
+        self.assertEqual(
+            self.counts, [model.objects.count() for model in (Species, RP, Reaction)]
+        )
+        self.assertIn("7 reactions: 4 strict", str(report))
+
+    def test_chunks(self):
+        report = validate_reactions(LINES, processes=1, chunk_size=2, batch_size=1)
+        self.assertEqual(report.new_species, {"H2+": 4, "H3+": 6, "H": 8})
+        self.assertEqual(report.existing_reactions, 1)
+
+    def test_pool(self):
+        report = validate_reactions(LINES * 100, processes=2, chunk_size=300)
+        self.assertEqual(report.lines, 700)
+        self.assertEqual(report.counts[ERROR], 100)
+        self.assertEqual(report.new_species, {"H2+": 4, "H3+": 6, "H": 8})
+
+    def test_read_only(self):
+        with self.assertRaises(RuntimeError):
+            with connection.execute_wrapper(_read_only):
+                Species.objects.create(text="X", html="X")
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "reactions.txt")
+            with open(path, "w", encoding="utf-8") as fo:
+                fo.write("\n".join(LINES))
+            output = os.path.join(tmpdir, "report.json")
+            out, err = StringIO(), StringIO()
+            call_command(
+                "validate_reactions",
+                path,
+                processes=1,
+                output=output,
+                stdout=out,
+                stderr=err,
+            )
+            with open(output, encoding="utf-8") as fi:
+                report = json.load(fi)
+        self.assertEqual(report["counts"][ERROR], 1)
+        self.assertEqual(report["issues"][2]["text"], "e- + Xx2 -> e- + Xx2")
+        self.assertIn("7: error: e- + Xx2", out.getvalue())
+        self.assertIn("3 new species", err.getvalue())
@@ -0,0 +1,92 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+
+from _utils.fields import (
+    Float64ArrayField,
+    decode_array,
+    encode_array,
+    json_to_array_migration,
+)
+from rxn.models import Reaction
+from .models import MyArrayDataSet
+
+
+class TestFloat64ArrayField(TestCase):
+    def setUp(self):
+        self.reaction, _ = Reaction.get_or_create_from_text("e- + H2 -> H2+ + 2e-")
+        self.table = np.array([[1.0, 10.0, 100.0], [1e-20, 2.5e-20, np.nan]])
+
+    def test_encode_decode(self):
+        for compress in False, True:
+            blob = encode_array(self.table, compress=compress)
+            np.testing.assert_array_equal(decode_array(blob), self.table)
+        # the float64 values follow a header of 5 + 4 * ndim bytes:
+        self.assertEqual(len(encode_array(self.table)), 5 + 8 + 6 * 8)
+        self.assertEqual(decode_array(encode_array([])).shape, (0,))
+        self.assertEqual(decode_array(encode_array(3.0)).shape, ())
+        with self.assertRaises(ValueError):
+            decode_array(b"XX\x01\x00\x00")
+
+    def test_zero_copy(self):
+        blob = encode_array(self.table)
+        array = decode_array(blob)
+        self.assertFalse(array.flags.owndata)
+        self.assertFalse(array.flags.writeable)
+
+    def test_compressed_is_smaller(self):
+        steps = np.arange(1000) // 100 * 0.5
+        self.assertLess(
+            len(encode_array(steps, compress=True)), len(encode_array(steps)) / 2
+        )
+
+    def test_save_and_load(self):
+        MyArrayDataSet.objects.create(
+            reaction=self.reaction,
+            data=self.table,
+            compressed_data=self.table[0].tolist(),
+        )
+        ds = MyArrayDataSet.objects.get()
+        self.assertIsInstance(ds.data, np.ndarray)
+        np.testing.assert_array_equal(ds.data, self.table)
+        np.testing.assert_array_equal(ds.compressed_data, self.table[0])
+        (data,) = MyArrayDataSet.objects.values_list("data", flat=True)
+        self.assertEqual(data.dtype, np.float64)
+
+        MyArrayDataSet.objects.create(reaction=self.reaction)
+        self.assertIsNone(MyArrayDataSet.objects.last().data)
+
+    def test_deconstruct(self):
+        _, path, _, kwargs = Float64ArrayField(compress=True).deconstruct()
+        self.assertEqual(path, "_utils.fields.Float64ArrayField")
+        self.assertEqual(kwargs["compress"], True)
+
+    def test_json_to_array_migration(self):
+        for i in range(3):
+            MyArrayDataSet.objects.create(
+                reaction=self.reaction,
+                json_data=json.dumps({"values": [[i, 1.0], [2.0, 3.0]]}),
+            )
+        MyArrayDataSet.objects.create(reaction=self.reaction)
+        operation = json_to_array_migration(
+            "tests", "MyArrayDataSet", "json_data", "data", key="values"
+        )
+        schema_editor = SimpleNamespace(connection=connection)
+        operation.code(apps, schema_editor)
+        arrays = list(
+            MyArrayDataSet.objects.order_by("id").values_list("data", flat=True)
+        )
+        for i in range(3):
+            np.testing.assert_array_equal(arrays[i], [[i, 1.0], [2.0, 3.0]])
+        self.assertIsNone(arrays[3])
+
+        MyArrayDataSet.objects.update(json_data=None)
+        operation.reverse_code(apps, schema_editor)
+        self.assertEqual(
+            json.loads(MyArrayDataSet.objects.order_by("id")[1].json_data),
+            {"values": [[1.0, 1.0], [2.0, 3.0]]},
+        )
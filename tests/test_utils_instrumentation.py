@@ -0,0 +1,62 @@
+from django.test import TestCase, override_settings
+
+from _utils.instrumentation import collect_stats, stats, LATENCY_BUCKETS
+from rp.models import Species, RP
+from rxn.models import Reaction
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        stats.reset()
+
+    def test_disabled_by_default(self):
+        RP.get_or_create_from_text("H2+ v=1")
+        self.assertEqual(len(stats), 0)
+
+    def test_collect_stats(self):
+        with collect_stats() as collected:
+            Species.get_or_create_from_text("H2")
+            Species.get_or_create_from_text("H2")
+            with self.assertRaises(Species.DoesNotExist):
+                Species.get_from_text("He")
+
+        species_stats = collected["Species.get_or_create_from_text"]
+        self.assertEqual(species_stats.calls, 2)
+        self.assertEqual(species_stats.errors, 0)
+        # one lookup + two inserts (the species and its composition) for the first
+        # call, one lookup for the second
+        self.assertEqual(species_stats.queries, 4)
+        self.assertGreater(species_stats.parse_time, 0)
+        self.assertLessEqual(species_stats.parse_time, species_stats.total_time)
+        self.assertEqual(sum(species_stats.histogram), 2)
+        self.assertEqual(len(species_stats.histogram), len(LATENCY_BUCKETS) + 1)
+
+        self.assertEqual(collected["Species.get_from_text"].errors, 1)
+        # nothing leaks into the process-wide stats
+        self.assertEqual(len(stats), 0)
+
+    def test_nested_calls_are_inclusive(self):
+        with collect_stats() as collected:
+            Reaction.get_or_create_from_text("e- + H2 -> 2e- + H2+")
+        reaction_stats = collected["Reaction.get_or_create_from_text"]
+        rp_stats = collected["RP.get_or_create_from_text"]
+        # one call per reactant and product term: e-, H2, H2+ and 2e-
+        self.assertEqual(rp_stats.calls, 4)
+        self.assertEqual(collected["Reaction.get_from_text"].calls, 1)
+        self.assertGreater(reaction_stats.queries, rp_stats.queries)
+        self.assertGreaterEqual(reaction_stats.parse_time, rp_stats.parse_time)
+
+    def test_as_dict(self):
+        with collect_stats() as collected:
+            RP.filter_from_text("H2")
+        d = collected.as_dict()
+        self.assertEqual(list(d), ["RP.filter_from_text"])
+        self.assertEqual(d["RP.filter_from_text"]["calls"], 1)
+        self.assertEqual(sum(d["RP.filter_from_text"]["histogram"].values()), 1)
+
+    @override_settings(VALEM_INSTRUMENTATION=True)
+    def test_global_stats(self):
+        Species.get_or_create_from_text("H2")
+        self.assertEqual(stats["Species.get_or_create_from_text"].calls, 1)
+        stats.reset()
+        self.assertNotIn("Species.get_or_create_from_text", stats)
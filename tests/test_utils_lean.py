@@ -0,0 +1,53 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rp.models import Species, RP, State
+from rxn.models import Reaction
+
+
+class TestLeanQuerySet(TestCase):
+    def setUp(self):
+        self.reaction, _ = Reaction.get_or_create_from_text(
+            "e- + H2 v=0 -> e- + H2 v=1"
+        )
+
+    def sql(self, queryset):
+        with CaptureQueriesContext(connection) as queries:
+            list(queryset)
+        return queries[0]["sql"]
+
+    def test_lean(self):
+        for model in Species, RP, State, Reaction:
+            self.assertIn('"html"', self.sql(model.objects.all()))
+            self.assertNotIn('"html"', self.sql(model.objects.lean()))
+        sql = self.sql(Reaction.objects.lean())
+        self.assertNotIn('"latex"', sql)
+        self.assertIn('"ordered_text"', sql)
+
+    def test_lean_related(self):
+        sql = self.sql(RP.objects.select_related("species").lean("species"))
+        self.assertNotIn('"html"', sql)
+        self.assertIn('"rp_species"."charge"', sql)
+
+    def test_deferred_fields_load_on_access(self):
+        reaction = Reaction.objects.lean().get()
+        with self.assertNumQueries(1):
+            self.assertEqual(reaction.html, self.reaction.html)
+
+    def test_keyset_page(self):
+        page = Reaction.objects.lean().keyset_page(per_page=1)
+        self.assertEqual([r.pk for r in page], [self.reaction.pk])
+
+    def test_internal_lookups(self):
+        with CaptureQueriesContext(connection) as queries:
+            RP.get_or_create_from_text("H2 v=0", lean=True)
+            Reaction.get_or_create_from_text("e- + H2 v=0 -> e- + H2 v=2")
+        lookups = [
+            q["sql"]
+            for q in queries
+            if q["sql"].startswith("SELECT") and '"rxn_reaction"."id" =' not in q["sql"]
+        ]
+        self.assertTrue(lookups)
+        for sql in lookups:
+            self.assertNotIn('"html"', sql)
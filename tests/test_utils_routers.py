@@ -0,0 +1,108 @@
+from django.db import router, transaction
+from django.test import TransactionTestCase, override_settings
+
+from _utils.routers import ReplicaRouter, lookup_databases, pin_primary
+from rp.models import Species, RP
+from rxn.models import Reaction
+from tests.models import MyReactionDataSet
+
+TEXT = "e- + H2 v=0 -> e- + H2 v=1"
+
+
+@override_settings(
+    DATABASE_ROUTERS=["_utils.routers.ReplicaRouter"],
+    VALEM_REPLICA_DATABASES=["replica"],
+)
+class TestReplicaRouter(TransactionTestCase):
+    # the replica is a separate database, never synchronised with the primary
+    databases = {"default", "replica"}
+
+    def test_routing(self):
+        self.assertEqual(router.db_for_read(Species), "replica")
+        self.assertEqual(router.db_for_write(Species), "default")
+        with pin_primary():
+            self.assertEqual(router.db_for_read(Species), "default")
+        with transaction.atomic():
+            # pinned by the first write of the transaction only
+            self.assertEqual(router.db_for_read(Species), "replica")
+            Species.objects.create(text="H2")
+            self.assertEqual(router.db_for_read(Species), "default")
+        self.assertEqual(router.db_for_read(Species), "replica")
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Species), "replica")
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    Species.objects.create(text="H2+")
+                    self.assertEqual(router.db_for_read(Species), "default")
+                    raise ValueError
+            # still pinned until the end of the transaction
+            self.assertEqual(router.db_for_read(Species), "default")
+        self.assertEqual(router.db_for_read(Species), "replica")
+        with transaction.atomic():
+            # the read-only lookups do not pin the transaction
+            self.assertEqual(lookup_databases(Species), ["replica", "default"])
+            with self.assertRaises(Species.DoesNotExist):
+                Species.get_from_text("H2")
+            self.assertEqual(router.db_for_read(Species), "replica")
+            # but the creations do
+            Species.get_or_create_from_text("He")
+            self.assertEqual(router.db_for_read(Species), "default")
+        self.assertEqual(lookup_databases(Species), ["replica", "default"])
+        self.assertEqual(lookup_databases(Species, using="replica"), ["replica"])
+        with override_settings(VALEM_REPLICA_DATABASES=[]):
+            self.assertEqual(router.db_for_read(Species), "default")
+            self.assertEqual(lookup_databases(Species), ["default"])
+
+    def test_lookups_on_replica(self):
+        species, created = Species.get_or_create_from_text("H2")
+        self.assertTrue(created)
+        self.assertEqual(species._state.db, "default")
+        self.assertFalse(Species.objects.using("replica").exists())
+        with self.assertRaises(Species.DoesNotExist):
+            Species.get_from_text("H2")
+        with pin_primary():
+            self.assertEqual(Species.get_from_text("H2"), species)
+        self.assertEqual(Species.get_from_text("H2", using="default"), species)
+
+        Species.get_or_create_from_text("H2", using="replica")
+        with self.assertNumQueries(0, using="default"):
+            with self.assertNumQueries(1, using="replica"):
+                self.assertEqual(Species.get_from_text("H2")._state.db, "replica")
+
+    def test_get_or_create_falls_back_on_primary(self):
+        rp, _ = RP.get_or_create_from_text("H2 v=1")
+        # not replicated yet: found on the primary, not created again
+        same, created = RP.get_or_create_from_text("H2 v=1")
+        self.assertFalse(created)
+        self.assertEqual(same, rp)
+        self.assertEqual(Species.objects.using("default").count(), 1)
+        self.assertEqual(RP.objects.using("default").count(), 1)
+
+    def test_read_your_writes(self):
+        with transaction.atomic():
+            reaction, created = Reaction.get_or_create_from_text(TEXT)
+            self.assertTrue(created)
+            self.assertEqual(list(Reaction.all_from_text(TEXT)), [reaction])
+        self.assertFalse(Reaction.all_from_text(TEXT).exists())
+        self.assertEqual(
+            list(Reaction.all_from_text(TEXT, using="default")), [reaction]
+        )
+        self.assertEqual(reaction.reactants.using("default").count(), 2)
+        self.assertFalse(Reaction.objects.using("replica").exists())
+
+    def test_bulk_ingest(self):
+        Reaction.get_or_create_from_text(TEXT)
+        datasets = MyReactionDataSet.bulk_ingest([{"reaction": TEXT}])
+        self.assertEqual(MyReactionDataSet.objects.using("default").count(), 1)
+        self.assertEqual(datasets[0]._state.db, "default")
+        with self.assertRaises(Reaction.DoesNotExist):
+            MyReactionDataSet.bulk_ingest([{"reaction": TEXT}], using="replica")
+
+    def test_other_databases(self):
+        class Instance:
+            class _state:
+                db = "other"
+
+        self.assertEqual(
+            ReplicaRouter().db_for_write(Species, instance=Instance), "other"
+        )